@@ -1,60 +1,198 @@
 '''
   Usage:
   $ python ./automated_websockets_attack.py -h
+
+  By default payloads are sent through a pool of persistent connections
+  (see websockets_runner.py); --serial restores the original one
+  connection per payload behaviour.
+
+  Payloads are streamed from their lists into a compiled JSON template
+  (see payload_template.py). Use $$$ in the template for a single list,
+  or named placeholders with one list each, e.g. $$user$$ and $$pass$$:
+  $ python ./automated_websockets_attack.py -a token.txt -t template.json -p user=users.txt -p pass=passwords.txt --mode clusterbomb
+
+  With -o, responses are not printed; each result is appended to a JSONL
+  file (payload index, latency, size, hash) by a background writer, new
+  response sizes are reported as they appear, and a summary grouped by
+  response hash is printed at the end (see result_sink.py).
+
+  With --tried, messages already delivered to the target URL in earlier
+  runs are skipped and newly delivered ones are recorded (see
+  tried_store.py), so a repeat run only sends what is new. Result
+  indexes then count only the messages sent in this run.
+
+  Try it out against a local echo server first, e.g.:
+  $ python ./automated_websockets_attack.py -a token.txt -p payloads.txt -t template.json -u ws://127.0.0.1:8765/ --pool 8
 '''
 
 import argparse
-import json
+import time
 import websocket
 
+from payload_template import DEFAULT_PLACEHOLDER, PayloadTemplate, iter_messages
+from result_sink import ResultSink
+from tried_store import TriedStore
+from websockets_runner import WebSocketsRunner
+
 
 class AutomatedWebSocketsAttack:
 
-    def __init__(self, access_token_file, payloads_file, template_file):
+    def __init__(self, access_token_file, payloads_file, template_file,
+                 ws_target_url='wss://host/?key=value', origin='https://origin/', host='host',
+                 headers=('Cookie: key=value',), mode='pitchfork'):
         # get access token
         with open(access_token_file, 'r') as f:
             self.access_token = f.read()
 
-        # get payloads list
-        with open(payloads_file, 'r') as f:
-            payloads = f.read().splitlines()
+        # payload list(s), streamed when the messages are sent: either a
+        # single file for $$$ or a {placeholder name: file} dict
+        if isinstance(payloads_file, str):
+            payloads_file = {DEFAULT_PLACEHOLDER: payloads_file}
+        self.payload_files = payloads_file
+        self.mode = mode
 
         # get JSON template (based on a legit request captured)
-        with open(template_file, 'r') as f:
-            contents = f.read()
-            self.template = json.loads(contents)
+        self.template = PayloadTemplate.from_file(template_file)
+        # fail fast on placeholders without a payload list
+        self.messages()
+
+        self.ws_target_url = ws_target_url
+        self.origin = origin
+        self.host = host
+        self.headers = list(headers)
+
+
+    def messages(self):
+        # replace token placeholders with attack payloads
+        return iter_messages(self.template, self.payload_files, self.mode)
+
 
-        self.custom_payloads = []
-        for payload in payloads:
-            # replace token placeholders with attack payloads
-            custom_payload = str(self.template).replace('$$$', payload)
-            self.custom_payloads.append(custom_payload)
+    def _untried_messages(self, tried, on_result):
+        '''
+            Returns (messages, on_result) that skip messages in a
+            tried_store.BloomFilter and record each one once delivered.
+        '''
+        if tried is None:
+            return self.messages(), on_result
 
-        self.ws_target_url = 'wss://host/?key=value'
-        self.origin = 'https://origin/',
-        self.host = 'host'
+        # messages sent but not yet answered, by index in the filtered stream
+        pending = {}
+        skipped = [0]
 
+        def messages():
+            index = 0
+            for message in self.messages():
+                if message in tried:
+                    skipped[0] += 1
+                    continue
+                pending[index] = message
+                index += 1
+                yield message
+            print(f'skipped {skipped[0]} message(s) already tried')
 
-    def run(self):
-        websocket.enableTrace(True)
+        def on_tried_result(index, response, latency):
+            message = pending.pop(index)
+            if response is not None:
+                tried.add(message)
+            on_result(index, response, latency)
 
-        for payload in self.custom_payloads:
+        return messages(), on_tried_result
+
+
+    def _result_handler(self, sink):
+        if sink is not None:
+            return sink.add
+
+        def on_result(index, response, latency):
+            print(f'{response}')
+        return on_result
+
+
+    def run(self, trace=False, sink=None, tried=None):
+        websocket.enableTrace(trace)
+        messages, on_result = self._untried_messages(tried, self._result_handler(sink))
+
+        for index, payload in enumerate(messages):
             ws = websocket.WebSocket()
-            ws.connect(url=self.ws_target_url, origin=self.origin, host=self.host, headers={ 'Cookie: key=value' })
+            ws.connect(url=self.ws_target_url, origin=self.origin, host=self.host, header=self.headers)
             message = f'{payload}'
+            started = time.monotonic()
             ws.send(message.encode())
             result = ws.recv()
-            print(f'{result}')
+            on_result(index, result, time.monotonic() - started)
             ws.close()
 
 
+    def run_concurrent(self, pool_size=4, max_in_flight=None, rate=None, timeout=10.0, sink=None, tried=None):
+        # 'Name: value' header lines -> (name, value) pairs
+        headers = [tuple(part.strip() for part in header.split(':', 1)) for header in self.headers]
+        runner = WebSocketsRunner(
+            self.ws_target_url,
+            origin=self.origin,
+            headers=headers,
+            pool_size=pool_size,
+            max_in_flight=max_in_flight,
+            rate=rate,
+            timeout=timeout,
+        )
+
+        runner.run(*self._untried_messages(tried, self._result_handler(sink)))
+        print(f'sent: {runner.sent}, failed: {runner.failed}, reconnects: {runner.reconnects}')
+
+
 if __name__ == '__main__':
     parser = argparse.ArgumentParser(description='Set up and fire a series of requests against WebSockets resources')
     parser.add_argument('-a', dest='access_token_file', required=True, help='JWT/JWS access token (name of file containing token value)')
-    parser.add_argument('-p', dest='payloads_file', required=True, help='list of payloads (name of file containing payloads)')
+    parser.add_argument('-p', dest='payloads_files', action='append', required=True, help='list of payloads (name of file containing payloads), or name=file for a $$name$$ placeholder (repeatable)')
     parser.add_argument('-t', dest='template_file', required=True, help='request template (name of JSON file)')
+    parser.add_argument('--mode', choices=['pitchfork', 'clusterbomb'], default='pitchfork', help='how multiple payload lists are combined')
+    parser.add_argument('-u', dest='ws_target_url', default='wss://host/?key=value', help='target WebSockets URL')
+    parser.add_argument('--origin', dest='origin', default='https://origin/', help='Origin header value')
+    parser.add_argument('--host', dest='host', default='host', help='Host header value (--serial only)')
+    parser.add_argument('-H', dest='headers', action='append', default=None, help="extra header, e.g. 'Cookie: key=value' (repeatable)")
+    parser.add_argument('--pool', dest='pool_size', type=int, default=4, help='number of persistent connections')
+    parser.add_argument('--in-flight', dest='max_in_flight', type=int, default=None, help='maximum requests in flight, at most --pool (default: pool size)')
+    parser.add_argument('--rps', dest='rate', type=float, default=None, help='requests per second ceiling (default: unlimited)')
+    parser.add_argument('--timeout', dest='timeout', type=float, default=10.0, help='per-request response timeout in seconds')
+    parser.add_argument('--serial', action='store_true', help='open a new connection per payload, one at a time')
+    parser.add_argument('--trace', action='store_true', help='enable websocket-client frame tracing (--serial only)')
+    parser.add_argument('-o', dest='results_file', default=None, help='append results to this JSONL file instead of printing responses')
+    parser.add_argument('--baseline', type=int, default=20, help='results seen before new response sizes are reported (with -o)')
+    parser.add_argument('--tried', dest='tried_store', default=None, help='tried store directory: skip messages sent to this URL in earlier runs')
 
     args = parser.parse_args()
+    if args.max_in_flight is not None and not 1 <= args.max_in_flight <= args.pool_size:
+        parser.error('--in-flight must be between 1 and --pool: each connection carries one request at a time')
+
+    payloads_files = {}
+    for payloads_file in args.payloads_files:
+        name, separator, path = payloads_file.partition('=')
+        if separator and name.isidentifier():
+            payloads_files[name] = path
+        else:
+            payloads_files[DEFAULT_PLACEHOLDER] = payloads_file
 
-    attack = AutomatedWebSocketsAttack(args.access_token_file, args.payloads_file, args.template_file)
-    attack.run()
+    attack = AutomatedWebSocketsAttack(
+        args.access_token_file,
+        payloads_files,
+        args.template_file,
+        ws_target_url=args.ws_target_url,
+        origin=args.origin,
+        host=args.host,
+        headers=args.headers or ['Cookie: key=value'],
+        mode=args.mode,
+    )
+    sink = ResultSink(args.results_file, args.baseline) if args.results_file else None
+    tried_store = TriedStore(args.tried_store) if args.tried_store else None
+    tried = tried_store.open(args.ws_target_url, 'websockets') if tried_store else None
+    try:
+        if args.serial:
+            attack.run(trace=args.trace, sink=sink, tried=tried)
+        else:
+            attack.run_concurrent(args.pool_size, args.max_in_flight, args.rate, args.timeout, sink=sink, tried=tried)
+    finally:
+        if tried_store is not None:
+            tried_store.close()
+        if sink is not None:
+            sink.close()
+            print(sink.index.summary())
@@ -1,11 +1,73 @@
-import itertools
+'''
+    Creates a list of every 3-character combination of uppercase letters (AAA-ZZZ),
+    or of any other length (-l) or hashcat-style mask (--mask).
+
+    Usage:
+        $ python ./get_permutations_ascii_uppercase.py
+        $ python ./get_permutations_ascii_uppercase.py -l 5 -o ./uppercase5.txt --workers 8
+        $ python ./get_permutations_ascii_uppercase.py -l 6 --shard 0/4
+        $ python ./get_permutations_ascii_uppercase.py -l 6 -o ./uppercase6.wl --format binary
+        $ python ./get_permutations_ascii_uppercase.py --mask '?u?u?d?d' -o ./uppercase_digits.txt
+
+    --shard i/N generates only the i-th (0-based) of N disjoint, contiguous
+    slices of the keyspace; --workers spreads the (shard's) range across
+    local processes, merging into the output file in order unless
+    --split_files is given. --format binary writes (rather than appends)
+    the fixed width wordlist format read by wordlist_format.Wordlist.
+    --mask takes a charset per position (see keyspace.parse_mask) and
+    overrides -l; mask_builder.py adds custom charsets and validity rules.
+'''
+
+import argparse
+import os
 from string import ascii_uppercase
 
+from keyspace import Keyspace, MaskKeyspace, open_output, parse_mask, parse_shard, shard_range, write_parallel
+from wordlist_format import pack_header
+
 
 char_space = ascii_uppercase
-characters = list(char_space)
 
-# for p in permutations(characters, 3):
-with open('./permutations2.txt','at') as f:
-    for p in itertools.product(characters, repeat=3):
-        f.write(f'{p[0]}{p[1]}{p[2]}\n')
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create a list of every combination of uppercase letters')
+    parser.add_argument('-l', dest='length', type=int, default=3, help='length of each combination')
+    parser.add_argument('--mask', default=None, help='hashcat-style mask, e.g. ?u?u?d (overrides -l)')
+    parser.add_argument('-o', dest='file_path', default='./permutations2.txt', help='output file, appended to ("-" for stdout)')
+    parser.add_argument('--shard', default=None, help='only generate shard i/N (0-based) of the keyspace')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--split_files', action='store_true', help='write one output file per worker instead of merging')
+    parser.add_argument('--format', choices=['text', 'binary'], default='text', help='output format')
+    args = parser.parse_args()
+
+    binary = args.format == 'binary'
+    if args.mask is not None:
+        try:
+            keyspace = MaskKeyspace(parse_mask(args.mask), newline=not binary)
+        except ValueError as e:
+            print(e)
+            exit()
+    else:
+        keyspace = Keyspace(char_space, args.length, repeat=True, newline=not binary)
+
+    start, stop = 0, keyspace.count
+    if args.shard is not None:
+        try:
+            start, stop = shard_range(start, stop, *parse_shard(args.shard))
+        except ValueError as e:
+            print(e)
+            exit()
+
+    if binary and args.split_files:
+        print('--split_files is not supported with --format binary; use --shard to split runs instead.')
+        exit()
+
+    try:
+        with open_output(args.file_path, append=not binary) as f:
+            if binary:
+                f.write(pack_header(stop - start, keyspace.alphabet, keyspace.length, keyspace.length))
+            if args.workers <= 1:
+                keyspace.write(f, start, stop)
+        if args.workers > 1:
+            write_parallel(keyspace, args.file_path, args.workers, start, stop, args.split_files, append=True)
+    except BrokenPipeError:
+        os._exit(0)
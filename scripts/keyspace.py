@@ -0,0 +1,789 @@
+'''
+    Author: Adam Wilson https://github.com/lightbroker
+
+    Purpose:
+        Index-addressable keyspace engine for candidate list generation
+        (subdomain prefixes, bucket names, etc.).
+
+        The keyspace is either every permutation (no position reuse) or
+        every product (characters may repeat) of an alphabet for a given
+        length, in the same order `itertools` would produce them.
+        Candidates are emitted in large newline-delimited text blocks
+        rather than one `write()` per candidate, and any [start, stop)
+        slice of the keyspace can be generated directly, so long runs
+        can be checkpointed and resumed.
+
+        MaskKeyspace does the same for hashcat-style masks (a charset per
+        position, see parse_mask), with or without character repetition
+        and optionally restricted to valid DNS labels or bucket names
+        (RULES). Rule constraints are pruned from the mask up front by
+        splitting it into disjoint products, generated one after another,
+        so every candidate is unique and the order is itertools order
+        within each product. Without repetition, each product is counted
+        and unranked exactly rather than generated in full and filtered.
+
+    Usage:
+        from keyspace import Keyspace
+
+        keyspace = Keyspace(string.ascii_lowercase + string.digits, 5)
+        print(keyspace.count)
+        print(keyspace.candidate(123456))
+        with open('list.txt', 'wb') as f:
+            keyspace.write(f, start=0, stop=1000000)
+
+        # generate shard 2 of 8 across 4 local worker processes
+        start, stop = shard_range(0, keyspace.count, 2, 8)
+        write_parallel(keyspace, 'list.txt', 4, start, stop)
+
+        # valid 6-character DNS labels over [a-z0-9-]
+        keyspace = MaskKeyspace(parse_mask('?1?1?1?1?1?1', {'1': '?l?d-'}), rule='dns')
+
+        # 4 distinct characters: a letter, then letters or digits
+        keyspace = MaskKeyspace(parse_mask('?l?1?1?1', {'1': '?l?d'}), repeat=False)
+'''
+
+import os
+import re
+import shutil
+import string
+import sys
+import tempfile
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from itertools import permutations, product
+from math import perm
+
+
+# upper bound on candidates per generated block
+BLOCK_CANDIDATES = 1 << 16
+
+# byte values used as stand-ins for the remaining alphabet when
+# expanding a permutation block (newline is skipped)
+PLACEHOLDERS = bytes(b for b in range(256) if b != ord('\n'))
+
+
+class Keyspace:
+
+    def __init__(self, alphabet, length, repeat=False, newline=True):
+        if length < 1:
+            raise ValueError(f'length must be at least 1, got {length}')
+        if not alphabet.isascii() or len(alphabet) > len(PLACEHOLDERS):
+            raise ValueError('alphabet must be at most 255 ASCII characters')
+
+        self.alphabet = alphabet
+        self.length = length
+        self.repeat = repeat
+        self.newline = newline
+        self.count = self._space_size(len(alphabet), length)
+
+        # split each candidate into a prefix (unranked once per block)
+        # and a suffix (expanded from a pre-built block template)
+        self.suffix_length = 1
+        for k in range(length, 0, -1):
+            if self._suffix_size(k) <= BLOCK_CANDIDATES:
+                self.suffix_length = k
+                break
+        self.prefix_length = length - self.suffix_length
+        self.block_size = self._suffix_size(self.suffix_length)
+        # bytes per candidate in the output, with or without a trailing newline
+        self.line_width = length + 1 if newline else length
+        # every index in [0, count) is written, so output offsets are index * line_width
+        self.exact = True
+
+        self._template = self._build_template()
+
+
+    def _space_size(self, n, length):
+        if self.repeat:
+            return n ** length
+        return perm(n, length)
+
+
+    def _suffix_size(self, k):
+        if self.repeat:
+            return len(self.alphabet) ** k
+        return perm(len(self.alphabet) - (self.length - k), k)
+
+
+    def _build_template(self):
+        if self.block_size == 0:
+            return b''
+
+        if self.repeat:
+            suffixes = product(self.alphabet, repeat=self.suffix_length)
+        else:
+            remaining = len(self.alphabet) - self.prefix_length
+            placeholders = PLACEHOLDERS[:remaining].decode('latin-1')
+            suffixes = permutations(placeholders, self.suffix_length)
+
+        return '\n'.join(map(''.join, suffixes)).encode('latin-1')
+
+
+    def _unrank(self, index, length):
+        '''
+            Returns the candidate prefix of the given length at `index`
+            (within the prefix space), plus the alphabet left over for
+            the remaining positions.
+        '''
+        n = len(self.alphabet)
+        if self.repeat:
+            chars = []
+            for _ in range(length):
+                index, digit = divmod(index, n)
+                chars.append(self.alphabet[digit])
+            return ''.join(reversed(chars)), self.alphabet
+
+        remaining = list(self.alphabet)
+        chars = []
+        for position in range(length):
+            radix = perm(n - position - 1, length - position - 1)
+            digit, index = divmod(index, radix)
+            chars.append(remaining.pop(digit))
+        return ''.join(chars), remaining
+
+
+    def candidate(self, index):
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f'keyspace index {index} out of range')
+        return self._unrank(index, self.length)[0]
+
+
+    def block(self, block_index):
+        '''
+            Returns one complete block of candidates as newline-terminated bytes
+            (or back-to-back fixed width records, without `newline`).
+        '''
+        prefix, remaining = self._unrank(block_index, self.prefix_length)
+        data = self._template
+        if not self.repeat:
+            remaining = ''.join(remaining).encode('ascii')
+            table = bytes.maketrans(PLACEHOLDERS[:len(remaining)], remaining)
+            data = data.translate(table)
+        if prefix:
+            prefix = prefix.encode('ascii')
+            data = prefix + data.replace(b'\n', b'\n' + prefix)
+        if not self.newline:
+            return data.replace(b'\n', b'')
+        return data + b'\n'
+
+
+    def blocks(self, start=0, stop=None):
+        '''
+            Yields newline-terminated byte blocks covering candidates [start, stop).
+        '''
+        start, stop = self._bounds(start, stop)
+        if start >= stop:
+            return
+
+        first_block, first_offset = divmod(start, self.block_size)
+        last_block, last_offset = divmod(stop, self.block_size)
+        if last_offset == 0:
+            last_block, last_offset = last_block - 1, self.block_size
+
+        for block_index in range(first_block, last_block + 1):
+            data = self.block(block_index)
+            lo = first_offset if block_index == first_block else 0
+            hi = last_offset if block_index == last_block else self.block_size
+            if lo or hi != self.block_size:
+                data = data[lo * self.line_width:hi * self.line_width]
+            yield data
+
+
+    def __iter__(self):
+        for data in self.blocks():
+            data = data.decode('ascii')
+            if self.newline:
+                yield from data.splitlines()
+            else:
+                yield from (data[i:i + self.length] for i in range(0, len(data), self.length))
+
+
+    def write(self, f, start=0, stop=None, checkpoint=None):
+        '''
+            Writes candidates [start, stop) to an open binary stream.
+            If a checkpoint is given, the next unwritten index is saved
+            to it after every block so an interrupted run can resume.
+        '''
+        start, stop = self._bounds(start, stop)
+        index = start
+        for data in self.blocks(start, stop):
+            f.write(data)
+            index += len(data) // self.line_width
+            if checkpoint is not None:
+                f.flush()
+                checkpoint.save(index)
+        return index - start
+
+
+    def spec(self):
+        '''
+            Class and constructor arguments, used to rebuild the keyspace in a worker process.
+        '''
+        return (Keyspace, (self.alphabet, self.length, self.repeat, self.newline))
+
+
+    def _bounds(self, start, stop):
+        if stop is None or stop > self.count:
+            stop = self.count
+        return max(start, 0), stop
+
+
+# hashcat built-in charsets (?l, ?u, ?d, ?h, ?H, ?s, ?a)
+MASK_CHARSETS = {
+    'l': string.ascii_lowercase,
+    'u': string.ascii_uppercase,
+    'd': string.digits,
+    'h': '0123456789abcdef',
+    'H': '0123456789ABCDEF',
+    's': ' ' + string.punctuation,
+}
+MASK_CHARSETS['a'] = MASK_CHARSETS['l'] + MASK_CHARSETS['u'] + MASK_CHARSETS['d'] + MASK_CHARSETS['s']
+
+LDH = string.ascii_letters + string.digits + '-'
+BUCKET_CHARS = string.ascii_lowercase + string.digits + '.-'
+
+# Validity rules. `length` bounds the candidate length, `chars` limits
+# every position, `edge` limits the first and last position, and
+# `prefixes` / `suffixes` are forbidden at the start / end; all of these
+# prune the mask exactly before generation. `reject` is a pattern for
+# the few rules that can't be expressed per position, applied to each
+# generated block (without repetition, it can never match: ".." and an
+# IP address both repeat a character).
+RULES = {
+    # RFC 1035 LDH label; "--" in positions 3-4 is reserved (RFC 5891)
+    'dns': {
+        'length': (1, 63),
+        'chars': LDH,
+        'edge': string.ascii_letters + string.digits,
+        'prefixes': ['??--'],
+        'suffixes': [],
+        'reject': None,
+    },
+    # S3 general purpose bucket naming rules
+    'bucket': {
+        'length': (3, 63),
+        'chars': BUCKET_CHARS,
+        'edge': string.ascii_lowercase + string.digits,
+        'prefixes': ['xn--', 'sthree-', 'amzn-s3-demo-'],
+        'suffixes': ['-s3alias', '--ol-s3', '.mrap', '--x-s3', '--table-s3'],
+        'reject': rb'\.\.|^\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3}$',
+    },
+}
+
+
+def parse_mask(mask, custom_charsets=None):
+    '''
+        Parses a hashcat-style mask ("?l?l?d", "abc?d?1", ...) into one
+        charset per position. ?l ?u ?d ?h ?H ?s ?a are the built-in sets,
+        ?1-?4 are `custom_charsets` ({'1': '?l?d-', ...}, which may use the
+        built-in sets), "??" is a literal "?" and anything else is literal.
+    '''
+    custom = {}
+    for key, value in (custom_charsets or {}).items():
+        custom[str(key)] = ''.join(parse_mask(value))
+
+    charsets = []
+    position = 0
+    while position < len(mask):
+        char = mask[position]
+        if char != '?':
+            charsets.append(char)
+            position += 1
+            continue
+        if position + 1 >= len(mask):
+            raise ValueError(f'mask "{mask}" ends with an incomplete "?"')
+        key = mask[position + 1]
+        if key == '?':
+            charsets.append('?')
+        elif key in MASK_CHARSETS:
+            charsets.append(MASK_CHARSETS[key])
+        elif key in custom:
+            charsets.append(custom[key])
+        else:
+            raise ValueError(f'unknown charset "?{key}" in mask "{mask}"')
+        position += 2
+    # each position keeps its characters in first-seen order, without duplicates
+    return [''.join(dict.fromkeys(charset)) for charset in charsets]
+
+
+class _Product:
+    '''
+        One product of per-position charsets, generated in blocks the
+        same way as a repeat=True Keyspace.
+    '''
+
+    def __init__(self, charsets):
+        self.charsets = charsets
+        self.length = len(charsets)
+        self.count = 1
+        for charset in charsets:
+            self.count *= len(charset)
+
+        self.suffix_length = 0
+        self.block_size = 1
+        for charset in reversed(charsets):
+            if self.block_size * len(charset) > BLOCK_CANDIDATES and self.suffix_length:
+                break
+            self.block_size *= len(charset)
+            self.suffix_length += 1
+        self.prefix_length = self.length - self.suffix_length
+        self._template = None
+
+
+    def _unrank(self, index, length):
+        chars = []
+        for charset in reversed(self.charsets[:length]):
+            index, digit = divmod(index, len(charset))
+            chars.append(charset[digit])
+        return ''.join(reversed(chars))
+
+
+    def candidate(self, index):
+        return self._unrank(index, self.length)
+
+
+    def block(self, block_index):
+        if self._template is None:
+            suffixes = product(*self.charsets[self.prefix_length:])
+            self._template = '\n'.join(map(''.join, suffixes)).encode('ascii')
+        data = self._template
+        prefix = self._unrank(block_index, self.prefix_length).encode('ascii')
+        if prefix:
+            data = prefix + data.replace(b'\n', b'\n' + prefix)
+        return data + b'\n'
+
+
+    def chunks(self, lo, hi):
+        '''
+            Yields (candidates, newline-terminated bytes) covering [lo, hi).
+        '''
+        first_block, first_offset = divmod(lo, self.block_size)
+        last_block, last_offset = divmod(hi, self.block_size)
+        if last_offset == 0:
+            last_block, last_offset = last_block - 1, self.block_size
+
+        width = self.length + 1
+        for block_index in range(first_block, last_block + 1):
+            data = self.block(block_index)
+            block_lo = first_offset if block_index == first_block else 0
+            block_hi = last_offset if block_index == last_block else self.block_size
+            if block_lo or block_hi != self.block_size:
+                data = data[block_lo * width:block_hi * width]
+            yield block_hi - block_lo, data
+
+
+class _Distinct:
+    '''
+        One product of per-position charsets in which no character is used
+        twice, in itertools order, counted and unranked exactly.
+
+        Characters allowed at exactly the same positions are
+        interchangeable, so the number of ways to complete a prefix only
+        depends on how many characters of each such class it used; those
+        counts are memoized per (position, used counts).
+    '''
+
+    def __init__(self, charsets):
+        self.charsets = charsets
+        self.length = len(charsets)
+
+        positions = {}
+        for position, charset in enumerate(charsets):
+            for char in charset:
+                positions.setdefault(char, []).append(position)
+        signatures = list(dict.fromkeys(tuple(allowed) for allowed in positions.values()))
+        self._class = {char: signatures.index(tuple(allowed)) for char, allowed in positions.items()}
+        self._sizes = [0] * len(signatures)
+        for index in self._class.values():
+            self._sizes[index] += 1
+        self._choices = [
+            [index for index, signature in enumerate(signatures) if position in signature]
+            for position in range(self.length)
+        ]
+        self._counts = {}
+        self._unused = (0,) * len(signatures)
+        self.count = self._count(0, self._unused)
+
+        # the longest suffix whose completions fit in a block (with nothing used, the most there can be)
+        self.prefix_length = self.length - 1
+        while self.prefix_length and self._count(self.prefix_length - 1, self._unused) <= BLOCK_CANDIDATES:
+            self.prefix_length -= 1
+
+
+    def _use(self, used, char):
+        index = self._class[char]
+        return used[:index] + (used[index] + 1,) + used[index + 1:]
+
+
+    def _count(self, position, used):
+        '''
+            Number of ways to fill positions [position, length) given the used class counts.
+        '''
+        if position == self.length:
+            return 1
+        key = (position, used)
+        if key not in self._counts:
+            total = 0
+            for index in self._choices[position]:
+                free = self._sizes[index] - used[index]
+                if free:
+                    total += free * self._count(position + 1, used[:index] + (used[index] + 1,) + used[index + 1:])
+            self._counts[key] = total
+        return self._counts[key]
+
+
+    def _unrank(self, index, length):
+        '''
+            Returns the prefix of the given length that candidate `index`
+            starts with, and the index of the candidate among the prefix's completions.
+        '''
+        used = self._unused
+        chars = []
+        for position in range(length):
+            for char in self.charsets[position]:
+                if char in chars:
+                    continue
+                after = self._use(used, char)
+                size = self._count(position + 1, after)
+                if index < size:
+                    chars.append(char)
+                    used = after
+                    break
+                index -= size
+        return ''.join(chars), index
+
+
+    def candidate(self, index):
+        return self._unrank(index, self.length)[0]
+
+
+    def _completions(self, prefix):
+        completions = ['']
+        for charset in self.charsets[self.prefix_length:]:
+            allowed = [char for char in charset if char not in prefix]
+            completions = [tail + char for tail in completions for char in allowed if char not in tail]
+        return completions
+
+
+    def chunks(self, lo, hi):
+        '''
+            Yields (candidates, newline-terminated bytes) covering [lo, hi),
+            one prefix's completions at a time.
+        '''
+        index = lo
+        while index < hi:
+            prefix, offset = self._unrank(index, self.prefix_length)
+            completions = self._completions(prefix)[offset:offset + hi - index]
+            lines = [prefix + completion for completion in completions]
+            yield len(lines), ('\n'.join(lines) + '\n').encode('ascii')
+            index += len(lines)
+
+
+def _space_chunks(space, lo, hi):
+    if isinstance(space, Keyspace):
+        for data in space.blocks(lo, hi):
+            yield len(data) // space.line_width, data
+    else:
+        yield from space.chunks(lo, hi)
+
+
+def _space(charsets, repeat):
+    '''
+        Returns the generator for one product of charsets: without
+        repetition, a permutation Keyspace when every position has the
+        same charset, otherwise an exact _Distinct.
+    '''
+    if repeat or len(charsets) == 1:
+        return _Product(charsets)
+    if all(charset == charsets[0] for charset in charsets):
+        return Keyspace(charsets[0], len(charsets))
+    return _Distinct(charsets)
+
+
+def _exclude(products, pattern, offset):
+    '''
+        Splits each product (a list of charsets) into disjoint products
+        that cover it except for candidates with `pattern` at `offset`
+        ("?" in the pattern matches any character).
+    '''
+    result = []
+    for charsets in products:
+        fixed = [(offset + i, char) for i, char in enumerate(pattern) if char != '?']
+        if offset < 0 or offset + len(pattern) > len(charsets) or any(char not in charsets[i] for i, char in fixed):
+            result.append(charsets)
+            continue
+        # candidates that differ from the pattern first at position i, for each i
+        for n, (i, char) in enumerate(fixed):
+            split = list(charsets)
+            for j, matched in fixed[:n]:
+                split[j] = matched
+            split[i] = split[i].replace(char, '')
+            if split[i]:
+                result.append(split)
+    return result
+
+
+class MaskKeyspace:
+    '''
+        Keyspace of a mask: one charset per position, with characters
+        repeating freely (repeat=True) or never used twice in a candidate
+        (repeat=False), optionally restricted to the names a validity
+        rule (RULES) allows.
+
+        Rule constraints that are per position are pruned from the mask
+        itself, by narrowing charsets and splitting the mask into disjoint
+        products, so `count` is exact and candidates are never generated
+        just to be thrown away. Without repetition, products are counted
+        and unranked exactly too (_Distinct). Only the rule's `reject`
+        pattern filters generated blocks; then `count` is an upper bound
+        and `exact` is False.
+    '''
+
+    def __init__(self, charsets, repeat=True, rule=None, newline=True):
+        if not charsets:
+            raise ValueError('mask must have at least one position')
+        if not all(charset.isascii() for charset in charsets):
+            raise ValueError('mask charsets must be ASCII')
+
+        self.charsets = [''.join(dict.fromkeys(charset)) for charset in charsets]
+        self.length = len(charsets)
+        self.repeat = repeat
+        self.rule = rule
+        self.newline = newline
+        self.line_width = self.length + 1 if newline else self.length
+        self.alphabet = ''.join(dict.fromkeys(''.join(self.charsets)))
+
+        products = [self._prune(self.charsets, rule)]
+        reject = None
+        if rule is not None:
+            for prefix in RULES[rule]['prefixes']:
+                products = _exclude(products, prefix, 0)
+            for suffix in RULES[rule]['suffixes']:
+                products = _exclude(products, suffix, self.length - len(suffix))
+            # a pattern that needs a repeated character can't match without repetition
+            if RULES[rule]['reject'] is not None and repeat:
+                reject = RULES[rule]['reject']
+
+        spaces = (_space(charsets, repeat) for charsets in products if all(charsets))
+        self._products = [space for space in spaces if space.count]
+        self._offsets = []
+        self.count = 0
+        for space in self._products:
+            self._offsets.append(self.count)
+            self.count += space.count
+        self._reject = re.compile(reject) if reject is not None else None
+        self.exact = self._reject is None
+
+
+    def _prune(self, charsets, rule):
+        if rule is None:
+            return list(charsets)
+        low, high = RULES[rule]['length']
+        if not low <= self.length <= high:
+            raise ValueError(f'{rule} names must be {low}-{high} characters, mask has {self.length}')
+        allowed = RULES[rule]['chars']
+        pruned = [''.join(char for char in charset if char in allowed) for charset in charsets]
+        edge = RULES[rule]['edge']
+        for position in {0, self.length - 1}:
+            pruned[position] = ''.join(char for char in pruned[position] if char in edge)
+        return pruned
+
+
+    def candidate(self, index):
+        '''
+            Returns the candidate at `index` of the pruned mask space (before any block filtering).
+        '''
+        if index < 0:
+            index += self.count
+        if not 0 <= index < self.count:
+            raise IndexError(f'keyspace index {index} out of range')
+        position = bisect_right(self._offsets, index) - 1
+        return self._products[position].candidate(index - self._offsets[position])
+
+
+    def _chunks(self, start, stop):
+        '''
+            Yields (candidates covered, bytes) for [start, stop); the bytes hold only the candidates that pass filtering.
+        '''
+        for space, offset in zip(self._products, self._offsets):
+            lo, hi = max(start - offset, 0), min(stop - offset, space.count)
+            if lo >= hi:
+                continue
+            for covered, data in _space_chunks(space, lo, hi):
+                if self._reject is not None:
+                    search = self._reject.search
+                    data = b''.join([line for line in data.splitlines(keepends=True) if not search(line[:-1])])
+                if not self.newline:
+                    data = data.replace(b'\n', b'')
+                yield covered, data
+
+
+    def blocks(self, start=0, stop=None):
+        '''
+            Yields byte blocks covering candidates [start, stop).
+        '''
+        start, stop = self._bounds(start, stop)
+        for _, data in self._chunks(start, stop):
+            yield data
+
+
+    def __iter__(self):
+        for data in self.blocks():
+            data = data.decode('ascii')
+            if self.newline:
+                yield from data.splitlines()
+            else:
+                yield from (data[i:i + self.length] for i in range(0, len(data), self.length))
+
+
+    def write(self, f, start=0, stop=None, checkpoint=None):
+        '''
+            Writes candidates [start, stop) to an open binary stream and
+            returns the number written (filtered candidates aside). A
+            checkpoint gets the next keyspace index after every block.
+        '''
+        start, stop = self._bounds(start, stop)
+        index = start
+        written = 0
+        for covered, data in self._chunks(start, stop):
+            f.write(data)
+            index += covered
+            written += len(data) // self.line_width
+            if checkpoint is not None:
+                f.flush()
+                checkpoint.save(index)
+        return written
+
+
+    def spec(self):
+        return (MaskKeyspace, (self.charsets, self.repeat, self.rule, self.newline))
+
+
+    def _bounds(self, start, stop):
+        if stop is None or stop > self.count:
+            stop = self.count
+        return max(start, 0), stop
+
+
+class Checkpoint:
+    '''
+        Records the next keyspace index to generate in a small text file.
+    '''
+
+    def __init__(self, path):
+        self.path = path
+
+
+    def load(self):
+        try:
+            with open(self.path, 'r') as f:
+                return int(f.read().strip())
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+    def save(self, index):
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as f:
+            f.write(f'{index}\n')
+        os.replace(temp_path, self.path)
+
+
+    def clear(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)
+
+
+def open_output(file_path, append=False):
+    '''
+        Opens a large-buffered binary stream for candidate output ('-' is stdout).
+    '''
+    if file_path == '-':
+        return os.fdopen(os.dup(sys.stdout.fileno()), 'wb', buffering=1 << 20)
+    return open(file_path, 'ab' if append else 'wb', buffering=1 << 20)
+
+
+def parse_shard(value):
+    '''
+        Parses an "i/N" shard argument (0 <= i < N).
+    '''
+    try:
+        shard, shards = (int(part) for part in value.split('/'))
+    except ValueError:
+        raise ValueError(f'"{value}" is not a shard of the form i/N')
+    if shards < 1 or not 0 <= shard < shards:
+        raise ValueError(f'shard "{value}" out of range, expected 0 <= i < N')
+    return shard, shards
+
+
+def shard_range(start, stop, shard, shards):
+    '''
+        Returns the contiguous [start, stop) index range owned by one of
+        `shards` equal, disjoint slices of [start, stop).
+    '''
+    size = stop - start
+    return start + size * shard // shards, start + size * (shard + 1) // shards
+
+
+def _write_range(spec, path, start, stop, offset=None):
+    keyspace_class, args = spec
+    keyspace = keyspace_class(*args)
+    if offset is None:
+        with open(path, 'wb', buffering=1 << 20) as f:
+            return keyspace.write(f, start, stop)
+    with open(path, 'r+b', buffering=1 << 20) as f:
+        f.seek(offset)
+        return keyspace.write(f, start, stop)
+
+
+def write_parallel(keyspace, file_path, workers, start=0, stop=None, split_files=False, append=False):
+    '''
+        Generates candidates [start, stop) across a pool of worker processes,
+        each owning one contiguous slice of the range.
+
+        By default the slices are merged, in keyspace order, into `file_path`
+        ("-" for stdout). Since every line has the same width, each worker
+        writes straight into its own region of the output file (unless the
+        keyspace filters candidates, when parts are written to temporary
+        files and concatenated). With
+        `split_files`, each slice is written to its own
+        "<file_path>.shard-<i>-of-<N>" file instead; the paths are returned.
+    '''
+    start, stop = keyspace._bounds(start, stop)
+    ranges = [shard_range(start, stop, i, workers) for i in range(workers)]
+    spec = keyspace.spec()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        if split_files:
+            paths = [f'{file_path}.shard-{i}-of-{workers}' for i in range(workers)]
+            futures = [pool.submit(_write_range, spec, path, lo, hi) for path, (lo, hi) in zip(paths, ranges)]
+            for future in futures:
+                future.result()
+            return paths
+
+        if file_path == '-' or not keyspace.exact:
+            # stream each part out as soon as it and its predecessors are done
+            parts_dir = None if file_path == '-' else os.path.dirname(os.path.abspath(file_path))
+            with tempfile.TemporaryDirectory(dir=parts_dir) as temp_dir:
+                paths = [os.path.join(temp_dir, f'part-{i}') for i in range(workers)]
+                futures = [pool.submit(_write_range, spec, path, lo, hi) for path, (lo, hi) in zip(paths, ranges)]
+                with open_output(file_path, append) as out:
+                    for path, future in zip(paths, futures):
+                        future.result()
+                        with open(path, 'rb') as part:
+                            shutil.copyfileobj(part, out, 1 << 20)
+                        os.remove(path)
+            return [file_path]
+
+        with open(file_path, 'ab' if append else 'wb') as f:
+            base = f.tell()
+            f.truncate(base + (stop - start) * keyspace.line_width)
+        futures = [
+            pool.submit(_write_range, spec, file_path, lo, hi, base + (lo - start) * keyspace.line_width)
+            for lo, hi in ranges
+        ]
+        for future in futures:
+            future.result()
+        return [file_path]
@@ -0,0 +1,143 @@
+'''
+    Author: Adam Wilson https://github.com/lightbroker
+
+    Purpose:
+        Create a candidate list from a hashcat-style mask, with a charset
+        per position, optional no-repetition mode and built-in validity
+        rules for DNS labels and bucket names. Only valid, unique
+        candidates are written.
+
+    Usage:
+        $ python ./mask_builder.py '?l?l?d?d' file/path.txt
+        $ python ./mask_builder.py 'dev-?1?1?1' - -1 '?l?d' --rule=dns | some_tool
+        $ python ./mask_builder.py '?1?1?1?1?1?1' file/path.txt -1 '?l?d-' --increment --increment-min=3 --rule=bucket
+        $ python ./mask_builder.py '?l?l?l?l?l' file/path.txt --no-repeat --count
+        $ python ./mask_builder.py '?1?1?1?1?1?1' file/path.txt -1 '?l?d-' --rule=dns --shard=3/8 --workers=4
+
+    Parameters:
+        1. Mask, one charset per position: ?l ?u ?d ?h ?H ?s ?a are
+            hashcat's built-in charsets, ?1-?4 the custom charsets below,
+            "??" a literal "?" and any other character itself.
+
+        2. File path (string) specifies the target
+            file for writing the resulting candidates
+            ("-" writes to stdout).
+
+        3. -1 / -2 / -3 / -4
+            Custom charsets for ?1-?4, e.g. -1 '?l?d-'.
+
+        4. --increment / --increment-min
+            Also generate the shorter masks made of the first
+            increment-min, increment-min + 1, ... positions.
+
+        5. --no-repeat
+            No character is used twice in a candidate.
+
+        6. --rule
+            "dns": LDH labels of 1-63 characters, no leading or trailing
+            hyphen, no "--" in positions 3-4. "bucket": S3 bucket names
+            of 3-63 characters from [a-z0-9.-], starting and ending with
+            a letter or digit, without "..", IP address formatting or the
+            reserved prefixes and suffixes. Lengths a rule doesn't allow
+            are skipped when incrementing.
+
+        7. --count
+            Print the number of candidates and exit (an upper bound when
+            the bucket rule has to filter generated blocks).
+
+        8. --shard / --workers
+            Only generate shard i of N (0-based) of each length, and
+            spread it across a pool of worker processes, merged in order.
+
+        9. --format
+            "text" (default, newline-delimited) or "binary", the fixed
+            width wordlist format read by wordlist_format.Wordlist (one
+            mask length only).
+'''
+
+import argparse
+import os
+import sys
+
+from keyspace import RULES, MaskKeyspace, open_output, parse_mask, parse_shard, shard_range, write_parallel
+from wordlist_format import pack_header
+
+
+def build_keyspaces(charsets, increment_min=None, repeat=True, rule=None, newline=True):
+    '''
+        Returns one MaskKeyspace per mask length, shortest first (just the
+        full mask unless `increment_min` is given).
+    '''
+    if increment_min is None:
+        return [MaskKeyspace(charsets, repeat, rule, newline)]
+
+    low, high = RULES[rule]['length'] if rule is not None else (1, len(charsets))
+    lengths = range(max(increment_min, low), min(len(charsets), high) + 1)
+    return [MaskKeyspace(charsets[:length], repeat, rule, newline) for length in lengths]
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create a candidate list from a hashcat-style mask')
+    parser.add_argument('mask', help='mask, e.g. ?l?l?d or dev-?1?1')
+    parser.add_argument('file_path', help='target file for the resulting candidates ("-" for stdout)')
+    for key in '1234':
+        parser.add_argument(f'-{key}', dest=f'charset_{key}', default=None, help=f'custom charset for ?{key}')
+    parser.add_argument('--increment', action='store_true', help='also generate every shorter prefix of the mask')
+    parser.add_argument('--increment-min', dest='increment_min', type=int, default=1, help='shortest length generated with --increment')
+    parser.add_argument('--no-repeat', dest='repeat', action='store_false', help='never use a character twice in a candidate')
+    parser.add_argument('--rule', choices=sorted(RULES), default=None, help='only generate valid names of this kind')
+    parser.add_argument('--count', action='store_true', help='print the number of candidates and exit')
+    parser.add_argument('--shard', default=None, help='only generate shard i/N (0-based) of each length')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--format', choices=['text', 'binary'], default='text', help='output format')
+    args = parser.parse_args()
+
+    binary = args.format == 'binary'
+    custom_charsets = {key: getattr(args, f'charset_{key}') for key in '1234' if getattr(args, f'charset_{key}') is not None}
+    try:
+        charsets = parse_mask(args.mask, custom_charsets)
+        keyspaces = build_keyspaces(charsets, args.increment_min if args.increment else None, args.repeat, args.rule, not binary)
+        shard = parse_shard(args.shard) if args.shard is not None else None
+    except ValueError as e:
+        print(e)
+        exit()
+
+    if args.count:
+        total = sum(keyspace.count for keyspace in keyspaces)
+        if not all(keyspace.exact for keyspace in keyspaces):
+            print('upper bound: some candidates are only filtered during generation', file=sys.stderr)
+        print(total)
+        exit()
+
+    if binary:
+        if len(keyspaces) != 1 or args.file_path == '-':
+            print('--format=binary needs one mask length and an output file.')
+            exit()
+        if args.workers > 1 and not keyspaces[0].exact:
+            print('--format=binary with --workers needs an exact keyspace (no bucket rule without --no-repeat).')
+            exit()
+
+    try:
+        with open_output(args.file_path) as list_file:
+            if binary:
+                # the count is rewritten once generation is done
+                keyspace = keyspaces[0]
+                list_file.write(pack_header(0, keyspace.alphabet, keyspace.length, keyspace.length))
+        written = 0
+        for keyspace in keyspaces:
+            start, stop = 0, keyspace.count
+            if shard is not None:
+                start, stop = shard_range(start, stop, *shard)
+            if args.workers > 1:
+                write_parallel(keyspace, args.file_path, args.workers, start, stop, append=True)
+                written += stop - start if keyspace.exact else 0
+                continue
+            with open_output(args.file_path, append=True) as list_file:
+                written += keyspace.write(list_file, start, stop)
+    except BrokenPipeError:
+        # downstream consumer closed the pipe early
+        os._exit(0)
+
+    if binary:
+        with open(args.file_path, 'r+b') as list_file:
+            list_file.write(pack_header(written, keyspace.alphabet, keyspace.length, keyspace.length))
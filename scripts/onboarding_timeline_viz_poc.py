@@ -1,208 +1,634 @@
-import matplotlib.pyplot as plt
-import pandas as pd
-import numpy as np
+"""
+Feature rollout projection POC.
+
+Projects how long enabling a feature across a fleet of repositories takes
+at different weekly rates, with optional linear ramp-up and Monte Carlo
+simulation of variable weekly throughput. Scenarios are evaluated as
+NumPy arrays in one batch, so thousands of rate/ramp-up combinations cost
+about as much as one.
+
+Usage:
+    $ python ./onboarding_timeline_viz_poc.py
+    $ python ./onboarding_timeline_viz_poc.py --total 4000 --rates 10 20 40 --ramp-up 0 4 8
+    $ python ./onboarding_timeline_viz_poc.py --monte-carlo 10000 --cv 0.3 --seed 1
+    $ python ./onboarding_timeline_viz_poc.py --headless charts/ --formats png svg --workers 4
+    $ python ./onboarding_timeline_viz_poc.py --grid-rates 1 100 --grid-csv scenarios.csv
+
+Without --headless the charts are shown interactively; with it they are
+rendered through the non-interactive Agg backend to files in the given
+directory, one chart per worker process.
+
+NumPy, pandas, matplotlib and seaborn are imported inside the functions
+that use them, so importing this module is cheap. --summary text|json
+prints the completion timeline from plain arithmetic and never imports
+them (tests/test_onboarding_timeline.py checks that with
+`python -X importtime`):
+    $ python ./onboarding_timeline_viz_poc.py --summary json --rates 5 10 20
+"""
+
+import argparse
+import json
+import math
+import os
 from datetime import datetime, timedelta
-import seaborn as sns
 
-def create_rollout_projection(total_repos, rates_per_week, start_date=None):
-"""
-Create a projection of repository feature rollout progress.
 
-Args:
-    total_repos (int): Total number of repositories
-    rates_per_week (list): List of repos per week rates to compare
-    start_date (datetime): Start date for the rollout (default: today)
+DEFAULT_TOTAL_REPOS = 2500
+DEFAULT_RATES = [5, 8, 10, 15, 20]
+WEEKS_PER_MONTH = 4.33
 
-Returns:
-    DataFrame with projections for each rate
-"""
+# upper bound on simulated (run, week) cells held in memory at once,
+# generated MONTE_CARLO_BLOCK weeks at a time
+MONTE_CARLO_CELLS = 1 << 22
+MONTE_CARLO_BLOCK = 32
 
-if start_date is None:
-    start_date = datetime.now()
-
-# Create results dictionary
-results = {}
-
-for rate in rates_per_week:
-    weeks_needed = np.ceil(total_repos / rate)
-    weeks = np.arange(0, weeks_needed + 1)
-    
-    # Calculate cumulative repos enabled
-    repos_enabled = np.minimum(weeks * rate, total_repos)
-    
-    # Create dates
-    dates = [start_date + timedelta(weeks=w) for w in weeks]
-    
-    results[f'{rate} per week'] = {
-        'dates': dates,
-        'repos_enabled': repos_enabled,
-        'completion_date': dates[-1],
-        'weeks_to_complete': weeks_needed
-    }
+CHARTS = ['rollout', 'workload', 'scenarios', 'monte_carlo']
 
-return results
+# loaded only when a chart, DataFrame or array is actually needed
+HEAVY_MODULES = ['matplotlib', 'numpy', 'pandas', 'seaborn']
 
-def plot_rollout_comparison(total_repos=2500, rates=[5, 10, 15, 20],
-start_date=None, figsize=(12, 8)):
-"""
-Create visualization comparing different rollout rates.
-"""
 
-# Generate projections
-projections = create_rollout_projection(total_repos, rates, start_date)
+def weeks_to_complete(total_repos, rates, ramp_up_weeks=0):
+    """
+    Weeks needed to enable every repository, for arrays of scenarios.
 
+    During the first `ramp_up_weeks` weeks throughput grows linearly
+    (week w enables rate * w / ramp_up_weeks repos), then stays at `rate`.
+    Ramp-up is a whole number of weeks (see ramp_weeks()).
 
-# Set up the plot
-plt.figure(figsize=figsize)
+    Args:
+        total_repos (int): Total number of repositories
+        rates (array-like): Repos per week at full speed, one per scenario
+        ramp_up_weeks (array-like): Ramp-up length in weeks (broadcast against rates)
 
-# Color palette
-colors = plt.cm.Set1(np.linspace(0, 1, len(rates)))
+    Returns:
+        float ndarray of whole weeks
+    """
+    import numpy as np
 
-# Plot each rate scenario
-for i, (label, data) in enumerate(projections.items()):
-    plt.plot(data['dates'], data['repos_enabled'], 
-            label=label, linewidth=2.5, color=colors[i])
-    
-    # Add completion point marker
-    plt.scatter(data['completion_date'], total_repos, 
-               color=colors[i], s=80, zorder=5)
+    rates = np.asarray(rates, dtype=float)
+    ramp = ramp_weeks(ramp_up_weeks)
+    rates, ramp = np.broadcast_arrays(rates, ramp)
 
-# Formatting
-plt.axhline(y=total_repos, color='red', linestyle='--', alpha=0.7, 
-            label=f'Target: {total_repos} repos')
+    # after ramp-up, cumulative = rate * ((ramp + 1) / 2 + w - ramp)
+    after_ramp = total_repos / rates + (ramp - 1) / 2
+    # within ramp-up, cumulative = rate * w (w + 1) / (2 ramp)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        within_ramp = (np.sqrt(1 + 8 * ramp * total_repos / rates) - 1) / 2
+    ramp_total = rates * (ramp + 1) / 2
 
-plt.xlabel('Date', fontsize=12)
-plt.ylabel('Repositories Enabled', fontsize=12)
-plt.title(f'Feature Rollout Progress Projection\n({total_repos:,} Total Repositories)', 
-          fontsize=14, fontweight='bold')
+    weeks = np.where(ramp <= 0, total_repos / rates,
+                     np.where(ramp_total >= total_repos, within_ramp, after_ramp))
+    # guard against float noise just above a whole week
+    return np.ceil(np.round(weeks, 9))
 
-plt.grid(True, alpha=0.3)
-plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
-plt.tight_layout()
 
-# Format y-axis to show thousands
-plt.gca().yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x:,.0f}'))
+def ramp_weeks(ramp_up_weeks):
+    """
+    Ramp-up lengths rounded to whole weeks, as a float ndarray.
 
-# Rotate x-axis labels for better readability
-plt.xticks(rotation=45)
+    The closed forms above sum throughput week by week, which only
+    matches the week-by-week simulation for whole-week ramps.
+    """
+    import numpy as np
 
-return projections
+    return np.rint(np.asarray(ramp_up_weeks, dtype=float))
 
 
-def create_summary_table(projections, total_repos):
-"""
-Create a summary table of completion timelines.
-"""
-summary_data = []
-
-
-for label, data in projections.items():
-    rate = int(label.split()[0])
-    completion_date = data['completion_date']
-    weeks_to_complete = data['weeks_to_complete']
-    months_to_complete = weeks_to_complete / 4.33  # Average weeks per month
-    
-    summary_data.append({
-        'Rate (repos/week)': rate,
-        'Weeks to Complete': f'{weeks_to_complete:.0f}',
-        'Months to Complete': f'{months_to_complete:.1f}',
-        'Completion Date': completion_date.strftime('%Y-%m-%d'),
-        'Repos per Day': f'{rate/7:.1f}'
-    })
+def cumulative_repos(total_repos, rates, weeks, ramp_up_weeks=0):
+    """
+    Repos enabled after each week, as a (scenarios x weeks) array.
+    """
+    import numpy as np
 
-return pd.DataFrame(summary_data)
+    rates = np.asarray(rates, dtype=float)[:, None]
+    ramp = np.broadcast_to(ramp_weeks(ramp_up_weeks), rates.shape[:1])[:, None]
+    weeks = np.asarray(weeks, dtype=float)[None, :]
 
+    with np.errstate(divide='ignore', invalid='ignore'):
+        within_ramp = rates * weeks * (weeks + 1) / (2 * ramp)
+    after_ramp = rates * ((ramp + 1) / 2 + weeks - ramp)
+    enabled = np.where(ramp <= 0, rates * weeks, np.where(weeks <= ramp, within_ramp, after_ramp))
+    return np.minimum(enabled, total_repos)
 
-def plot_weekly_workload(rates=[5, 10, 15, 20], figsize=(10, 6)):
-"""
-Create a bar chart showing weekly workload for different rates.
-"""
-plt.figure(figsize=figsize)
 
+def week_dates(start_date, weeks):
+    """
+    Dates `weeks` (array) weeks after `start_date`, as a DatetimeIndex.
+    """
+    import numpy as np
+    import pandas as pd
 
-# Create data
-weeks_data = []
-repos_per_day_data = []
+    offsets = np.asarray(weeks, dtype='int64') * np.timedelta64(7, 'D')
+    return pd.DatetimeIndex(np.datetime64(pd.Timestamp(start_date), 'ns') + offsets)
 
-for rate in rates:
-    weeks_data.append(2500 / rate)
-    repos_per_day_data.append(rate / 7)
 
-# Create subplots
-fig, (ax1, ax2) = plt.subplots(1, 2, figsize=figsize)
+def scenario_grid(total_repos, rates, ramp_up_weeks=(0,), start_date=None):
+    """
+    Evaluate every rate x ramp-up combination in one batch.
 
-# Plot 1: Weeks to completion
-bars1 = ax1.bar(range(len(rates)), weeks_data, color='steelblue', alpha=0.7)
-ax1.set_xlabel('Rate (repos/week)')
-ax1.set_ylabel('Weeks to Complete')
-ax1.set_title('Time to Complete Rollout')
-ax1.set_xticks(range(len(rates)))
-ax1.set_xticklabels([f'{r}/week' for r in rates])
+    Args:
+        total_repos (int): Total number of repositories
+        rates (array-like): Repos per week rates
+        ramp_up_weeks (array-like): Ramp-up lengths in weeks
+        start_date (datetime): Start date for the rollout (default: today)
 
-# Add value labels on bars
-for bar, weeks in zip(bars1, weeks_data):
-    height = bar.get_height()
-    ax1.text(bar.get_x() + bar.get_width()/2., height + 1,
-            f'{weeks:.0f}w\n({weeks/4.33:.1f}m)', 
-            ha='center', va='bottom', fontsize=9)
+    Returns:
+        DataFrame with one row per scenario
+    """
+    import numpy as np
+    import pandas as pd
 
-# Plot 2: Daily workload
-bars2 = ax2.bar(range(len(rates)), repos_per_day_data, color='orange', alpha=0.7)
-ax2.set_xlabel('Rate (repos/week)')
-ax2.set_ylabel('Repos per Day')
-ax2.set_title('Daily Workload')
-ax2.set_xticks(range(len(rates)))
-ax2.set_xticklabels([f'{r}/week' for r in rates])
+    if start_date is None:
+        start_date = datetime.now()
 
-# Add value labels on bars
-for bar, daily in zip(bars2, repos_per_day_data):
-    height = bar.get_height()
-    ax2.text(bar.get_x() + bar.get_width()/2., height + 0.05,
-            f'{daily:.1f}', ha='center', va='bottom', fontsize=9)
+    rate_grid, ramp_grid = np.meshgrid(np.asarray(rates, dtype=float), np.asarray(ramp_up_weeks, dtype=float), indexing='ij')
+    rate_grid, ramp_grid = rate_grid.ravel(), ramp_grid.ravel()
+    weeks = weeks_to_complete(total_repos, rate_grid, ramp_grid)
+
+    return pd.DataFrame({
+        'rate': rate_grid,
+        'ramp_up_weeks': ramp_grid,
+        'weeks_to_complete': weeks,
+        'months_to_complete': weeks / WEEKS_PER_MONTH,
+        'repos_per_day': rate_grid / 7,
+        'completion_date': week_dates(start_date, weeks),
+    })
 
-plt.tight_layout()
-return fig
 
+def simulate_throughput(total_repos, rates, cv=0.25, ramp_up_weeks=0, runs=10000, seed=None, horizon=None):
+    """
+    Monte Carlo completion times with variable weekly throughput.
+
+    Each simulated week enables a normally distributed number of repos
+    (mean: the scenario's rate, scaled during ramp-up; standard deviation:
+    cv * mean; never negative). All (scenario, run) rows are simulated
+    together, in chunks of rows advanced a block of weeks at a time until
+    every run in the chunk has finished.
+
+    Args:
+        total_repos (int): Total number of repositories
+        rates (array-like): Mean repos per week, one per scenario
+        cv (float or array-like): Coefficient of variation of weekly throughput
+        ramp_up_weeks (float or array-like): Ramp-up length in weeks
+        runs (int): Simulated rollouts per scenario
+        seed (int): Random seed, for reproducible runs
+        horizon (int): Weeks simulated (default: well past the slowest expected completion)
+
+    Returns:
+        (scenarios x runs) float ndarray of completion weeks (NaN if not done within the horizon)
+    """
+    import numpy as np
+
+    rates = np.atleast_1d(np.asarray(rates, dtype=float))
+    cv = np.broadcast_to(np.asarray(cv, dtype=float), rates.shape)
+    ramp = np.broadcast_to(ramp_weeks(ramp_up_weeks), rates.shape)
+    if horizon is None:
+        horizon = int(np.max(weeks_to_complete(total_repos, rates, ramp) * (1 + 4 * np.maximum(cv, 0.25)))) + 1
+
+    rng = np.random.default_rng(seed)
+    weeks = np.arange(1, horizon + 1, dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        ramp_factor = np.where(ramp[:, None] > 0, np.minimum(1.0, weeks[None, :] / ramp[:, None]), 1.0)
+    means = rates[:, None] * ramp_factor
+
+    completion = np.full(len(rates) * runs, np.nan)
+    rows_per_chunk = max(1, MONTE_CARLO_CELLS // MONTE_CARLO_BLOCK)
+    for first in range(0, len(rates) * runs, rows_per_chunk):
+        rows = np.arange(first, min(first + rows_per_chunk, len(rates) * runs))
+        scenario = rows // runs
+        enabled = np.zeros(len(rows))
+        # step through the horizon a block of weeks at a time, dropping finished runs
+        active = np.arange(len(rows))
+        for week in range(0, horizon, MONTE_CARLO_BLOCK):
+            mean = means[scenario[active], week:week + MONTE_CARLO_BLOCK]
+            throughput = np.maximum(rng.normal(mean, mean * cv[scenario[active]][:, None]), 0)
+            cumulative = enabled[active][:, None] + np.cumsum(throughput, axis=1)
+            done = cumulative >= total_repos
+            finished = done.any(axis=1)
+            completion[rows[active[finished]]] = week + done[finished].argmax(axis=1) + 1
+            enabled[active] = cumulative[:, -1]
+            active = active[~finished]
+            if not active.size:
+                break
+    return completion.reshape(len(rates), runs)
+
+
+def summarize_simulation(rates, completion, percentiles=(50, 80, 95)):
+    """
+    Percentiles of simulated completion weeks per scenario.
+    """
+    import numpy as np
+    import pandas as pd
+
+    summary = pd.DataFrame({'rate': np.atleast_1d(rates)})
+    for p in percentiles:
+        summary[f'p{p} weeks'] = np.nanpercentile(completion, p, axis=1)
+    summary['not finished'] = np.isnan(completion).mean(axis=1)
+    return summary
+
+
+def create_rollout_projection(total_repos, rates_per_week, start_date=None, ramp_up_weeks=0):
+    """
+    Create a projection of repository feature rollout progress.
+
+    Args:
+        total_repos (int): Total number of repositories
+        rates_per_week (list): List of repos per week rates to compare
+        start_date (datetime): Start date for the rollout (default: today)
+        ramp_up_weeks (int): Weeks of linear ramp-up before full rate
+
+    Returns:
+        dict of projections for each rate
+    """
+    import numpy as np
+
+    if start_date is None:
+        start_date = datetime.now()
+
+    weeks_needed = weeks_to_complete(total_repos, rates_per_week, ramp_up_weeks)
+    all_weeks = np.arange(0, weeks_needed.max() + 1)
+    enabled = cumulative_repos(total_repos, rates_per_week, all_weeks, ramp_up_weeks)
+    dates = week_dates(start_date, all_weeks)
+
+    results = {}
+    for i, rate in enumerate(rates_per_week):
+        n = int(weeks_needed[i]) + 1
+        results[f'{rate} per week'] = {
+            'dates': dates[:n],
+            'repos_enabled': enabled[i, :n],
+            'completion_date': dates[n - 1],
+            'weeks_to_complete': weeks_needed[i]
+        }
+
+    return results
+
+
+def plot_rollout_comparison(total_repos=DEFAULT_TOTAL_REPOS, rates=[5, 10, 15, 20],
+                            start_date=None, figsize=(12, 8), ramp_up_weeks=0):
+    """
+    Create visualization comparing different rollout rates.
+    """
+    import numpy as np
+    import matplotlib.pyplot as plt
+
+    # Generate projections
+    projections = create_rollout_projection(total_repos, rates, start_date, ramp_up_weeks)
+
+    # Set up the plot
+    plt.figure(figsize=figsize)
+
+    # Color palette
+    colors = plt.cm.Set1(np.linspace(0, 1, len(rates)))
+
+    # Plot each rate scenario
+    for i, (label, data) in enumerate(projections.items()):
+        plt.plot(data['dates'], data['repos_enabled'],
+                 label=label, linewidth=2.5, color=colors[i])
+
+        # Add completion point marker
+        plt.scatter(data['completion_date'], total_repos,
+                    color=colors[i], s=80, zorder=5)
+
+    # Formatting
+    plt.axhline(y=total_repos, color='red', linestyle='--', alpha=0.7,
+                label=f'Target: {total_repos} repos')
+
+    plt.xlabel('Date', fontsize=12)
+    plt.ylabel('Repositories Enabled', fontsize=12)
+    plt.title(f'Feature Rollout Progress Projection\n({total_repos:,} Total Repositories)',
+              fontsize=14, fontweight='bold')
+
+    plt.grid(True, alpha=0.3)
+    plt.legend(bbox_to_anchor=(1.05, 1), loc='upper left')
+    plt.tight_layout()
+
+    # Format y-axis to show thousands
+    plt.gca().yaxis.set_major_formatter(plt.FuncFormatter(lambda x, p: f'{x:,.0f}'))
 
-# Example usage and demonstration
+    # Rotate x-axis labels for better readability
+    plt.xticks(rotation=45)
 
-if **name** == “**main**”:
-# Set style
-plt.style.use(‘default’)
-sns.set_palette(“husl”)
-
-
-# Example 1: Main projection chart
-print("Creating rollout projection visualization...")
-projections = plot_rollout_comparison(
-    total_repos=2500, 
-    rates=[5, 8, 10, 15, 20],
-    start_date=datetime(2024, 1, 1)
-)
-plt.show()
-
-# Example 2: Summary table
-print("\nRollout Summary:")
-summary = create_summary_table(projections, 2500)
-print(summary.to_string(index=False))
-
-# Example 3: Workload comparison
-print("\nCreating workload comparison...")
-plot_weekly_workload([5, 8, 10, 15, 20])
-plt.show()
-
-# Example 4: Interactive scenario planning
-def quick_scenario(rate, total=2500):
-    weeks = np.ceil(total / rate)
-    months = weeks / 4.33
+    return projections
+
+
+def create_summary_table(projections, total_repos):
+    """
+    Create a summary table of completion timelines.
+    """
+    import pandas as pd
+
+    summary_data = []
+
+    for label, data in projections.items():
+        rate = float(label.split()[0])
+        rate = int(rate) if rate.is_integer() else rate
+        completion_date = data['completion_date']
+        weeks_to_complete = data['weeks_to_complete']
+        months_to_complete = weeks_to_complete / WEEKS_PER_MONTH  # Average weeks per month
+
+        summary_data.append({
+            'Rate (repos/week)': rate,
+            'Weeks to Complete': f'{weeks_to_complete:.0f}',
+            'Months to Complete': f'{months_to_complete:.1f}',
+            'Completion Date': completion_date.strftime('%Y-%m-%d'),
+            'Repos per Day': f'{rate/7:.1f}'
+        })
+
+    return pd.DataFrame(summary_data)
+
+
+def plot_weekly_workload(rates=[5, 10, 15, 20], figsize=(10, 6), total_repos=DEFAULT_TOTAL_REPOS, ramp_up_weeks=0):
+    """
+    Create a bar chart showing weekly workload for different rates.
+    """
+    import numpy as np
+    import matplotlib.pyplot as plt
+
+    # Create data
+    weeks_data = weeks_to_complete(total_repos, rates, ramp_up_weeks)
+    repos_per_day_data = np.asarray(rates, dtype=float) / 7
+
+    # Create subplots
+    fig, (ax1, ax2) = plt.subplots(1, 2, figsize=figsize)
+
+    # Plot 1: Weeks to completion
+    bars1 = ax1.bar(range(len(rates)), weeks_data, color='steelblue', alpha=0.7)
+    ax1.set_xlabel('Rate (repos/week)')
+    ax1.set_ylabel('Weeks to Complete')
+    ax1.set_title('Time to Complete Rollout')
+    ax1.set_xticks(range(len(rates)))
+    ax1.set_xticklabels([f'{r}/week' for r in rates])
+
+    # Add value labels on bars
+    for bar, weeks in zip(bars1, weeks_data):
+        height = bar.get_height()
+        ax1.text(bar.get_x() + bar.get_width()/2., height + 1,
+                 f'{weeks:.0f}w\n({weeks/WEEKS_PER_MONTH:.1f}m)',
+                 ha='center', va='bottom', fontsize=9)
+
+    # Plot 2: Daily workload
+    bars2 = ax2.bar(range(len(rates)), repos_per_day_data, color='orange', alpha=0.7)
+    ax2.set_xlabel('Rate (repos/week)')
+    ax2.set_ylabel('Repos per Day')
+    ax2.set_title('Daily Workload')
+    ax2.set_xticks(range(len(rates)))
+    ax2.set_xticklabels([f'{r}/week' for r in rates])
+
+    # Add value labels on bars
+    for bar, daily in zip(bars2, repos_per_day_data):
+        height = bar.get_height()
+        ax2.text(bar.get_x() + bar.get_width()/2., height + 0.05,
+                 f'{daily:.1f}', ha='center', va='bottom', fontsize=9)
+
+    plt.tight_layout()
+    return fig
+
+
+def plot_scenario_grid(grid, figsize=(10, 6)):
+    """
+    Weeks to complete against rate, one line per ramp-up length.
+    """
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=figsize)
+    for ramp, scenarios in grid.groupby('ramp_up_weeks'):
+        ax.plot(scenarios['rate'], scenarios['weeks_to_complete'], label=f'{ramp:.0f} week ramp-up')
+    ax.set_xlabel('Rate (repos/week)')
+    ax.set_ylabel('Weeks to Complete')
+    ax.set_yscale('log')
+    ax.set_title(f'Completion Time Across {len(grid):,} Scenarios')
+    ax.grid(True, alpha=0.3)
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def plot_monte_carlo(rates, completion, figsize=(10, 6)):
+    """
+    Histogram of simulated completion weeks for each rate.
+    """
+    import numpy as np
+    import matplotlib.pyplot as plt
+
+    fig, ax = plt.subplots(figsize=figsize)
+    for rate, weeks in zip(rates, completion):
+        weeks = weeks[~np.isnan(weeks)]
+        ax.hist(weeks, bins=np.arange(weeks.min(), weeks.max() + 2) - 0.5, alpha=0.5, label=f'{rate} per week')
+    ax.set_xlabel('Weeks to Complete')
+    ax.set_ylabel('Simulated Rollouts')
+    ax.set_title(f'Completion Time with Variable Weekly Throughput ({completion.shape[1]:,} runs each)')
+    ax.legend()
+    fig.tight_layout()
+    return fig
+
+
+def completion_weeks(total_repos, rate, ramp_up_weeks=0):
+    """
+    Scalar weeks_to_complete() in plain arithmetic, for the text summary.
+    """
+    ramp_up_weeks = round(ramp_up_weeks)
+    if ramp_up_weeks <= 0:
+        weeks = total_repos / rate
+    elif rate * (ramp_up_weeks + 1) / 2 >= total_repos:
+        weeks = (math.sqrt(1 + 8 * ramp_up_weeks * total_repos / rate) - 1) / 2
+    else:
+        weeks = total_repos / rate + (ramp_up_weeks - 1) / 2
+    return float(math.ceil(round(weeks, 9)))
+
+
+def summary_records(total_repos, rates, start_date=None, ramp_up_weeks=0):
+    """
+    Completion timeline per rate as plain dicts (no NumPy/pandas), for text or JSON output.
+    """
+    if start_date is None:
+        start_date = datetime.now()
+
+    records = []
+    for rate in rates:
+        weeks = completion_weeks(total_repos, rate, ramp_up_weeks)
+        records.append({
+            'rate': rate,
+            'weeks_to_complete': weeks,
+            'months_to_complete': round(weeks / WEEKS_PER_MONTH, 1),
+            'completion_date': (start_date + timedelta(weeks=weeks)).strftime('%Y-%m-%d'),
+            'repos_per_day': round(rate / 7, 1),
+        })
+    return records
+
+
+def format_summary(records):
+    """
+    Text table of summary_records(), laid out like create_summary_table().
+    """
+    headers = ['Rate (repos/week)', 'Weeks to Complete', 'Months to Complete', 'Completion Date', 'Repos per Day']
+    rows = [[f"{record['rate']:g}", f"{record['weeks_to_complete']:.0f}", f"{record['months_to_complete']:.1f}",
+             record['completion_date'], f"{record['repos_per_day']:.1f}"] for record in records]
+    widths = [max(len(header), *(len(row[i]) for row in rows)) for i, header in enumerate(headers)]
+    lines = [' '.join(header.rjust(width) for header, width in zip(headers, widths))]
+    lines.extend(' '.join(cell.rjust(width) for cell, width in zip(row, widths)) for row in rows)
+    return '\n'.join(lines)
+
+
+def quick_scenario(rate, total=DEFAULT_TOTAL_REPOS):
+    weeks = math.ceil(total / rate)
+    months = weeks / WEEKS_PER_MONTH
     daily = rate / 7
     print(f"\nScenario: {rate} repos/week")
     print(f"  Time to complete: {weeks:.0f} weeks ({months:.1f} months)")
     print(f"  Daily workload: {daily:.1f} repos/day")
     print(f"  Completion date: {(datetime.now() + timedelta(weeks=weeks)).strftime('%Y-%m-%d')}")
 
-print("\n" + "="*50)
-print("QUICK SCENARIO ANALYSIS")
-print("="*50)
-for rate in [5, 10, 15]:
-    quick_scenario(rate)
+
+def build_chart(chart, options):
+    """
+    Draw one chart from the CLI options and return its figure.
+    """
+    import matplotlib.pyplot as plt
+
+    if chart == 'rollout':
+        plot_rollout_comparison(options['total'], options['rates'], options['start_date'],
+                                ramp_up_weeks=options['ramp_up'][0])
+        return plt.gcf()
+    if chart == 'workload':
+        return plot_weekly_workload(options['rates'], total_repos=options['total'], ramp_up_weeks=options['ramp_up'][0])
+    if chart == 'scenarios':
+        grid = scenario_grid(options['total'], options['grid_rates'], options['ramp_up'], options['start_date'])
+        return plot_scenario_grid(grid)
+    if chart == 'monte_carlo':
+        completion = simulate_throughput(options['total'], options['rates'], options['cv'], options['ramp_up'][0],
+                                         options['runs'], options['seed'])
+        return plot_monte_carlo(options['rates'], completion)
+    raise ValueError(f'unknown chart "{chart}"')
+
+
+def render_chart(chart, options, output_dir, formats):
+    """
+    Render one chart headlessly (Agg backend) to a file per format; returns the paths.
+    """
+    import matplotlib.pyplot as plt
+
+    plt.switch_backend('Agg')
+    fig = build_chart(chart, options)
+    paths = []
+    for fmt in formats:
+        path = os.path.join(output_dir, f'{chart}.{fmt}')
+        fig.savefig(path, format=fmt, bbox_inches='tight')
+        paths.append(path)
+    plt.close('all')
+    return paths
+
+
+def render_charts(charts, options, output_dir, formats=('png',), workers=1):
+    """
+    Render charts to files in `output_dir`, one chart per worker process.
+    """
+    from concurrent.futures import ProcessPoolExecutor
+
+    os.makedirs(output_dir, exist_ok=True)
+    if workers <= 1:
+        return [path for chart in charts for path in render_chart(chart, options, output_dir, formats)]
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(charts))) as pool:
+        futures = [pool.submit(render_chart, chart, options, output_dir, formats) for chart in charts]
+        return [path for future in futures for path in future.result()]
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description='Project feature rollout timelines')
+    parser.add_argument('--total', type=int, default=DEFAULT_TOTAL_REPOS, help='total number of repositories')
+    parser.add_argument('--rates', type=float, nargs='+', default=DEFAULT_RATES, help='repos per week rates to compare')
+    parser.add_argument('--ramp-up', dest='ramp_up', type=int, nargs='+', default=[0], help='ramp-up lengths in whole weeks (charts use the first)')
+    parser.add_argument('--start-date', dest='start_date', default='2024-01-01', help='rollout start date (YYYY-MM-DD)')
+    parser.add_argument('--grid-rates', dest='grid_rates', type=float, nargs=2, default=[1, 100], metavar=('LOW', 'HIGH'), help='range of rates for the scenario grid')
+    parser.add_argument('--grid-step', dest='grid_step', type=float, default=0.1, help='rate step for the scenario grid')
+    parser.add_argument('--grid-csv', dest='grid_csv', default=None, help='write every rate x ramp-up scenario to this CSV file')
+    parser.add_argument('--monte-carlo', dest='runs', type=int, default=0, help='simulated rollouts per rate with variable throughput')
+    parser.add_argument('--cv', type=float, default=0.25, help='coefficient of variation of weekly throughput')
+    parser.add_argument('--seed', type=int, default=None, help='random seed for the simulation')
+    parser.add_argument('--headless', dest='output_dir', default=None, help='render charts to files in this directory instead of showing them')
+    parser.add_argument('--formats', nargs='+', choices=['png', 'svg', 'pdf'], default=['png'], help='file formats for --headless')
+    parser.add_argument('--charts', nargs='+', choices=CHARTS, default=None, help='charts to draw (default: all applicable)')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes rendering charts (--headless)')
+    parser.add_argument('--summary', choices=['text', 'json'], default=None, help='only print the completion summary (no NumPy, pandas or matplotlib)')
+    return parser.parse_args()
+
+
+# Example usage and demonstration
+
+if __name__ == "__main__":
+    args = parse_args()
+    start_date = datetime.strptime(args.start_date, '%Y-%m-%d')
+    rates = [int(rate) if float(rate).is_integer() else rate for rate in args.rates]
+
+    # numbers only: plain arithmetic, none of the plotting/DataFrame stack
+    if args.summary is not None:
+        records = summary_records(args.total, rates, start_date, args.ramp_up[0])
+        if args.summary == 'json':
+            print(json.dumps({
+                'total_repos': args.total,
+                'start_date': start_date.strftime('%Y-%m-%d'),
+                'ramp_up_weeks': args.ramp_up[0],
+                'scenarios': records,
+            }, indent=4))
+        else:
+            print(format_summary(records))
+        raise SystemExit(0)
+
+    import matplotlib.pyplot as plt
+    import numpy as np
+    import seaborn as sns
+
+    low, high = args.grid_rates
+    options = {
+        'total': args.total,
+        'rates': rates,
+        'ramp_up': args.ramp_up,
+        'start_date': start_date,
+        'grid_rates': np.arange(low, high + args.grid_step / 2, args.grid_step),
+        'cv': args.cv,
+        'runs': args.runs,
+        'seed': args.seed,
+    }
+    charts = args.charts or [chart for chart in CHARTS if chart != 'monte_carlo' or args.runs]
+
+    # Set style
+    plt.style.use('default')
+    sns.set_palette("husl")
+
+    # Example 1: Summary table
+    print("\nRollout Summary:")
+    projections = create_rollout_projection(args.total, options['rates'], start_date, args.ramp_up[0])
+    summary = create_summary_table(projections, args.total)
+    print(summary.to_string(index=False))
+
+    # Example 2: Scenario grid, evaluated in one batch
+    grid = scenario_grid(args.total, options['grid_rates'], args.ramp_up, start_date)
+    print(f"\nEvaluated {len(grid):,} scenarios: {grid['weeks_to_complete'].min():.0f}-{grid['weeks_to_complete'].max():.0f} weeks")
+    if args.grid_csv:
+        grid.to_csv(args.grid_csv, index=False)
+        print(f"Wrote scenario grid to {args.grid_csv}")
+
+    # Example 3: Monte Carlo simulation of variable weekly throughput
+    if args.runs:
+        completion = simulate_throughput(args.total, options['rates'], args.cv, args.ramp_up[0], args.runs, args.seed)
+        print(f"\nMonte Carlo ({args.runs:,} runs per rate, cv={args.cv}):")
+        print(summarize_simulation(options['rates'], completion).to_string(index=False))
+
+    # Example 4: Charts, shown interactively or rendered to files
+    if args.output_dir:
+        print(f"\nRendering {', '.join(charts)} to {args.output_dir}...")
+        for path in render_charts(charts, options, args.output_dir, args.formats, args.workers):
+            print(f"  {path}")
+    else:
+        for chart in charts:
+            print(f"\nCreating {chart} visualization...")
+            build_chart(chart, options)
+            plt.show()
+
+    # Example 5: Interactive scenario planning
+    print("\n" + "="*50)
+    print("QUICK SCENARIO ANALYSIS")
+    print("="*50)
+    for rate in [5, 10, 15]:
+        quick_scenario(rate, args.total)
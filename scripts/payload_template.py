@@ -0,0 +1,113 @@
+'''
+    Author: Adam Wilson https://github.com/lightbroker
+
+    Purpose:
+        Compiled JSON request templates for payload delivery.
+
+        A template is a captured, legitimate JSON request with placeholders
+        inside its string values (or keys):
+            $$$         the default placeholder, named "payload"
+            $$name$$    a named placeholder, e.g. $$user$$
+
+        The template is serialized once and split at the placeholders,
+        so rendering a message is a single join of the literal pieces
+        and the JSON-escaped payload values. Payloads are streamed from
+        their lists (text or binary, see wordlist_format.py), so memory
+        stays flat regardless of list length.
+
+    Usage:
+        from payload_template import PayloadTemplate, iter_messages
+
+        template = PayloadTemplate.from_file('template.json')
+        template.render({'payload': '<script>alert(1)</script>'})
+
+        for message in iter_messages(template, {'payload': 'payloads.txt'}):
+            ...
+'''
+
+import json
+import re
+
+from wordlist_format import iter_wordlist
+
+
+DEFAULT_PLACEHOLDER = 'payload'
+PLACEHOLDER_PATTERN = re.compile(r'\$\$\$|\$\$(\w+)\$\$')
+
+
+class PayloadTemplate:
+
+    def __init__(self, template):
+        text = json.dumps(template)
+
+        self.literals = []
+        self.slots = []
+        position = 0
+        for match in PLACEHOLDER_PATTERN.finditer(text):
+            self.literals.append(text[position:match.start()])
+            self.slots.append(match[1] or DEFAULT_PLACEHOLDER)
+            position = match.end()
+        self.literals.append(text[position:])
+
+        # placeholder names, in order of first appearance
+        self.names = list(dict.fromkeys(self.slots))
+
+
+    @classmethod
+    def from_file(cls, template_file):
+        with open(template_file, 'r') as f:
+            return cls(json.load(f))
+
+
+    def render(self, values):
+        '''
+            Returns the template as a JSON string with each placeholder
+            replaced by its (JSON-escaped) value from `values`.
+        '''
+        escaped = {name: json.dumps(values[name])[1:-1] for name in self.names}
+        pieces = [self.literals[0]]
+        for slot, literal in zip(self.slots, self.literals[1:]):
+            pieces.append(escaped[slot])
+            pieces.append(literal)
+        return ''.join(pieces)
+
+
+def iter_payload_sets(payload_files, mode='pitchfork'):
+    '''
+        Lazily yields {name: payload} dicts from one payload list per name.
+
+        pitchfork     the i-th payload of every list together (stops at the shortest)
+        clusterbomb   every combination; inner lists are re-streamed, not held in memory
+    '''
+    names = list(payload_files)
+
+    if mode == 'pitchfork':
+        for values in zip(*(iter_wordlist(payload_files[name]) for name in names)):
+            yield dict(zip(names, values))
+        return
+
+    if mode != 'clusterbomb':
+        raise ValueError(f'unknown payload mode "{mode}"')
+
+    def combinations(depth, chosen):
+        if depth == len(names):
+            yield dict(chosen)
+            return
+        name = names[depth]
+        for value in iter_wordlist(payload_files[name]):
+            chosen[name] = value
+            yield from combinations(depth + 1, chosen)
+
+    yield from combinations(0, {})
+
+
+def iter_messages(template, payload_files, mode='pitchfork'):
+    '''
+        Returns a lazy iterator of rendered messages. Placeholders without
+        a payload list are reported here rather than on first use.
+    '''
+    missing = [name for name in template.names if name not in payload_files]
+    if missing:
+        raise ValueError(f'no payload list given for placeholder(s): {", ".join(missing)}')
+
+    return (template.render(values) for values in iter_payload_sets(payload_files, mode))
@@ -7,54 +7,142 @@
 
     Usage:
         $ python ./prefix_builder.py 3 file/path.txt --repeat_alpha=True
-        
+        $ python ./prefix_builder.py 5 - | some_tool
+        $ python ./prefix_builder.py 6 file/path.txt --checkpoint=run.ckpt
+        $ python ./prefix_builder.py 6 file/path.txt --shard=3/8 --workers=4
+        $ python ./prefix_builder.py 6 file/path.wl --format=binary
+
     Parameters:
-        1. Numeric argument specifies the length 
+        1. Numeric argument specifies the length
             of each permutation in the list.
 
         2. File path (string) specifies the target
-            file for writing the resulting permutations.
+            file for writing the resulting permutations
+            ("-" writes to stdout).
 
         3. --repeat_alpha
-            Create permutations with letter repetition (e.g., "aa1").
+            Allow characters to repeat (e.g., "aa1"): every product of the
+            alphabet instead of every permutation. Each candidate is
+            generated exactly once. For per-position charsets and
+            DNS/bucket validity rules, see mask_builder.py.
+
+        4. --start / --stop
+            Only generate the [start, stop) slice of the keyspace.
+
+        5. --checkpoint
+            Record progress to the given file. Re-running the same
+            command resumes from the last completed block.
+
+        6. --count
+            Print the size of the keyspace and exit.
+
+        7. --shard
+            Only generate shard i of N (0-based) of the keyspace, e.g.
+            "--shard=3/8". Shards are disjoint, contiguous index ranges,
+            so N machines can split a run with no other coordination.
+
+        8. --workers / --split_files
+            Generate across a pool of worker processes. Output is merged
+            in keyspace order into the target file, or written to one
+            "<file>.shard-<i>-of-<N>" file per worker with --split_files.
+
+        9. --format
+            "text" (default, newline-delimited) or "binary", the fixed
+            width wordlist format read by wordlist_format.Wordlist.
 '''
 
+import argparse
+import os
 import string
 import sys
-from itertools import permutations
 
+from keyspace import Checkpoint, Keyspace, open_output, parse_shard, shard_range, write_parallel
+from wordlist_format import pack_header
+
+
+def should_repeat_alpha(repeat_alpha):
+    return repeat_alpha == 'True'
 
-perm_length = sys.argv[1]
-file_path = sys.argv[2]
-repeat_alpha = sys.argv[3]
 
-if perm_length.isdigit() == False:
-    print(f'"{perm_length}" is not a digit.')
-    exit()
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Create a list of all permutations of digits and lowercase letters')
+    parser.add_argument('perm_length', help='length of each permutation in the list')
+    parser.add_argument('file_path', help='target file for the resulting permutations ("-" for stdout)')
+    parser.add_argument('--repeat_alpha', default='False', help='create permutations with letter repetition (True/False)')
+    parser.add_argument('--start', type=int, default=0, help='first keyspace index to generate')
+    parser.add_argument('--stop', type=int, default=None, help='keyspace index to stop before')
+    parser.add_argument('--checkpoint', default=None, help='progress file used to resume an interrupted run')
+    parser.add_argument('--count', action='store_true', help='print the keyspace size and exit')
+    parser.add_argument('--shard', default=None, help='only generate shard i/N (0-based) of the keyspace')
+    parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    parser.add_argument('--split_files', action='store_true', help='write one output file per worker instead of merging')
+    parser.add_argument('--format', choices=['text', 'binary'], default='text', help='output format')
+    args = parser.parse_args()
 
-perm_length_int = int(perm_length)
+    if args.perm_length.isdigit() == False:
+        print(f'"{args.perm_length}" is not a digit.')
+        exit()
+
+    items = string.ascii_lowercase + string.digits
+
+    repeat = should_repeat_alpha(args.repeat_alpha)
+    if repeat:
+        print('repeating alpha', file=sys.stderr)
+
+    binary = args.format == 'binary'
+    keyspace = Keyspace(items, int(args.perm_length), repeat=repeat, newline=not binary)
+
+    if args.count:
+        print(keyspace.count)
+        exit()
+
+    start = args.start
+    stop = keyspace.count if args.stop is None else min(args.stop, keyspace.count)
+    if args.shard is not None:
+        try:
+            start, stop = shard_range(start, stop, *parse_shard(args.shard))
+        except ValueError as e:
+            print(e)
+            exit()
+
+    header = pack_header(stop - start, items, keyspace.length, keyspace.length) if binary else b''
+
+    if args.workers > 1:
+        if args.checkpoint is not None:
+            print('--checkpoint is not supported with --workers; use --shard to split runs instead.')
+            exit()
+        if binary and args.split_files:
+            print('--split_files is not supported with --format=binary; use --shard to split runs instead.')
+            exit()
+        try:
+            with open_output(args.file_path) as list_file:
+                list_file.write(header)
+            write_parallel(keyspace, args.file_path, args.workers, start, stop, args.split_files, append=True)
+        except BrokenPipeError:
+            os._exit(0)
+        exit()
+
+    checkpoint = None
+    append = False
+    if args.checkpoint is not None:
+        checkpoint = Checkpoint(args.checkpoint)
+        resume_index = checkpoint.load()
+        if resume_index is not None and args.file_path != '-':
+            # drop anything written after the last recorded block
+            with open(args.file_path, 'a') as f:
+                f.truncate(len(header) + (resume_index - start) * keyspace.line_width)
+            print(f'resuming at index {resume_index} of {keyspace.count}', file=sys.stderr)
+            start = resume_index
+            append = True
 
-def should_repeat_alpha():
     try:
-        if not repeat_alpha.startswith('--repeat_alpha'):
-            return False
-        arg_value = repeat_alpha.split('=')[1]
-        if arg_value == 'True':
-            return True
-        elif arg_value == 'False':
-            return False
-        else:
-            return False
-    except:
-        return False
-
-items = string.ascii_lowercase + string.digits
-
-if should_repeat_alpha():
-    print('repeating alpha')
-    items = items + string.ascii_lowercase
-
-with open(file_path, 'w') as list_file:
-    for p in permutations(items, perm_length_int):
-        perm = ''.join(p)
-        list_file.write(f'{perm}\n')
+        with open_output(args.file_path, append=append) as list_file:
+            if not append:
+                list_file.write(header)
+            keyspace.write(list_file, start, stop, checkpoint)
+    except BrokenPipeError:
+        # downstream consumer closed the pipe early
+        os._exit(0)
+
+    if checkpoint is not None:
+        checkpoint.clear()
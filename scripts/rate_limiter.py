@@ -0,0 +1,38 @@
+'''
+    Author: Adam Wilson https://github.com/lightbroker
+
+    Purpose:
+        Shared asyncio rate ceiling for the network runners
+        (websockets_runner.py, reconnaissance/dns_interrogation/dns_brute.py).
+
+    Usage:
+        from rate_limiter import RateLimiter
+
+        limiter = RateLimiter(200)
+        await limiter.wait()
+'''
+
+import asyncio
+import time
+
+
+class RateLimiter:
+    '''
+        Spaces calls to `wait()` at least 1 / rate seconds apart, across all callers.
+    '''
+
+    def __init__(self, rate):
+        self.interval = 1.0 / rate if rate else 0.0
+        self._next = 0.0
+        self._lock = asyncio.Lock()
+
+
+    async def wait(self):
+        if not self.interval:
+            return
+        async with self._lock:
+            now = time.monotonic()
+            if self._next > now:
+                await asyncio.sleep(self._next - now)
+                now = self._next
+            self._next = now + self.interval
@@ -0,0 +1,301 @@
+'''
+    DNS Brute-Force Subdomain Enumeration
+    Author: Adam Wilson, https://github.com/lightbroker
+
+    Usage (from the repository root):
+        python -m scripts.reconnaissance.dns_interrogation.dns_brute -d example.com -n 198.51.100.53 -l hostlist.txt
+        python scripts/prefix_builder.py 3 - | python -m scripts.reconnaissance.dns_interrogation.dns_brute -d example.com -n 127.0.0.1:5353 -l -
+
+    Streams candidate labels from a hostlist (or stdin, e.g. a generated
+    keyspace) and queries <label>.<domain> directly against the domain's
+    authoritative name servers with the in-process resolver (A and AAAA,
+    no recursion). The hostlist is read on a separate thread, so a slow
+    pipe never stalls queries in flight. Each name server gets a bounded
+    number of outstanding queries and all queries share a rate ceiling.
+    Random labels are first queried against every name server to detect
+    wildcard records; hits that only resolve to wildcard addresses and
+    CNAME targets are dropped. Hits are appended to a JSON lines
+    file as they arrive. Labels that can't form a valid DNS name (empty
+    parts, over 63 characters, over 255 octets in all) are skipped and
+    counted as invalid without being queried.
+
+    With --tried, labels already queried against the domain in earlier
+    runs (see tried_store.py) are skipped, and every label answered by
+    the name servers is recorded there.
+
+    Only run this against domains you are authorized to test.
+'''
+
+import argparse
+import asyncio
+import json
+import queue
+import random
+import string
+import sys
+import threading
+import time
+
+from ...rate_limiter import RateLimiter
+from ...tried_store import TriedStore
+from .dns_resolver import RCODE_NOERROR, RCODE_NXDOMAIN, TYPE_A, TYPE_AAAA, TYPE_CNAME, DnsResolver, is_valid_name, parse_server
+
+
+# labels read ahead of the queries
+HOSTLIST_BUFFER = 4096
+
+
+def iter_hostlist(hostlist_filename):
+    '''
+        Lazily yields candidate labels from a file (or stdin for "-"), skipping blanks and comments.
+    '''
+    f = sys.stdin if hostlist_filename == '-' else open(hostlist_filename, 'r')
+    try:
+        for line in f:
+            label = line.strip()
+            if label and not label.startswith('#'):
+                yield label
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def _read_labels(candidates, buffer):
+    # reader thread: iterating may block (stdin, a slow generator), so it
+    # happens here; ends with None, or the exception that stopped it
+    try:
+        for label in candidates:
+            buffer.put(label)
+        buffer.put(None)
+    except BaseException as e:
+        buffer.put(e)
+
+
+def _take_labels(buffer, limit):
+    '''
+        Waits (briefly) for the next buffered label, then takes up to `limit`
+        - 1 more that are already there; returns [] if none arrived.
+    '''
+    try:
+        labels = [buffer.get(timeout=0.5)]
+    except queue.Empty:
+        return []
+    while len(labels) < limit and labels[-1] is not None:
+        try:
+            labels.append(buffer.get_nowait())
+        except queue.Empty:
+            break
+    return labels
+
+
+class DnsBrute:
+
+    def __init__(self, domain, nameservers, max_outstanding=32, rate=None, timeout=2.0, retries=1,
+                 wildcard_probes=3, progress_every=10000, tried=None):
+        if not nameservers:
+            raise ValueError('at least one authoritative name server is required')
+        self.domain = domain.strip('.')
+        self.nameservers = [parse_server(server) for server in nameservers]
+        self.max_outstanding = max_outstanding
+        self.rate = rate
+        self.resolver = DnsResolver(nameservers, timeout=timeout, retries=retries)
+        self.wildcard_probes = wildcard_probes
+        self.progress_every = progress_every
+        # optional tried_store.BloomFilter of labels already queried for this domain
+        self.tried = tried
+
+        # one slot per outstanding query, per name server (A and AAAA count separately)
+        self._outstanding = {}
+
+        self.wildcard_addresses = set()
+        self.wildcard_cnames = set()
+        self.queried = 0
+        self.hits = 0
+        self.failed = 0
+        self.skipped = 0
+        self.invalid = 0
+
+
+    async def lookup(self, name, server, limiter):
+        '''
+            Returns {"name", "ipv4", "ipv6", "cname"} for a name that exists, otherwise None.
+        '''
+        return (await self._lookup(name, server, limiter))[0]
+
+
+    async def _lookup(self, name, server, limiter):
+        # (record or None, number of queries that failed)
+        slots = self._outstanding.setdefault(server, asyncio.Semaphore(self.max_outstanding))
+
+        async def query(qtype):
+            async with slots:
+                await limiter.wait()
+                return await self.resolver.query(name, qtype, server, recursion=False)
+
+        responses = await asyncio.gather(query(TYPE_A), query(TYPE_AAAA), return_exceptions=True)
+        record = {"name": name, "ipv4": [], "ipv6": [], "cname": []}
+        failures = 0
+        for response in responses:
+            if isinstance(response, BaseException):
+                failures += 1
+                continue
+            if response["rcode"] == RCODE_NXDOMAIN:
+                continue
+            if response["rcode"] != RCODE_NOERROR:
+                # SERVFAIL, REFUSED, ...: the server gave no answer, so the label isn't tried yet
+                failures += 1
+                continue
+            for _, rtype, _, value in response["answers"]:
+                if rtype == TYPE_A:
+                    record["ipv4"].append(value)
+                elif rtype == TYPE_AAAA:
+                    record["ipv6"].append(value)
+                elif rtype == TYPE_CNAME and value not in record["cname"]:
+                    record["cname"].append(value)
+
+        self.failed += failures
+        if record["ipv4"] or record["ipv6"] or record["cname"]:
+            return record, failures
+        return None, failures
+
+
+    async def detect_wildcard(self, limiter):
+        '''
+            Queries random labels against every name server (a wildcard may
+            exist on only some of them) and collects the addresses and CNAME
+            targets they answer with.
+        '''
+        async def probe(server):
+            label = ''.join(random.choices(string.ascii_lowercase + string.digits, k=16))
+            return server, await self.lookup(f'{label}.{self.domain}', server, limiter)
+
+        servers = set()
+        probes = [probe(server) for server in self.nameservers for _ in range(self.wildcard_probes)]
+        for server, record in await asyncio.gather(*probes):
+            if record is not None:
+                servers.add(server)
+                self.wildcard_addresses.update(record["ipv4"] + record["ipv6"])
+                self.wildcard_cnames.update(record["cname"])
+        if servers:
+            print(f'wildcard records detected for *.{self.domain} on {len(servers)}/{len(self.nameservers)} name servers: '
+                  f'{sorted(self.wildcard_addresses | self.wildcard_cnames)}')
+
+
+    def is_wildcard(self, record):
+        if not (self.wildcard_addresses or self.wildcard_cnames):
+            return False
+        return set(record["ipv4"] + record["ipv6"]) <= self.wildcard_addresses and set(record["cname"]) <= self.wildcard_cnames
+
+
+    async def _worker(self, server, labels, limiter, on_hit, started):
+        while True:
+            label = await labels.get()
+            if label is None:
+                return
+            name = f'{label}.{self.domain}'
+            if not is_valid_name(name):
+                self.invalid += 1
+                continue
+            record, failures = await self._lookup(name, server, limiter)
+            self.queried += 1
+            if self.tried is not None and not failures:
+                self.tried.add(label)
+            if record is not None and not self.is_wildcard(record):
+                self.hits += 1
+                on_hit(record)
+            if self.progress_every and self.queried % self.progress_every == 0:
+                elapsed = time.monotonic() - started
+                print(f'{self.queried} names queried, {self.hits} hits, {self.failed} failed queries, {self.queried / elapsed:.0f} names/s')
+
+
+    async def _produce(self, candidates, labels, workers):
+        buffer = queue.Queue(HOSTLIST_BUFFER)
+        threading.Thread(target=_read_labels, args=(candidates, buffer), daemon=True).start()
+        loop = asyncio.get_running_loop()
+        while True:
+            for label in await loop.run_in_executor(None, _take_labels, buffer, HOSTLIST_BUFFER):
+                if isinstance(label, BaseException):
+                    raise label
+                if label is None:
+                    for _ in range(workers):
+                        await labels.put(None)
+                    return
+                await labels.put(label)
+
+
+    async def run_async(self, candidates, on_hit):
+        limiter = RateLimiter(self.rate)
+        started = time.monotonic()
+        tasks = []
+        try:
+            await self.detect_wildcard(limiter)
+
+            # every worker pulls from the same queue, fed from the reader
+            # thread; each name server is served by max_outstanding workers,
+            # whose A and AAAA queries share its max_outstanding slots
+            if self.tried is not None:
+                candidates = self._untried(candidates)
+            labels = asyncio.Queue(maxsize=len(self.nameservers) * self.max_outstanding * 2)
+            tasks = [
+                asyncio.create_task(self._worker(server, labels, limiter, on_hit, started))
+                for server in self.nameservers
+                for _ in range(self.max_outstanding)
+            ]
+            tasks.append(asyncio.create_task(self._produce(candidates, labels, len(tasks))))
+            # a failed worker or hostlist stops the run instead of leaving the rest waiting
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.resolver.close()
+
+
+    def _untried(self, candidates):
+        for label in candidates:
+            if label in self.tried:
+                self.skipped += 1
+            else:
+                yield label
+
+
+    def run(self, candidates, results_filename):
+        '''
+            Brute forces every candidate label, appending hits to a JSON lines file.
+        '''
+        with open(results_filename, 'a') as f:
+            def on_hit(record):
+                print(f'found: {record["name"]} {record["ipv4"] + record["ipv6"] + record["cname"]}')
+                f.write(json.dumps(record) + '\n')
+                f.flush()
+
+            asyncio.run(self.run_async(candidates, on_hit))
+
+        print(f'{self.queried} names queried, {self.hits} hits, {self.failed} failed queries')
+        if self.invalid:
+            print(f'{self.invalid} labels skipped as invalid DNS names')
+        if self.tried is not None:
+            print(f'{self.skipped} names skipped as already tried')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Brute force subdomains against authoritative name servers")
+    parser.add_argument("-d", dest="domain", required=True, help="Domain to enumerate (e.g. example.com)")
+    parser.add_argument("-n", dest="nameservers", action="append", required=True, help="Authoritative name server, e.g. 198.51.100.53 or 127.0.0.1:5353 (repeatable)")
+    parser.add_argument("-l", dest="hostlist", required=True, help="A list of candidate labels (filename, or - for stdin)")
+    parser.add_argument("-o", dest="output", default=None, help="JSON lines file for hits (default: dns-brute.<domain>.jsonl)")
+    parser.add_argument("-c", dest="max_outstanding", type=int, default=32, help="Maximum outstanding queries per name server")
+    parser.add_argument("--qps", dest="rate", type=float, default=None, help="Ceiling on queries per second across all name servers")
+    parser.add_argument("--timeout", dest="timeout", type=float, default=2.0, help="Per-query timeout in seconds")
+    parser.add_argument("--tried", dest="tried_store", default=None, help="Tried store directory: skip labels queried in earlier runs and record new ones")
+    args = parser.parse_args()
+
+    store = TriedStore(args.tried_store) if args.tried_store else None
+    tried = store.open(args.domain.strip('.'), 'dns-brute') if store else None
+    brute = DnsBrute(args.domain, args.nameservers, args.max_outstanding, args.rate, args.timeout, tried=tried)
+    try:
+        brute.run(iter_hostlist(args.hostlist), args.output or f'dns-brute.{args.domain}.jsonl')
+    finally:
+        if store is not None:
+            store.close()
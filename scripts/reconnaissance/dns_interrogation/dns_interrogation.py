@@ -4,14 +4,21 @@
     
     *** run as sudo
 
-    Usage:
-        sudo python ./dns_interrogation.py -h
+    Usage (from the repository root):
+        sudo python -m scripts.reconnaissance.dns_interrogation.dns_interrogation -h
 
     Given a supplied hostname:
-        1.) discovers authoritative DNS/name servers via `whois`
-        2.) determines IP addresses of those servers via `host`
-        3.) uses Nmap NSE script dns-brute to automate DNS enumeration, given a provided list 
-
+        1.) discovers authoritative DNS/name servers via `whois` (cached
+            on disk per registrable domain, see domain_cache.py)
+        2.) determines IP addresses of those servers (A/AAAA, looked up
+            concurrently by the in-process resolver in dns_resolver.py)
+        3.) brute forces subdomains from a provided list directly against
+            those servers (see dns_brute.py), streaming hits to JSON lines;
+            with --tried, labels already tried for the domain are skipped
+
+    Given many hostnames (-t repeated, or -f), they are grouped by
+    registrable domain (eTLD+1): whois runs once per domain, and every
+    hostname is then interrogated with the shared name server list.
 '''
 
 import argparse
@@ -19,66 +26,95 @@ import calendar
 import json
 import subprocess
 import time
-import tldextract
 
-from ip_address_extraction import IpAddressExtraction
+from ...tried_store import TriedStore
+from ..process_runner import check_result, run_process
+from .dns_brute import DnsBrute, iter_hostlist
+from .dns_resolver import DnsResolver
+from .domain_cache import DEFAULT_WHOIS_TTL, WhoisCache, group_by_domain, registrable_domain
+from .ip_address_set import IpAddressSet
 
 
 class DnsInterrogation:
-    def __init__(self):
-        self.results = {
-            "hostname": None,
-            "tld_plus1": None,
-            "authoritative_dns": {
-                "ipv4": [],
-                "ipv6": [],
-            }
-        }
+    def __init__(self, resolvers=None, timeout=2.0, max_outstanding=32, rate=None, whois_timeout=60.0,
+                 whois_cache=None, tried_store=None):
+        self.resolvers = resolvers
+        self.whois_timeout = whois_timeout
+        # optional domain_cache.WhoisCache of name servers per eTLD+1
+        self.whois_cache = whois_cache
+        # optional tried_store.TriedStore; brute force skips labels already tried per domain
+        self.tried_store = tried_store
+        self.timeout = timeout
+        self.max_outstanding = max_outstanding
+        self.rate = rate
+        self.results = None
+        # whois name servers per eTLD+1 already looked up by this instance
+        self._name_servers = {}
+
+    def name_servers(self, tld_plus1):
+        '''
+            Returns the name servers listed by whois for a registrable domain,
+            from an earlier lookup by this instance or the cache when fresh.
+        '''
+        if tld_plus1 in self._name_servers:
+            return self._name_servers[tld_plus1]
+        if self.whois_cache is not None:
+            cached = self.whois_cache.get(tld_plus1)
+            if cached is not None:
+                print(f'using cached whois name servers for {tld_plus1}: {cached}')
+                self._name_servers[tld_plus1] = cached
+                return cached
+
+        # Run the whois command to get Name Server hostnames
+        whois_output = check_result(run_process(["whois", tld_plus1], self.whois_timeout))["output"]
+
+        # Extract and parse Name Server hostnames
+        name_servers = {}
+        for line in whois_output.splitlines():
+            if "Name Server:" in line:
+                name_server = line.split(":")[1].strip()
+                print(f'discovered name server: {name_server}')
+                name_servers[name_server] = None
+
+        if self.whois_cache is not None:
+            self.whois_cache.put(tld_plus1, name_servers)
+        self._name_servers[tld_plus1] = list(name_servers)
+        return self._name_servers[tld_plus1]
 
     def run(self, hostname, hostlist_filename):
         try:
             print(f'checking whois for {hostname}')
-            
-            self.results["hostname"] = hostname
+
+            self.results = {
+                "hostname": hostname,
+                "tld_plus1": None,
+                "authoritative_dns": {
+                    "ipv4": [],
+                    "ipv6": [],
+                }
+            }
 
             # extract eTLD+1
-            extract_result = tldextract.extract(hostname)
-            tld_plus1 = f'{extract_result.domain}.{extract_result.suffix}'
+            tld_plus1 = registrable_domain(hostname)
+            if tld_plus1 is None:
+                print(f'no registrable domain in hostname: \"{hostname}\"')
+                return
             self.results["tld_plus1"] = tld_plus1
             print(f'using domain: \"{tld_plus1}\" from hostname: \"{hostname}\"')
 
-            # Run the whois command to get Name Server hostnames
-            whois_output = subprocess.check_output(["whois", tld_plus1], universal_newlines=True)
+            name_servers = self.name_servers(tld_plus1)
             authoritative_dns = self.results["authoritative_dns"]
-            ipv4_list = authoritative_dns["ipv4"]
-            ipv6_list = authoritative_dns["ipv6"]
-
-            # Extract and parse Name Server hostnames
-            name_servers = []
-            for line in whois_output.splitlines():
-                if "Name Server:" in line:
-                    name_server = line.split(":")[1].strip()
-                    print(f'discovered name server: {name_server}')
-                    if name_server not in name_servers:
-                        name_servers.append(name_server)
-
-            # Run the host command on each Name Server
-            for ns in name_servers:
-                host_output = subprocess.check_output(["host", ns], universal_newlines=True)
-
-                # Extract and parse IP addresses
-                for line in host_output.splitlines():
-                    print(f'attempting to extract IP address from line: \"{line}\"')
-
-                    ipv4_address = IpAddressExtraction(line).get_ipv4_address()
-                    if ipv4_address is not None:
-                        if ipv4_address not in ipv4_list:
-                            ipv4_list.append(ipv4_address)
-
-                    ipv6_address = IpAddressExtraction(line).get_ipv6_address()
-                    if ipv6_address is not None:
-                        if ipv6_address not in ipv6_list:
-                            ipv6_list.append(ipv6_address)
+            addresses = IpAddressSet()
+
+            # Resolve every Name Server concurrently
+            resolver = DnsResolver(self.resolvers, timeout=self.timeout)
+            for ns, records in resolver.resolve_many(name_servers).items():
+                print(f'resolved name server {ns}: {records}')
+                addresses.update((4, address) for address in records["ipv4"])
+                addresses.update((6, address) for address in records["ipv6"])
+
+            ipv4_list = authoritative_dns["ipv4"] = addresses.addresses(4)
+            authoritative_dns["ipv6"] = addresses.addresses(6)
 
             print("Authoritative DNS results:")
             print(self.results)
@@ -89,32 +125,66 @@ class DnsInterrogation:
                 results_json = json.dumps(self.results, indent = 4)
                 f.write(results_json)
 
-            # Nmap NSE dns-brute
-            nmap_cmd = [
-                "nmap",
-                "--dns-servers",
-                ','.join(ipv4_list),
-                "--script",
-                "dns-brute",
-                "--script-args",
-                f"dns-brute.domain={tld_plus1},dns-brute.hostlist={hostlist_filename}",
-                "-oX",
-                f"nmap.script.dns-brute.{tld_plus1}.xml"
-            ]
-
-            dnsbrute_output = subprocess.check_output(nmap_cmd)
-            print(dnsbrute_output.decode('utf-8'))
-
-        except subprocess.CalledProcessError as e:
+            # brute force subdomains against the authoritative servers
+            if hostlist_filename is not None and not ipv4_list:
+                print('no authoritative name server addresses found; skipping brute force')
+            elif hostlist_filename is not None:
+                tried = self.tried_store.open(tld_plus1, 'dns-brute') if self.tried_store is not None else None
+                dns_brute = DnsBrute(tld_plus1, ipv4_list, self.max_outstanding, self.rate, self.timeout, tried=tried)
+                dns_brute.run(iter_hostlist(hostlist_filename), f'dns-brute.{tld_plus1}.{timestamp}.jsonl')
+
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
             print(f"Error executing command: {e}")
         except Exception as e:
             print(f"An error occurred: {e}")
 
+    def run_batch(self, hostnames, hostlist_filename):
+        '''
+            Groups hostnames by registrable domain and interrogates every
+            hostname, running whois only once per domain.
+        '''
+        groups, ungrouped = group_by_domain(hostnames)
+        for hostname in ungrouped:
+            print(f'no registrable domain in hostname: \"{hostname}\"; skipping')
+        for tld_plus1, members in groups.items():
+            print(f'{tld_plus1}: {len(members)} hostname(s)')
+            for hostname in members:
+                self.run(hostname, hostlist_filename)
+
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="DNS Interrogation Tool")
-    parser.add_argument("-t", dest="target", help="Target hostname to interrogate")
-    parser.add_argument("-l", dest="hostlist", help="A list of hosts for Nmap NSE dns-brute (filename)")
+    parser.add_argument("-t", dest="targets", action="append", default=[], help="Target hostname to interrogate (repeatable)")
+    parser.add_argument("-f", dest="target_file", default=None, help="File of target hostnames, one per line; grouped by registrable domain")
+    parser.add_argument("-l", dest="hostlist", help="A list of hosts to brute force (filename, or - for stdin)")
+    parser.add_argument("-r", dest="resolvers", action="append", default=None, help="Resolver used to look up name server addresses, e.g. 127.0.0.1:5353 (repeatable, default: /etc/resolv.conf)")
+    parser.add_argument("--timeout", dest="timeout", type=float, default=2.0, help="Per-query DNS timeout in seconds")
+    parser.add_argument("-c", dest="max_outstanding", type=int, default=32, help="Maximum outstanding brute force queries per name server")
+    parser.add_argument("--qps", dest="rate", type=float, default=None, help="Ceiling on brute force queries per second")
+    parser.add_argument("--whois-timeout", dest="whois_timeout", type=float, default=60.0, help="Timeout in seconds for the whois lookup")
+    parser.add_argument("--whois-cache", dest="whois_cache", default="whois_cache.json", help="JSON file caching whois name servers per registrable domain")
+    parser.add_argument("--whois-ttl", dest="whois_ttl", type=float, default=DEFAULT_WHOIS_TTL, help="Seconds before a cached whois result expires (0 disables reuse)")
+    parser.add_argument("--tried", dest="tried_store", default=None, help="Tried store directory: skip brute force labels queried in earlier runs")
     args = parser.parse_args()
-    dns_interrogation = DnsInterrogation()
-    dns_interrogation.run(args.target, args.hostlist)
+
+    targets = list(args.targets)
+    if args.target_file is not None:
+        with open(args.target_file, 'r') as f:
+            targets.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    if not targets:
+        parser.error('a target hostname (-t) or target file (-f) is required')
+    if args.hostlist == '-' and len(targets) > 1:
+        parser.error('every target is brute forced with the hostlist, so it must be a file (stdin can only be read once)')
+
+    whois_cache = WhoisCache(args.whois_cache, args.whois_ttl)
+    tried_store = TriedStore(args.tried_store) if args.tried_store else None
+    dns_interrogation = DnsInterrogation(args.resolvers, args.timeout, args.max_outstanding, args.rate, args.whois_timeout,
+                                         whois_cache, tried_store)
+    try:
+        if len(targets) == 1:
+            dns_interrogation.run(targets[0], args.hostlist)
+        else:
+            dns_interrogation.run_batch(targets, args.hostlist)
+    finally:
+        if tried_store is not None:
+            tried_store.close()
@@ -0,0 +1,294 @@
+'''
+    Minimal in-process asyncio DNS client (UDP, A/AAAA/NS/CNAME).
+
+    Queries are multiplexed over one UDP socket per address family and
+    matched to responses by transaction ID, so any number of lookups can
+    be in flight at once, each with its own timeout. No `host`/`dig`
+    processes are forked and no text output is parsed.
+
+    Usage:
+        from dns_resolver import DnsResolver
+
+        resolver = DnsResolver(nameservers=['127.0.0.1:5353'], timeout=2.0)
+        print(resolver.resolve_many(['ns1.example.com', 'ns2.example.com']))
+'''
+
+import asyncio
+import ipaddress
+import random
+import socket
+import struct
+
+
+TYPE_A = 1
+TYPE_NS = 2
+TYPE_CNAME = 5
+TYPE_AAAA = 28
+CLASS_IN = 1
+
+RCODE_NOERROR = 0
+RCODE_SERVFAIL = 2
+RCODE_NXDOMAIN = 3
+RCODE_REFUSED = 5
+RCODE_NAMES = {1: 'FORMERR', 2: 'SERVFAIL', 4: 'NOTIMP', 5: 'REFUSED'}
+
+HEADER = struct.Struct('!HHHHHH')
+RECORD = struct.Struct('!HHIH')
+
+
+def encode_name(name):
+    '''
+        Encodes a domain name in wire format; raises ValueError for an
+        empty or over-long label or a name over 255 octets.
+    '''
+    encoded = b''
+    for label in name.strip('.').split('.'):
+        try:
+            label = label.encode('idna') if not label.isascii() else label.encode('ascii')
+        except UnicodeError:
+            raise ValueError(f'invalid DNS label in "{name}"')
+        if not 0 < len(label) < 64:
+            raise ValueError(f'invalid DNS label in "{name}"')
+        encoded += bytes([len(label)]) + label
+    encoded += b'\0'
+    if len(encoded) > 255:
+        raise ValueError(f'DNS name "{name}" is too long')
+    return encoded
+
+
+def is_valid_name(name):
+    try:
+        encode_name(name)
+    except ValueError:
+        return False
+    return True
+
+
+def build_query(name, qtype, query_id, recursion=True):
+    flags = 0x0100 if recursion else 0
+    question = encode_name(name) + struct.pack('!HH', qtype, CLASS_IN)
+    return HEADER.pack(query_id, flags, 1, 0, 0, 0) + question
+
+
+def read_name(data, offset):
+    '''
+        Decodes a (possibly compressed) domain name; returns (name, offset after it).
+    '''
+    labels = []
+    end = None
+    for _ in range(128):
+        length = data[offset]
+        if length & 0xC0 == 0xC0:
+            if end is None:
+                end = offset + 2
+            offset = ((length & 0x3F) << 8) | data[offset + 1]
+            continue
+        offset += 1
+        if length == 0:
+            return '.'.join(labels), end if end is not None else offset
+        labels.append(data[offset:offset + length].decode('ascii', 'replace'))
+        offset += length
+    raise ValueError('DNS name compression loop')
+
+
+def parse_response(data):
+    '''
+        Returns a dict with the transaction id, rcode, question name and
+        answer records as (name, type, ttl, value) tuples.
+    '''
+    query_id, flags, qdcount, ancount, _, _ = HEADER.unpack_from(data)
+    offset = HEADER.size
+
+    question = None
+    for _ in range(qdcount):
+        question, offset = read_name(data, offset)
+        offset += 4
+
+    answers = []
+    for _ in range(ancount):
+        name, offset = read_name(data, offset)
+        rtype, _, ttl, rdlength = RECORD.unpack_from(data, offset)
+        offset += RECORD.size
+        rdata = data[offset:offset + rdlength]
+        if rtype == TYPE_A and rdlength == 4:
+            value = str(ipaddress.IPv4Address(rdata))
+        elif rtype == TYPE_AAAA and rdlength == 16:
+            value = ipaddress.IPv6Address(rdata).compressed
+        elif rtype in (TYPE_NS, TYPE_CNAME):
+            value = read_name(data, offset)[0]
+        else:
+            value = rdata
+        answers.append((name, rtype, ttl, value))
+        offset += rdlength
+
+    return {
+        "id": query_id,
+        "rcode": flags & 0x000F,
+        "truncated": bool(flags & 0x0200),
+        "question": question,
+        "answers": answers,
+    }
+
+
+def system_nameservers(resolv_conf='/etc/resolv.conf'):
+    nameservers = []
+    try:
+        with open(resolv_conf, 'r') as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0] == 'nameserver':
+                    nameservers.append(parts[1])
+    except OSError:
+        pass
+    return nameservers or ['127.0.0.1']
+
+
+def parse_server(server, default_port=53):
+    '''
+        Accepts "1.2.3.4", "1.2.3.4:5353", "2001:db8::1", "[2001:db8::1]:5353"
+        or a hostname such as "ns1.example.com:5353" (resolved on first use).
+    '''
+    if server.startswith('['):
+        host, _, port = server[1:].partition(']:')
+        return host.rstrip(']'), int(port or default_port)
+    if server.count(':') == 1:
+        host, port = server.split(':')
+        return host, int(port)
+    return server, default_port
+
+
+class _DnsProtocol(asyncio.DatagramProtocol):
+
+    def __init__(self):
+        self.pending = {}
+
+
+    def datagram_received(self, data, addr):
+        try:
+            response = parse_response(data)
+        except (ValueError, IndexError, struct.error):
+            return
+        future = self.pending.get((response["id"], addr[0], addr[1]))
+        if future is not None and not future.done():
+            future.set_result(response)
+
+
+    def error_received(self, exc):
+        # e.g. ICMP port unreachable; the affected queries simply time out
+        pass
+
+
+class DnsResolver:
+
+    def __init__(self, nameservers=None, timeout=2.0, retries=1):
+        self.nameservers = [parse_server(server) for server in (nameservers or system_nameservers())]
+        self.timeout = timeout
+        self.retries = retries
+        self._endpoints = {}
+        self._addresses = {}
+
+
+    async def _endpoint(self, family):
+        if family not in self._endpoints:
+            loop = asyncio.get_running_loop()
+            local = ('::', 0) if family == socket.AF_INET6 else ('0.0.0.0', 0)
+            self._endpoints[family] = await loop.create_datagram_endpoint(_DnsProtocol, local_addr=local, family=family)
+        return self._endpoints[family]
+
+
+    async def _address(self, host):
+        '''
+            Returns the IP address of a name server given by address or
+            hostname; hostnames are looked up once, with the system resolver.
+        '''
+        if host not in self._addresses:
+            try:
+                address = ipaddress.ip_address(host)
+            except ValueError:
+                try:
+                    infos = await asyncio.get_running_loop().getaddrinfo(host, None, type=socket.SOCK_DGRAM)
+                except OSError as e:
+                    raise ValueError(f'cannot resolve name server "{host}": {e}')
+                address = ipaddress.ip_address(infos[0][4][0])
+            self._addresses[host] = address.compressed
+        return self._addresses[host]
+
+
+    async def query(self, name, qtype, server=None, recursion=True):
+        '''
+            Sends one query (to `server`, a (host, port) tuple, if given) and
+            returns the parsed response; raises asyncio.TimeoutError once
+            every retry has timed out.
+        '''
+        for attempt in range(self.retries + 1):
+            # without an explicit server, retries rotate through the configured ones
+            host, port = server or self.nameservers[attempt % len(self.nameservers)]
+            host = await self._address(host)
+            family = socket.AF_INET6 if ':' in host else socket.AF_INET
+            transport, protocol = await self._endpoint(family)
+
+            query_id = random.getrandbits(16)
+            while (query_id, host, port) in protocol.pending:
+                query_id = random.getrandbits(16)
+            key = (query_id, host, port)
+            future = asyncio.get_running_loop().create_future()
+            protocol.pending[key] = future
+            try:
+                transport.sendto(build_query(name, qtype, query_id, recursion), (host, port))
+                response = await asyncio.wait_for(future, self.timeout)
+                if response["question"] is not None and response["question"].lower() != name.strip('.').lower():
+                    raise ValueError(f'mismatched DNS response for {name}')
+                return response
+            except asyncio.TimeoutError:
+                if attempt == self.retries:
+                    raise
+            finally:
+                protocol.pending.pop(key, None)
+
+
+    async def resolve(self, name, server=None):
+        '''
+            Looks up A and AAAA records concurrently. A timeout or an
+            error response (SERVFAIL, REFUSED, ...) sets "error"; NXDOMAIN
+            is just an empty result.
+        '''
+        results = {"ipv4": [], "ipv6": []}
+        responses = await asyncio.gather(
+            self.query(name, TYPE_A, server),
+            self.query(name, TYPE_AAAA, server),
+            return_exceptions=True,
+        )
+        for response in responses:
+            if isinstance(response, BaseException):
+                results["error"] = 'timeout' if isinstance(response, asyncio.TimeoutError) else str(response)
+                continue
+            if response["rcode"] not in (RCODE_NOERROR, RCODE_NXDOMAIN):
+                results["error"] = RCODE_NAMES.get(response["rcode"], f'rcode {response["rcode"]}')
+                continue
+            for _, rtype, _, value in response["answers"]:
+                if rtype == TYPE_A:
+                    results["ipv4"].append(value)
+                elif rtype == TYPE_AAAA:
+                    results["ipv6"].append(value)
+        return results
+
+
+    async def resolve_many_async(self, names):
+        try:
+            resolved = await asyncio.gather(*(self.resolve(name) for name in names))
+            return dict(zip(names, resolved))
+        finally:
+            self.close()
+
+
+    def resolve_many(self, names):
+        '''
+            Resolves every name concurrently; wall time is that of the slowest lookup.
+        '''
+        return asyncio.run(self.resolve_many_async(list(names)))
+
+
+    def close(self):
+        for transport, _ in self._endpoints.values():
+            transport.close()
+        self._endpoints = {}
@@ -0,0 +1,102 @@
+'''
+    Registrable-domain (eTLD+1) extraction and an on-disk whois cache.
+
+    The public suffix list is the snapshot bundled with tldextract: it is
+    never fetched over the network and is loaded once per process, and
+    lookups are memoized. Whois name-server results are kept in a JSON
+    file keyed by eTLD+1 and reused until their TTL expires, so
+    interrogating many hostnames under a few registrable domains forks
+    `whois` once per domain. Failed or empty lookups are never cached.
+'''
+
+import json
+import os
+import time
+from functools import lru_cache
+
+import tldextract
+
+
+DEFAULT_WHOIS_TTL = 24 * 60 * 60
+
+_extractor = None
+
+
+def get_extractor():
+    '''
+        Returns the process-wide offline extractor (bundled suffix list, no network, no disk cache).
+    '''
+    global _extractor
+    if _extractor is None:
+        _extractor = tldextract.TLDExtract(suffix_list_urls=(), cache_dir=None)
+    return _extractor
+
+
+@lru_cache(maxsize=65536)
+def registrable_domain(hostname):
+    '''
+        Returns the eTLD+1 of a hostname (e.g. example.co.uk for a.example.co.uk), or None if it has none.
+    '''
+    result = get_extractor()(hostname.strip().rstrip('.').lower())
+    if not result.domain or not result.suffix:
+        return None
+    return f'{result.domain}.{result.suffix}'
+
+
+def group_by_domain(hostnames):
+    '''
+        Returns ({eTLD+1: [hostnames]}, [hostnames without one]), both in input order.
+    '''
+    groups = {}
+    ungrouped = []
+    for hostname in hostnames:
+        domain = registrable_domain(hostname)
+        if domain is None:
+            ungrouped.append(hostname)
+        else:
+            groups.setdefault(domain, []).append(hostname)
+    return groups, ungrouped
+
+
+class WhoisCache:
+    '''
+        {eTLD+1: {"name_servers": [...], "fetched": unix time}} persisted as one JSON file.
+    '''
+
+    def __init__(self, path='whois_cache.json', ttl=DEFAULT_WHOIS_TTL):
+        self.path = path
+        self.ttl = ttl
+        try:
+            with open(path, 'r') as f:
+                self.entries = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.entries = {}
+
+
+    def get(self, domain):
+        '''
+            Returns the cached name servers for a domain, or None if missing or expired.
+        '''
+        entry = self.entries.get(domain)
+        if entry is None or time.time() - entry["fetched"] > self.ttl:
+            return None
+        return entry["name_servers"]
+
+
+    def put(self, domain, name_servers):
+        '''
+            Caches a domain's name servers. An empty result is not cached
+            (it is usually a transient whois failure or rate limit), so the
+            next run asks whois again.
+        '''
+        if not name_servers:
+            return
+        self.entries[domain] = {"name_servers": list(name_servers), "fetched": time.time()}
+        self.save()
+
+
+    def save(self):
+        temp_path = f'{self.path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(self.entries, f, indent=4, sort_keys=True)
+        os.replace(temp_path, self.path)
@@ -1,34 +1,103 @@
+import ipaddress
 import re
 
 
+# Compiled once per process. A single scan over the buffer picks out
+# runs of hex digits, dots and colons (plus an optional IPv6 zone id)
+# that are not part of a longer word, e.g. the "Bee::Add" in
+# "xBee::Add" or "feed::add" in "self::feed::add", and, within words,
+# runs of digits and dots that may hold a dotted quad ("addr:10.0.0.1").
+# Each run is then validated and normalized with `ipaddress`, which
+# checks octet ranges and group counts far more cheaply than the
+# full-blown IPv6 regex could on every position of the input.
+candidate_pattern = re.compile(
+    r'(?<![0-9A-Za-z:.])[0-9A-Fa-f:.]{3,}(?:%[0-9A-Za-z]+)?(?![0-9A-Za-z:.%])'
+    r'|[0-9.]{7,}'
+)
+
+# dotted quads within a candidate run (not part of a longer dotted run, e.g. 1.2.3.4.5)
+ipv4_pattern = re.compile(r'(?<![\d.])(?:\d{1,3}\.){3}\d{1,3}(?!\d|\.\d)')
+
+
+def normalize_ipv4(candidate):
+    '''
+        Returns a dotted quad unchanged if every octet is in range (and has
+        no leading zero, as `ipaddress` requires), otherwise None.
+    '''
+    octets = candidate.split('.')
+    if len(octets) != 4:
+        return None
+    for octet in octets:
+        if not octet.isdigit() or int(octet) > 255 or (len(octet) > 1 and octet[0] == '0'):
+            return None
+    return candidate
+
+
+def normalize_ipv6(candidate):
+    '''
+        Returns the compressed form of an IPv6 address, or None if it is invalid.
+    '''
+    # cheap rejection of times, MAC addresses, etc. before parsing
+    colons = candidate.count(':')
+    if colons < 2 or (colons < 6 and '::' not in candidate):
+        return None
+    # hex-letter identifiers joined by "::" (C++/Rust paths such as
+    # abc::def) parse as addresses, but real ones practically always have a digit
+    if not any(character.isdigit() for character in candidate.partition('%')[0]):
+        return None
+    try:
+        return ipaddress.IPv6Address(candidate).compressed
+    except ValueError:
+        return None
+
+
+def iter_addresses(text):
+    '''
+        Scans a buffer (any number of lines) once, yielding (4, address)
+        and (6, address) tuples for every valid, normalized match in order.
+    '''
+    for match in candidate_pattern.finditer(text):
+        candidate = match[0]
+
+        if ':' in candidate:
+            address = normalize_ipv6(candidate.rstrip('.'))
+            if address is not None:
+                yield 6, address
+                continue
+
+        if candidate.count('.') >= 3:
+            for ipv4 in ipv4_pattern.findall(candidate):
+                address = normalize_ipv4(ipv4)
+                if address is not None:
+                    yield 4, address
+
+
+def extract_addresses(text):
+    '''
+        Returns (ipv4_addresses, ipv6_addresses) found in a buffer, in order of appearance.
+    '''
+    found = {4: [], 6: []}
+    for version, address in iter_addresses(text):
+        found[version].append(address)
+    return found[4], found[6]
+
+
 class IpAddressExtraction:
     def __init__(self, input):
         self.input = input
 
-        patterns = {
-            # Source: https://www.geeksforgeeks.org/extract-ip-address-from-file-using-python/
-            "ipv4": '(\d{1,3}\.\d{1,3}\.\d{1,3}\.\d{1,3})',
-            # Source: https://stackoverflow.com/questions/32368008/regular-expression-that-matches-all-valid-format-ipv6-addresses#answer-32368136
-            "ipv6": '(?:^|(?<=\s))(([0-9a-fA-F]{1,4}:){7,7}[0-9a-fA-F]{1,4}|([0-9a-fA-F]{1,4}:){1,7}:|([0-9a-fA-F]{1,4}:){1,6}:[0-9a-fA-F]{1,4}|([0-9a-fA-F]{1,4}:){1,5}(:[0-9a-fA-F]{1,4}){1,2}|([0-9a-fA-F]{1,4}:){1,4}(:[0-9a-fA-F]{1,4}){1,3}|([0-9a-fA-F]{1,4}:){1,3}(:[0-9a-fA-F]{1,4}){1,4}|([0-9a-fA-F]{1,4}:){1,2}(:[0-9a-fA-F]{1,4}){1,5}|[0-9a-fA-F]{1,4}:((:[0-9a-fA-F]{1,4}){1,6})|:((:[0-9a-fA-F]{1,4}){1,7}|:)|fe80:(:[0-9a-fA-F]{0,4}){0,4}%[0-9a-zA-Z]{1,}|::(ffff(:0{1,4}){0,1}:){0,1}((25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9])|([0-9a-fA-F]{1,4}:){1,4}:((25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9])\.){3,3}(25[0-5]|(2[0-4]|1{0,1}[0-9]){0,1}[0-9]))(?=\s|$)'
-        }
-
-        self.ipv4_pattern = re.compile(patterns["ipv4"])
-        self.ipv6_pattern = re.compile(patterns["ipv6"])
-
 
     def get_ipv4_address(self):
-        match = self.ipv4_pattern.search(self.input)
-        if match is not None:
-            return match[0]
+        ipv4_addresses = extract_addresses(self.input)[0]
+        if ipv4_addresses:
+            return ipv4_addresses[0]
 
 
     def get_ipv6_address(self):
-        match = self.ipv6_pattern.search(self.input)
-        if match is not None:
-            return match[0]
+        ipv6_addresses = extract_addresses(self.input)[1]
+        if ipv6_addresses:
+            return ipv6_addresses[0]
 
 
     def get_all_ipv4(self):
-        match = re.findall(self.ipv4_pattern, self.input)
-        if match is not None:
-            return match
+        return extract_addresses(self.input)[0]
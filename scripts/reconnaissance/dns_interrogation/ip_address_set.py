@@ -0,0 +1,76 @@
+import ipaddress
+from collections import Counter
+
+
+class IpAddressSet:
+    '''
+        Hash-based, insertion-ordered store of extracted addresses, with
+        the number of times each one was seen. Output can be in order of
+        first appearance, sorted numerically, or collapsed into the
+        minimal set of CIDR blocks.
+    '''
+
+    def __init__(self):
+        self.counts = {
+            4: Counter(),
+            6: Counter()
+        }
+
+
+    def add(self, version, address, count=1):
+        self.counts[version][address] += count
+
+
+    def update(self, addresses):
+        '''
+            Adds (version, address) tuples, e.g. from ip_address_extraction.iter_addresses.
+        '''
+        for version, address in addresses:
+            self.counts[version][address] += 1
+
+
+    def merge(self, other):
+        for version, counts in other.counts.items():
+            self.counts[version].update(counts)
+
+
+    def __len__(self):
+        return len(self.counts[4]) + len(self.counts[6])
+
+
+    def addresses(self, version, sort=False):
+        addresses = list(self.counts[version])
+        if sort:
+            addresses.sort(key=lambda address: int(ipaddress.ip_address(address.split('%')[0])))
+        return addresses
+
+
+    def networks(self, version):
+        '''
+            Returns (network, address count) pairs for the minimal CIDR blocks
+            covering every address (IPv6 zone ids are dropped).
+        '''
+        addresses = sorted({ipaddress.ip_address(address.split('%')[0]) for address in self.counts[version]})
+        networks = list(ipaddress.collapse_addresses(addresses))
+
+        # addresses and networks are both sorted, so count in one sweep
+        totals = Counter()
+        position = 0
+        for address in addresses:
+            while address not in networks[position]:
+                position += 1
+            totals[networks[position]] += 1
+        return [(str(network), totals[network]) for network in networks]
+
+
+    def lines(self, sort=False, cidr=False, counts=False):
+        '''
+            Yields output lines for both address families (IPv4 first).
+        '''
+        for version in (4, 6):
+            if cidr:
+                for network, total in self.networks(version):
+                    yield f'{network}\t{total}' if counts else network
+                continue
+            for address in self.addresses(version, sort):
+                yield f'{address}\t{self.counts[version][address]}' if counts else address
@@ -1,6 +1,93 @@
+'''
+    Extracts IP addresses from one or more files, directories, globs or
+    stdin ("-"). Gzip-compressed inputs are detected and decompressed.
+
+    Usage (from the repository root):
+        python -m scripts.reconnaissance.dns_interrogation.ip_addresses_from_file -f masscan.txt
+        python -m scripts.reconnaissance.dns_interrogation.ip_addresses_from_file -f 'logs/**/*.log.gz' -f nmap/ --sort --cidr
+        zcat scan.gz | python -m scripts.reconnaissance.dns_interrogation.ip_addresses_from_file -f - --counts
+
+    Inputs are streamed in fixed-size chunks (cut at line boundaries),
+    so memory use does not grow with file size. Files are spread across
+    a pool of worker processes and the per-file address sets merged.
+'''
+
 import argparse
-from ip_address_extraction import IpAddressExtraction
+import glob
+import gzip
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+
+from .ip_address_extraction import iter_addresses
+from .ip_address_set import IpAddressSet
+
+
+CHUNK_SIZE = 4 << 20
+GZIP_MAGIC = b'\x1f\x8b'
+
+
+def expand_inputs(inputs):
+    '''
+        Resolves files, directories (recursively), globs and "-" into a list of paths.
+    '''
+    paths = []
+    for item in inputs:
+        if item == '-':
+            paths.append(item)
+        elif os.path.isdir(item):
+            for root, _, files in sorted(os.walk(item)):
+                paths.extend(os.path.join(root, name) for name in sorted(files))
+        elif glob.has_magic(item):
+            paths.extend(path for path in sorted(glob.glob(item, recursive=True)) if os.path.isfile(path))
+        else:
+            paths.append(item)
+    return paths
+
 
+def open_input(path):
+    '''
+        Opens a path (or stdin for "-") as a binary stream, transparently gunzipping.
+    '''
+    if path == '-':
+        if sys.stdin.buffer.peek(2)[:2] == GZIP_MAGIC:
+            return gzip.GzipFile(fileobj=sys.stdin.buffer)
+        return sys.stdin.buffer
+
+    f = open(path, 'rb')
+    if f.peek(2)[:2] == GZIP_MAGIC:
+        f.close()
+        return gzip.open(path, 'rb')
+    return f
+
+
+def iter_chunks(f, chunk_size=CHUNK_SIZE):
+    '''
+        Yields text chunks of roughly `chunk_size` bytes that end on a line boundary.
+    '''
+    remainder = b''
+    while True:
+        data = f.read(chunk_size)
+        if not data:
+            break
+        data = remainder + data
+        cut = data.rfind(b'\n') + 1
+        if cut == 0:
+            remainder = data
+            continue
+        remainder = data[cut:]
+        # addresses are ASCII; latin-1 never fails to decode
+        yield data[:cut].decode('latin-1')
+    if remainder:
+        yield remainder.decode('latin-1')
+
+
+def extract_from_file(path):
+    addresses = IpAddressSet()
+    with open_input(path) as f:
+        for chunk in iter_chunks(f):
+            addresses.update(iter_addresses(chunk))
+    return addresses
 
 
 class IpAddressesFromFile:
@@ -10,28 +97,41 @@ class IpAddressesFromFile:
             "ipv4": [],
             "ipv6": []
         }
+        self.addresses = IpAddressSet()
 
 
-    def run(self, filename):
-        
-        ipv4_results = self.results["ipv4"]
+    def run(self, filenames, sort=False, cidr=False, counts=False, workers=None):
         
-        with open(filename, 'r') as f:
-            lines = f.read().splitlines()
+        if isinstance(filenames, str):
+            filenames = [filenames]
+        paths = expand_inputs(filenames)
+        files = [path for path in paths if path != '-']
+
+        if len(files) > 1 and workers != 1:
+            with ProcessPoolExecutor(max_workers=workers) as pool:
+                # merged in input order so first-seen ordering is deterministic
+                for addresses in pool.map(extract_from_file, files):
+                    self.addresses.merge(addresses)
+        else:
+            for path in files:
+                self.addresses.merge(extract_from_file(path))
+
+        if '-' in paths:
+            self.addresses.merge(extract_from_file('-'))
 
-        for l in lines:
-            extraction = IpAddressExtraction(l)
-            ipv4_matches = extraction.get_all_ipv4()
-            for ipv4_match in ipv4_matches:
-                if ipv4_match not in ipv4_results:
-                    ipv4_results.append(ipv4_match)
+        self.results["ipv4"] = self.addresses.addresses(4, sort)
+        self.results["ipv6"] = self.addresses.addresses(6, sort)
 
-        for result in ipv4_results:
-            print(result)
+        for line in self.addresses.lines(sort, cidr, counts):
+            print(line)
 
 if __name__ == '__main__':
     parser = argparse.ArgumentParser()
-    parser.add_argument('-f', dest='filename', help='Name of file from which to extract IP addresses')
+    parser.add_argument('-f', dest='filenames', action='append', required=True, help='File, directory, glob or - (stdin) from which to extract IP addresses (repeatable)')
+    parser.add_argument('-w', dest='workers', type=int, default=None, help='Number of worker processes (default: one per CPU)')
+    parser.add_argument('--sort', action='store_true', help='Sort addresses numerically instead of by first appearance')
+    parser.add_argument('--cidr', action='store_true', help='Collapse addresses into the minimal set of CIDR blocks')
+    parser.add_argument('--counts', action='store_true', help='Print the number of occurrences (or addresses per CIDR block) after each entry')
     args = parser.parse_args()
     ips_from_file = IpAddressesFromFile()
-    ips_from_file.run(args.filename)
+    ips_from_file.run(args.filenames, args.sort, args.cidr, args.counts, args.workers)
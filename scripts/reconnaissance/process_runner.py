@@ -0,0 +1,205 @@
+'''
+    Shared asyncio subprocess runner for the recon wrappers.
+
+    Usage:
+        from process_runner import run_process
+
+        result = run_process(['nmap', '-sT', '192.0.2.10'], timeout=600,
+                             on_line=lambda stream, line: print(line, end=''))
+        print(result["status"], result["elapsed"], result["peak_rss_kb"])
+
+    Every tool runs without a shell in its own process group. stdout and
+    stderr are read line by line as the tool produces them and handed to
+    an optional on_line(stream, line) consumer, so progress is visible
+    long before the tool exits. On timeout the whole process group
+    (the tool and anything it spawned) gets SIGTERM, then SIGKILL after
+    a short grace period. Each invocation returns a result dict:
+
+        {"command", "status" (ok/error/timeout), "returncode", "output",
+         "stderr", "elapsed", "peak_rss_kb"}
+
+    peak_rss_kb is the largest VmHWM of any process in the tool's process
+    group, sampled from /proc while it runs (None where /proc is
+    unavailable).
+'''
+
+import asyncio
+import os
+import signal
+import subprocess
+import time
+
+
+KILL_GRACE = 2.0
+RSS_SAMPLE_INTERVAL = 0.2
+READ_CHUNK = 1 << 16
+
+
+def read_peak_rss(pid):
+    '''
+        Returns the peak resident set size (kB) of a running process, or None.
+    '''
+    try:
+        with open(f'/proc/{pid}/status', 'r') as f:
+            for line in f:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+def read_group_peak_rss(pgid):
+    '''
+        Returns the largest peak RSS (kB) of any process in a process group, or None.
+    '''
+    peak = None
+    try:
+        pids = [name for name in os.listdir('/proc') if name.isdigit()]
+    except OSError:
+        return None
+    for pid in pids:
+        try:
+            with open(f'/proc/{pid}/stat', 'r') as f:
+                # the process group is the 3rd field after the parenthesized name
+                if int(f.read().rsplit(')', 1)[1].split()[2]) != pgid:
+                    continue
+        except (OSError, ValueError, IndexError):
+            continue
+        rss = read_peak_rss(pid)
+        if rss is not None:
+            peak = max(peak or 0, rss)
+    return peak
+
+
+def _signal_group(process, sig):
+    try:
+        os.killpg(process.pid, sig)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+async def _read_lines(stream, name, lines, on_line):
+    # read in chunks and split lines here: StreamReader.readline() raises
+    # once a line outgrows the reader's limit (e.g. nmap -oX - on one line)
+    pending = b''
+    while True:
+        chunk = await stream.read(READ_CHUNK)
+        if not chunk:
+            break
+        pending += chunk
+        *complete, pending = pending.split(b'\n')
+        for line in complete:
+            _emit(name, line + b'\n', lines, on_line)
+    if pending:
+        _emit(name, pending, lines, on_line)
+
+
+def _emit(name, line, lines, on_line):
+    text = line.decode('utf-8', 'replace')
+    if lines is not None:
+        lines.append(text)
+    if on_line is not None:
+        on_line(name, text)
+
+
+async def _sample_rss(process, peak):
+    while process.returncode is None:
+        rss = read_group_peak_rss(process.pid)
+        if rss is not None:
+            peak[0] = max(peak[0] or 0, rss)
+        await asyncio.sleep(RSS_SAMPLE_INTERVAL)
+
+
+async def run_process_async(command, timeout=None, on_line=None, merge_stderr=False, capture=True):
+    '''
+        Runs `command` (an argument list) and returns its result dict.
+        With merge_stderr, stderr is interleaved into "output"; with
+        capture=False, lines only go to on_line and are not kept.
+    '''
+    started = time.monotonic()
+    result = {
+        "command": ' '.join(command),
+        "status": "ok",
+        "returncode": None,
+        "output": None,
+        "stderr": None,
+        "elapsed": None,
+        "peak_rss_kb": None,
+    }
+    try:
+        process = await asyncio.create_subprocess_exec(
+            *command,
+            stdin=subprocess.DEVNULL,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT if merge_stderr else subprocess.PIPE,
+            # own process group, so a timeout can take down the whole tree
+            start_new_session=True,
+        )
+    except OSError as e:
+        result["status"] = "error"
+        result["output"] = f"Error: {e}"
+        result["elapsed"] = round(time.monotonic() - started, 3)
+        return result
+
+    output = [] if capture else None
+    stderr = [] if capture and not merge_stderr else None
+    readers = [_read_lines(process.stdout, 'stdout', output, on_line)]
+    if not merge_stderr:
+        readers.append(_read_lines(process.stderr, 'stderr', stderr, on_line))
+    peak = [None]
+    sampler = asyncio.ensure_future(_sample_rss(process, peak))
+
+    async def communicate():
+        await asyncio.gather(*readers)
+        return await process.wait()
+
+    try:
+        result["returncode"] = await asyncio.wait_for(communicate(), timeout)
+        if result["returncode"] != 0:
+            result["status"] = "error"
+    except asyncio.TimeoutError:
+        result["status"] = "timeout"
+        _signal_group(process, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), KILL_GRACE)
+        except asyncio.TimeoutError:
+            _signal_group(process, signal.SIGKILL)
+            await process.wait()
+        result["returncode"] = process.returncode
+    except BaseException:
+        # e.g. a failing on_line consumer or cancellation: never leave the tool running
+        _signal_group(process, signal.SIGKILL)
+        await process.wait()
+        raise
+    finally:
+        sampler.cancel()
+
+    if output is not None:
+        result["output"] = ''.join(output)
+    if stderr is not None:
+        result["stderr"] = ''.join(stderr)
+    result["elapsed"] = round(time.monotonic() - started, 3)
+    result["peak_rss_kb"] = peak[0]
+    return result
+
+
+def run_process(command, timeout=None, on_line=None, merge_stderr=False, capture=True):
+    '''
+        Blocking wrapper around run_process_async (safe to call from worker threads).
+    '''
+    return asyncio.run(run_process_async(command, timeout, on_line, merge_stderr, capture))
+
+
+def check_result(result):
+    '''
+        Raises subprocess.TimeoutExpired / CalledProcessError for a failed result, like check_output.
+    '''
+    if result["status"] == "timeout":
+        raise subprocess.TimeoutExpired(result["command"], result["elapsed"], result["output"])
+    if result["status"] != "ok":
+        raise subprocess.CalledProcessError(
+            result["returncode"] if result["returncode"] is not None else -1,
+            result["command"], result["output"], result["stderr"],
+        )
+    return result
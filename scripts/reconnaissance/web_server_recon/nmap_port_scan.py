@@ -1,32 +1,272 @@
+'''
+    Full-range nmap TCP port scan, optionally split into concurrent
+    partitions or run as a delta against a per-host cache.
+
+    Usage (from the repository root):
+        python -m scripts.reconnaissance.web_server_recon.nmap_port_scan -i 192.0.2.10 -P 4
+        python -m scripts.reconnaissance.web_server_recon.nmap_port_scan -i 192.0.2.10 --delta --cache nmap_cache
+'''
+
 import argparse
 import calendar
+import hashlib
+import json
+import os
 import subprocess
 import time
 
+from ..process_runner import check_result, run_process
+from .nmap_results import iter_nmap_file, merge_nmap_xml, port_partitions
+from .stage_scheduler import Stage, StageScheduler
+
+
+# delta scans fall back to a full -p- scan once the cached one is this old
+DEFAULT_TTL = 7 * 24 * 60 * 60
+DEFAULT_TOP_PORTS = 1000
+
+
+def open_ports(xml_file):
+    '''
+        Returns {"<port>/<protocol>": {"service", "product", "version"}} for every open port in a report.
+    '''
+    ports = {}
+    for record in iter_nmap_file(xml_file):
+        if record["port"] is not None and record["state"] == 'open':
+            ports[f'{record["port"]}/{record["protocol"]}'] = {
+                "service": record["service"],
+                "product": record["product"],
+                "version": record["version"],
+            }
+    return ports
+
+
+def fingerprint(ports):
+    return hashlib.sha256(json.dumps(ports, sort_keys=True).encode('utf-8')).hexdigest()[:16]
+
+
+def diff_ports(previous, current):
+    '''
+        Returns the ports opened, closed and changed (service/product/version) since the previous scan.
+    '''
+    return {
+        "opened": sorted(set(current) - set(previous)),
+        "closed": sorted(set(previous) - set(current)),
+        "changed": sorted(port for port in set(previous) & set(current) if previous[port] != current[port]),
+    }
+
+
+class ScanCache:
+    '''
+        Per-host cache of the last full scan's open ports, one JSON file per host.
+    '''
+
+    def __init__(self, directory='nmap_cache'):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+
+    def _path(self, host):
+        return os.path.join(self.directory, f'{host.replace("/", "_")}.json')
+
+
+    def load(self, host):
+        try:
+            with open(self._path(host), 'r') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return None
+
+
+    def save(self, host, entry):
+        path = self._path(host)
+        temp_path = f'{path}.tmp'
+        with open(temp_path, 'w') as f:
+            json.dump(entry, f, indent=4, sort_keys=True)
+        os.replace(temp_path, path)
+
 
 class NmapPortScan:
 
-    def __init__(self, ip_address) -> None:
+    def __init__(self, ip_address, store=None, partitions=1, max_parallel=None, process_slots=None,
+                 on_progress=None, timeout=None) -> None:
         self.ip_address = ip_address
+        # per nmap process, in seconds
+        self.timeout = timeout
+        # optional nmap_results.NmapStore the XML report is imported into
+        self.store = store
+        # full-range scans are split into this many concurrent port ranges
+        self.partitions = partitions
+        self.max_parallel = max_parallel or partitions
+        # optional semaphore shared with other scans to cap nmap processes
+        self.process_slots = process_slots
+        # on_progress(port_range, result, completed, total) as each partition finishes
+        self.on_progress = on_progress
+        # why the last run/run_delta returned None
+        self.error = None
+
 
+    def _scan(self, name, options, quiet):
+        ts = calendar.timegm(time.gmtime())
+        xml_file = f'nmap.{name}.{self.ip_address}.{ts}.xml'
+        cmd = ['nmap', '-sT', self.ip_address] + options + ['-oX', xml_file]
+        # nmap's progress is printed as it arrives rather than when it exits
+        on_line = None if quiet else lambda stream, line: print(line, end='', flush=True)
+        if self.process_slots is not None:
+            with self.process_slots:
+                process_result = run_process(cmd, self.timeout, on_line)
+        else:
+            process_result = run_process(cmd, self.timeout, on_line)
+        check_result(process_result)
+        return self._result(xml_file, process_result["output"], process_result["elapsed"], process_result["peak_rss_kb"])
+
+
+    def _result(self, xml_file, nmap_output, elapsed, peak_rss_kb):
+        result = {"xml_file": xml_file, "output": nmap_output, "elapsed": elapsed, "peak_rss_kb": peak_rss_kb}
+        if self.store is not None:
+            result["scan_id"] = self.store.import_file(xml_file)
+        return result
+
+
+    def _full_scan(self, quiet):
+        if self.partitions <= 1:
+            return self._scan('-sT.-p-', ['-p-'], quiet)
+
+        # one nmap process per port range, merged into the usual -p- report
+        ts = calendar.timegm(time.gmtime())
+        xml_file = f'nmap.-sT.-p-.{self.ip_address}.{ts}.xml'
+        ranges = port_partitions(self.partitions)
+        stages = [
+            Stage(port_range, ['nmap', '-sT', self.ip_address, '-p', port_range, '-oX', f'{xml_file}.{port_range}'], self.timeout)
+            for port_range in ranges
+        ]
+        started = time.monotonic()
+
+        completed = []
+        def on_complete(port_range, result):
+            completed.append(port_range)
+            if self.on_progress is not None:
+                self.on_progress(port_range, result, len(completed), len(ranges))
+            elif not quiet:
+                print(f'ports {port_range} finished: {result["status"]} in {result["elapsed"]}s ({len(completed)}/{len(ranges)})')
+
+        def on_line(port_range, stream, line):
+            print(f'[{port_range}] {line}', end='', flush=True)
+
+        scheduler = StageScheduler(self.max_parallel, self.process_slots)
+        stage_results = scheduler.run(stages, on_complete, None if quiet else on_line)
+        partial_files = [f'{xml_file}.{port_range}' for port_range in ranges]
+        try:
+            for result in stage_results.values():
+                check_result(result)
+            merge_nmap_xml(partial_files, xml_file, f'nmap -sT -p- -oX {xml_file} {self.ip_address}', '1-65535')
+        finally:
+            for partial_file in partial_files:
+                if os.path.exists(partial_file):
+                    os.remove(partial_file)
 
-    def run(self):
+        nmap_output = ''.join(result["output"] for result in stage_results.values())
+        peak_rss_kb = max((result["peak_rss_kb"] or 0 for result in stage_results.values()), default=0) or None
+        return self._result(xml_file, nmap_output, round(time.monotonic() - started, 3), peak_rss_kb)
+
+
+    def run(self, quiet=False):
+        '''
+            Runs the scan; returns {"xml_file", "output"} (plus "scan_id" when
+            a store is set), or None if nmap failed.
+        '''
         ts = calendar.timegm(time.gmtime())
-        print(ts)
+        if not quiet:
+            print(ts)
+        self.error = None
         try:
-            cmd = ['nmap', '-sT', self.ip_address, '-p-', '-oX', f'nmap.-sT.-p-.{self.ip_address}.{ts}.xml']
-            nmap_outbytes = subprocess.check_output(cmd)
-            nmap_output = nmap_outbytes.decode('utf-8')
-            print(nmap_output)
-        except subprocess.CalledProcessError as e:
+            return self._full_scan(quiet)
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            self.error = str(e)
             print(f"Error executing command: {e}")
         except Exception as e:
+            self.error = str(e)
             print(e)
 
 
+    def run_delta(self, cache, ttl=DEFAULT_TTL, top_ports=DEFAULT_TOP_PORTS, quiet=False):
+        '''
+            Rechecks the cached open ports plus a --top-ports sweep, and only
+            runs the full -p- scan when there is no cached scan, it is older
+            than `ttl` seconds, or the open-port fingerprint has changed.
+            Returns {"mode", "reason", "open_ports", "diff", "scans"}, or None if nmap failed.
+        '''
+        now = time.time()
+        entry = cache.load(self.ip_address)
+        scans = []
+        self.error = None
+        try:
+            if entry is None:
+                reason = 'no cached scan'
+            elif now - entry["full_scan"] > ttl:
+                reason = 'cache expired'
+            else:
+                current = {}
+                if entry["open_ports"]:
+                    known = ','.join(key.split('/')[0] for key in entry["open_ports"])
+                    scans.append(self._scan('-sT.recheck', ['-p', known], quiet))
+                    current.update(open_ports(scans[-1]["xml_file"]))
+                scans.append(self._scan(f'-sT.top-{top_ports}', ['--top-ports', str(top_ports)], quiet))
+                current.update(open_ports(scans[-1]["xml_file"]))
+
+                if fingerprint(current) == entry["fingerprint"]:
+                    entry["checked"] = now
+                    cache.save(self.ip_address, entry)
+                    result = {"mode": "delta", "reason": 'fingerprint unchanged', "open_ports": current,
+                              "diff": diff_ports(entry["open_ports"], current), "scans": scans}
+                    if not quiet:
+                        print(f'{self.ip_address}: no change in {len(current)} open ports')
+                    return result
+                reason = 'fingerprint changed'
+
+            if not quiet:
+                print(f'{self.ip_address}: full scan ({reason})')
+            scans.append(self._full_scan(quiet))
+            current = open_ports(scans[-1]["xml_file"])
+        except (subprocess.CalledProcessError, subprocess.TimeoutExpired) as e:
+            self.error = str(e)
+            print(f"Error executing command: {e}")
+            return None
+        except Exception as e:
+            self.error = str(e)
+            print(e)
+            return None
+
+        previous = entry["open_ports"] if entry is not None else {}
+        diff = diff_ports(previous, current)
+        cache.save(self.ip_address, {
+            "host": self.ip_address,
+            "full_scan": now,
+            "checked": now,
+            "open_ports": current,
+            "fingerprint": fingerprint(current),
+        })
+        if not quiet:
+            for change in ("opened", "closed", "changed"):
+                if diff[change]:
+                    print(f'{change}: {", ".join(diff[change])}')
+        return {"mode": "full", "reason": reason, "open_ports": current, "diff": diff, "scans": scans}
+
+
 if __name__ == "__main__":
     parser = argparse.ArgumentParser()
     parser.add_argument('-i', dest='ipv4_address', help='Target IPv4 address')
+    parser.add_argument('--delta', dest='delta', action='store_true', help='Recheck cached open ports and top ports; full scan only on change or TTL expiry')
+    parser.add_argument('--cache', dest='cache', default='nmap_cache', help='Directory of per-host scan results used by --delta')
+    parser.add_argument('--ttl', dest='ttl', type=float, default=DEFAULT_TTL, help='Seconds before a cached full scan expires')
+    parser.add_argument('--top-ports', dest='top_ports', type=int, default=DEFAULT_TOP_PORTS, help='Number of most common ports swept by --delta')
+    parser.add_argument('-P', dest='partitions', type=int, default=1, help='Split the full port range into this many concurrent nmap processes')
+    parser.add_argument('--max-parallel', dest='max_parallel', type=int, default=None, help='Maximum partitions scanned at once (default: all)')
+    parser.add_argument('--timeout', dest='timeout', type=float, default=None, help='Timeout in seconds for each nmap process')
     args = parser.parse_args()
-    nmap_scan = NmapPortScan(args.ipv4_address)
-    nmap_scan.run()
+    nmap_scan = NmapPortScan(args.ipv4_address, partitions=args.partitions, max_parallel=args.max_parallel, timeout=args.timeout)
+    if args.delta:
+        result = nmap_scan.run_delta(ScanCache(args.cache), args.ttl, args.top_ports)
+        if result is not None:
+            print(json.dumps({key: value for key, value in result.items() if key != "scans"}, indent=4))
+    else:
+        nmap_scan.run()
@@ -0,0 +1,308 @@
+'''
+    Streaming nmap XML parser and indexed SQLite results store.
+
+    Usage (from the repository root):
+        python -m scripts.reconnaissance.web_server_recon.nmap_results import nmap.*.xml
+        python -m scripts.reconnaissance.web_server_recon.nmap_results query --service https
+        python -m scripts.reconnaissance.web_server_recon.nmap_results query --host 192.0.2.10 --state all
+
+    The parser feeds nmap -oX output to an XMLPullParser in chunks and
+    turns each <host> element into compact records as soon as it is
+    closed, then discards the element, so memory use is bounded by the
+    largest single host rather than the size of the scan. Records are
+    one per host (port None, carrying host status and host scripts) and
+    one per port:
+
+        {"host", "hostname", "status", "port", "protocol", "state",
+         "service", "product", "version", "scripts": {id: output}}
+
+    NmapStore keeps the records of any number of scans in SQLite,
+    indexed by host/port and by service, so results can be queried
+    across thousands of scans without re-reading any XML.
+'''
+
+import argparse
+import json
+import sqlite3
+import threading
+import time
+import xml.etree.ElementTree as ET
+
+
+CHUNK_SIZE = 1 << 16
+INSERT_BATCH = 1000
+
+
+def _host_records(host):
+    address = None
+    for element in host.iterfind('address'):
+        # prefer the IP address over e.g. a MAC address
+        if address is None or element.get('addrtype') in ('ipv4', 'ipv6'):
+            address = element.get('addr')
+    hostname = host.find('hostnames/hostname')
+    status = host.find('status')
+    base = {
+        "host": address,
+        "hostname": hostname.get('name') if hostname is not None else None,
+        "status": status.get('state') if status is not None else None,
+    }
+
+    yield dict(base, port=None, protocol=None, state=None, service=None, product=None, version=None,
+               scripts={script.get('id'): script.get('output') for script in host.iterfind('hostscript/script')})
+
+    for port in host.iterfind('ports/port'):
+        state = port.find('state')
+        service = port.find('service')
+        yield dict(
+            base,
+            port=int(port.get('portid')),
+            protocol=port.get('protocol'),
+            state=state.get('state') if state is not None else None,
+            service=service.get('name') if service is not None else None,
+            product=service.get('product') if service is not None else None,
+            version=service.get('version') if service is not None else None,
+            scripts={script.get('id'): script.get('output') for script in port.iterfind('script')},
+        )
+
+
+def iter_nmap_xml(chunks):
+    '''
+        Yields records from an iterable of XML chunks (bytes or str), host by host.
+    '''
+    parser = ET.XMLPullParser(events=('start', 'end'))
+    root = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, element in parser.read_events():
+            if event == 'start':
+                if root is None:
+                    root = element
+                continue
+            if element.tag == 'host':
+                yield from _host_records(element)
+                # drop the finished host so the tree never grows
+                element.clear()
+                if root is not None and element in root:
+                    root.remove(element)
+    parser.close()
+
+
+def iter_nmap_file(path, chunk_size=CHUNK_SIZE):
+    '''
+        Lazily yields records from an nmap -oX file.
+    '''
+    with open(path, 'rb') as f:
+        yield from iter_nmap_xml(iter(lambda: f.read(chunk_size), b''))
+
+
+def parse_nmap_output(output):
+    '''
+        Returns the records of an nmap -oX document held in a string.
+    '''
+    return list(iter_nmap_xml([output]))
+
+
+def port_partitions(partitions, first=1, last=65535):
+    '''
+        Splits first-last into `partitions` contiguous "a-b" ranges of near-equal size.
+    '''
+    partitions = max(1, min(partitions, last - first + 1))
+    size, extra = divmod(last - first + 1, partitions)
+    ranges = []
+    start = first
+    for i in range(partitions):
+        end = start + size - 1 + (1 if i < extra else 0)
+        ranges.append(f'{start}-{end}')
+        start = end + 1
+    return ranges
+
+
+def merge_nmap_xml(paths, output_path, args=None, services=None):
+    '''
+        Merges the -oX reports of scans over disjoint port ranges of the
+        same targets into one report: ports (sorted) and extraports counts
+        are combined per host, and the scan info and run args are
+        rewritten to describe the whole range.
+    '''
+    root = None
+    hosts = {}
+    for path in paths:
+        tree = ET.parse(path)
+        partial = tree.getroot()
+        if root is None:
+            root = partial
+            for host in root.iterfind('host'):
+                hosts[host.find('address').get('addr')] = host
+            continue
+
+        for host in partial.iterfind('host'):
+            address = host.find('address').get('addr')
+            if address not in hosts:
+                # e.g. down in the first partition but up in a later one
+                runstats = root.find('runstats')
+                root.insert(list(root).index(runstats) if runstats is not None else len(root), host)
+                hosts[address] = host
+                continue
+            merged = hosts[address]
+            status, other_status = merged.find('status'), host.find('status')
+            if status is not None and other_status is not None and other_status.get('state') == 'up':
+                status.attrib.update(other_status.attrib)
+            merged_ports = merged.find('ports')
+            if merged_ports is None:
+                merged_ports = ET.SubElement(merged, 'ports')
+            for element in host.iterfind('ports/*'):
+                merged_ports.append(element)
+
+    if root is None:
+        raise ValueError('no nmap reports to merge')
+
+    for host in hosts.values():
+        ports = host.find('ports')
+        if ports is None:
+            continue
+        extraports = {}
+        for element in ports.findall('extraports'):
+            state = element.get('state')
+            if state in extraports:
+                count = int(extraports[state].get('count')) + int(element.get('count'))
+                extraports[state].set('count', str(count))
+                ports.remove(element)
+            else:
+                extraports[state] = element
+        port_elements = sorted(ports.findall('port'), key=lambda port: (port.get('protocol'), int(port.get('portid'))))
+        for element in port_elements:
+            ports.remove(element)
+        ports.extend(port_elements)
+
+    if args is not None:
+        root.set('args', args)
+    if services is not None:
+        for scaninfo in root.iterfind('scaninfo'):
+            scaninfo.set('services', services)
+            scaninfo.set('numservices', str(sum(
+                int(b) - int(a) + 1 for a, _, b in (part.partition('-') for part in services.split(','))
+            )))
+    ET.ElementTree(root).write(output_path, encoding='utf-8', xml_declaration=True)
+    return output_path
+
+
+class NmapStore:
+    '''
+        SQLite store of nmap records keyed by scan, host, port and service.
+    '''
+
+    COLUMNS = ["host", "hostname", "status", "port", "protocol", "state", "service", "product", "version"]
+
+    def __init__(self, path='nmap_results.db'):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.executescript('''
+            CREATE TABLE IF NOT EXISTS scans (
+                id INTEGER PRIMARY KEY,
+                source TEXT,
+                imported REAL NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS records (
+                scan_id INTEGER NOT NULL REFERENCES scans(id),
+                host TEXT,
+                hostname TEXT,
+                status TEXT,
+                port INTEGER,
+                protocol TEXT,
+                state TEXT,
+                service TEXT,
+                product TEXT,
+                version TEXT,
+                scripts TEXT
+            );
+            CREATE INDEX IF NOT EXISTS records_host_port ON records (host, port, protocol);
+            CREATE INDEX IF NOT EXISTS records_service ON records (service, state);
+            CREATE INDEX IF NOT EXISTS records_port ON records (port, state);
+        ''')
+
+
+    def add_scan(self, records, source=None):
+        '''
+            Stores an iterable of records as one scan (in batches); returns the scan id.
+        '''
+        with self._lock:
+            scan_id = self._db.execute('INSERT INTO scans (source, imported) VALUES (?, ?)', (source, time.time())).lastrowid
+            batch = []
+            for record in records:
+                batch.append((scan_id, *(record[column] for column in self.COLUMNS),
+                              json.dumps(record["scripts"]) if record["scripts"] else None))
+                if len(batch) >= INSERT_BATCH:
+                    self._insert(batch)
+                    batch = []
+            self._insert(batch)
+            self._db.commit()
+        return scan_id
+
+
+    def _insert(self, batch):
+        if batch:
+            self._db.executemany(f'INSERT INTO records VALUES ({", ".join("?" * (len(self.COLUMNS) + 2))})', batch)
+
+
+    def import_file(self, path):
+        return self.add_scan(iter_nmap_file(path), path)
+
+
+    def import_output(self, output, source=None):
+        return self.add_scan(iter_nmap_xml([output]), source)
+
+
+    def query(self, host=None, port=None, service=None, state='open', scan_id=None):
+        '''
+            Returns matching port records (newest scan first); state=None matches any state.
+        '''
+        clauses = ['r.port IS NOT NULL']
+        params = []
+        for column, value in (('host', host), ('port', port), ('service', service), ('state', state), ('scan_id', scan_id)):
+            if value is not None:
+                clauses.append(f'r.{column} = ?')
+                params.append(value)
+
+        sql = (f'SELECT r.scan_id, s.source, {", ".join("r." + column for column in self.COLUMNS)}, r.scripts '
+               f'FROM records r JOIN scans s ON s.id = r.scan_id WHERE {" AND ".join(clauses)} '
+               f'ORDER BY r.scan_id DESC, r.host, r.port')
+        with self._lock:
+            rows = self._db.execute(sql, params).fetchall()
+
+        results = []
+        for scan_id, source, *values, scripts in rows:
+            record = dict(zip(self.COLUMNS, values), scan_id=scan_id, source=source)
+            record["scripts"] = json.loads(scripts) if scripts else {}
+            results.append(record)
+        return results
+
+
+    def close(self):
+        self._db.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Import nmap XML into, and query, an indexed SQLite results store.")
+    parser.add_argument("--db", dest="db", default="nmap_results.db", help="SQLite results store.")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    import_parser = subparsers.add_parser("import", help="Import nmap -oX files.")
+    import_parser.add_argument("files", nargs="+")
+
+    query_parser = subparsers.add_parser("query", help="Print matching port records as JSON lines.")
+    query_parser.add_argument("--host", dest="host", default=None)
+    query_parser.add_argument("--port", dest="port", type=int, default=None)
+    query_parser.add_argument("--service", dest="service", default=None)
+    query_parser.add_argument("--state", dest="state", default="open", help="Port state to match, or 'all'.")
+    args = parser.parse_args()
+
+    store = NmapStore(args.db)
+    if args.command == "import":
+        for path in args.files:
+            scan_id = store.import_file(path)
+            print(f'{path}: scan {scan_id}')
+    else:
+        state = None if args.state == 'all' else args.state
+        for record in store.query(args.host, args.port, args.service, state):
+            print(json.dumps(record))
+    store.close()
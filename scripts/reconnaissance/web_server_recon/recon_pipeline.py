@@ -0,0 +1,269 @@
+'''
+    Multi-target recon pipeline for web_server_recon and nmap_port_scan.
+
+    Usage (from the repository root):
+        python -m scripts.reconnaissance.web_server_recon.recon_pipeline -f targets.txt
+        python -m scripts.reconnaissance.web_server_recon.recon_pipeline -t 10.0.0.0/24 --tools ports --hosts 32 --max-procs 8
+
+    Targets are hostnames, IP addresses or CIDR blocks (expanded to their
+    hosts), from -t and/or a target file (-f, one per line, # comments).
+    A block of more than --max-hosts addresses (default: a /16) is
+    rejected, so a typo such as 10.0.0.0/8 or an IPv6 /64 cannot flood
+    the queue.
+    Every (target, tool) pair becomes a job in a persistent SQLite queue
+    (--queue); re-running the same command after a crash or Ctrl-C skips
+    finished jobs and picks up the rest. Hosts are processed on a pool
+    of --hosts worker threads, while --max-procs caps the number of
+    scanner processes running at once across all hosts. Each job's
+    result is appended to a JSON lines file (-o) as soon as it finishes;
+    a failed job's error message is kept there and in the queue.
+    With --store, every nmap report is parsed into an indexed SQLite
+    store (see nmap_results.py) instead of being kept as raw output.
+    With --delta, port scans recheck a per-host cache and only repeat the
+    full -p- scan on change or TTL expiry (see NmapPortScan.run_delta).
+'''
+
+import argparse
+import ipaddress
+import json
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from .nmap_port_scan import DEFAULT_TTL, NmapPortScan, ScanCache
+from .nmap_results import NmapStore
+from .web_server_recon import WebServerReconnaissance, failed_stages
+
+
+TOOLS = ["web", "ports"]
+
+# largest CIDR block expanded into jobs, in addresses
+DEFAULT_MAX_HOSTS = 1 << 16
+
+
+def expand_targets(targets, max_hosts=DEFAULT_MAX_HOSTS):
+    '''
+        Yields individual hosts, expanding CIDR blocks; duplicates are dropped.
+        Raises ValueError for a block of more than `max_hosts` addresses.
+    '''
+    seen = set()
+    for target in targets:
+        target = target.strip()
+        if not target or target.startswith('#'):
+            continue
+        if '/' in target:
+            network = ipaddress.ip_network(target, strict=False)
+            if network.num_addresses > max_hosts:
+                raise ValueError(f'{target} has {network.num_addresses} addresses, more than the limit of {max_hosts} (--max-hosts)')
+            hosts = network.hosts() if network.num_addresses > 2 else iter(network)
+            hosts = (str(host) for host in hosts)
+        else:
+            hosts = [target]
+        for host in hosts:
+            if host not in seen:
+                seen.add(host)
+                yield host
+
+
+class JobQueue:
+    '''
+        Persistent (target, tool) job queue backed by SQLite.
+    '''
+
+    def __init__(self, path):
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('''
+            CREATE TABLE IF NOT EXISTS jobs (
+                target TEXT NOT NULL,
+                tool TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                started REAL,
+                finished REAL,
+                error TEXT,
+                PRIMARY KEY (target, tool)
+            )''')
+        # queues created before failed jobs recorded their error
+        if 'error' not in [row[1] for row in self._db.execute('PRAGMA table_info(jobs)')]:
+            self._db.execute('ALTER TABLE jobs ADD COLUMN error TEXT')
+        # jobs left running by a crashed run are started again
+        self._db.execute("UPDATE jobs SET status = 'pending' WHERE status = 'running'")
+        self._db.commit()
+
+
+    def add(self, targets, tools):
+        with self._lock:
+            self._db.executemany(
+                'INSERT OR IGNORE INTO jobs (target, tool) VALUES (?, ?)',
+                ((target, tool) for target in targets for tool in tools),
+            )
+            self._db.commit()
+
+
+    def retry_failed(self):
+        with self._lock:
+            self._db.execute("UPDATE jobs SET status = 'pending' WHERE status = 'failed'")
+            self._db.commit()
+
+
+    def pending(self):
+        with self._lock:
+            return self._db.execute("SELECT target, tool FROM jobs WHERE status = 'pending' ORDER BY rowid").fetchall()
+
+
+    def mark(self, target, tool, status, error=None):
+        column = 'started' if status == 'running' else 'finished'
+        with self._lock:
+            self._db.execute(
+                f'UPDATE jobs SET status = ?, {column} = ?, error = ? WHERE target = ? AND tool = ?',
+                (status, time.time(), error, target, tool),
+            )
+            self._db.commit()
+
+
+    def errors(self):
+        with self._lock:
+            return self._db.execute("SELECT target, tool, error FROM jobs WHERE status = 'failed' ORDER BY rowid").fetchall()
+
+
+    def counts(self):
+        with self._lock:
+            return dict(self._db.execute('SELECT status, COUNT(*) FROM jobs GROUP BY status').fetchall())
+
+
+    def close(self):
+        self._db.close()
+
+
+class ReconPipeline:
+
+    def __init__(self, queue_path='recon_jobs.db', results_path='recon_results.jsonl', host_workers=8,
+                 max_procs=8, stage_workers=2, timeout=None, store_path=None, cache_path=None, ttl=DEFAULT_TTL,
+                 partitions=1, max_hosts=DEFAULT_MAX_HOSTS):
+        self.queue = JobQueue(queue_path)
+        self.max_hosts = max_hosts
+        self.store = NmapStore(store_path) if store_path else None
+        # port scans run in delta mode against a per-host cache when set
+        self.cache = ScanCache(cache_path) if cache_path else None
+        self.ttl = ttl
+        self.partitions = partitions
+        self.results_path = results_path
+        self.host_workers = host_workers
+        self.process_slots = threading.BoundedSemaphore(max_procs)
+        self.stage_workers = stage_workers
+        self.timeout = timeout
+        self._results_lock = threading.Lock()
+
+
+    def run_job(self, target, tool):
+        '''
+            Returns (result, error); error is None when the job succeeded.
+            A web job whose stages partly failed still returns its document.
+        '''
+        if tool == "web":
+            recon = WebServerReconnaissance(target, self.stage_workers, self.timeout, self.store)
+            result = recon.collect(self.process_slots)
+            stages = result["__metadata"]["stages"]
+            failed = [f'{name}: {stages[name]["status"]} (exit {stages[name]["returncode"]})'
+                      if stages[name]["status"] == "error" else f'{name}: {stages[name]["status"]}'
+                      for name in failed_stages(result)]
+            return result, '; '.join(failed) or None
+        scan = NmapPortScan(target, self.store, self.partitions, process_slots=self.process_slots, timeout=self.timeout)
+        if self.cache is not None:
+            result = scan.run_delta(self.cache, self.ttl, quiet=True)
+        else:
+            result = scan.run(quiet=True)
+        if result is None:
+            return None, scan.error or 'nmap failed'
+        if self.store is not None:
+            # the XML reports are in the store; keep the JSON lines compact
+            for scan_result in result.get("scans", [result]):
+                scan_result.pop("output")
+        return result, None
+
+
+    def _process(self, target, tool, results_file):
+        self.queue.mark(target, tool, 'running')
+        started = time.monotonic()
+        try:
+            result, error = self.run_job(target, tool)
+        except Exception as e:
+            result, error = None, f'{type(e).__name__}: {e}'
+        status = 'failed' if error is not None else 'done'
+
+        record = {
+            "target": target,
+            "tool": tool,
+            "status": status,
+            "elapsed": round(time.monotonic() - started, 3),
+            "error": error,
+            "result": result,
+        }
+        with self._results_lock:
+            results_file.write(json.dumps(record) + '\n')
+            results_file.flush()
+        self.queue.mark(target, tool, status, error)
+        print(f'{tool} {target}: {status} in {record["elapsed"]}s' + (f' ({error})' if error else ''))
+
+
+    def run(self, targets, tools=TOOLS, retry_failed=False):
+        # expanded in full first, so an oversized block enqueues nothing
+        self.queue.add(list(expand_targets(targets, self.max_hosts)), tools)
+        if retry_failed:
+            self.queue.retry_failed()
+
+        jobs = self.queue.pending()
+        print(f'{len(jobs)} pending jobs ({self.queue.counts()})')
+
+        with open(self.results_path, 'a') as results_file:
+            with ThreadPoolExecutor(max_workers=self.host_workers) as pool:
+                futures = [pool.submit(self._process, target, tool, results_file) for target, tool in jobs]
+                for future in futures:
+                    future.result()
+
+        print(f'finished: {self.queue.counts()}')
+        self.queue.close()
+        if self.store is not None:
+            self.store.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run web server recon and/or port scans across many hosts.")
+    parser.add_argument("-t", dest="targets", action="append", default=[], help="Target hostname, IP address or CIDR block (repeatable).")
+    parser.add_argument("-f", dest="target_file", default=None, help="File of targets, one per line.")
+    parser.add_argument("--tools", dest="tools", default=','.join(TOOLS), help=f"Comma-separated tools to run per host ({', '.join(TOOLS)}).")
+    parser.add_argument("--hosts", dest="host_workers", type=int, default=8, help="Number of jobs processed at once.")
+    parser.add_argument("--max-procs", dest="max_procs", type=int, default=8, help="Maximum scanner processes running at once across all hosts.")
+    parser.add_argument("--timeout", dest="timeout", type=float, default=None, help="Per-process timeout in seconds (web recon stages and nmap scans).")
+    parser.add_argument("--queue", dest="queue_path", default="recon_jobs.db", help="SQLite job queue used to resume interrupted runs.")
+    parser.add_argument("-o", dest="results_path", default="recon_results.jsonl", help="JSON lines file that per-host results are appended to.")
+    parser.add_argument("--store", dest="store_path", default=None, help="SQLite nmap results store that every scan is imported into.")
+    parser.add_argument("--delta", dest="cache_path", default=None, help="Per-host scan cache directory; port scans run in delta mode against it.")
+    parser.add_argument("--ttl", dest="ttl", type=float, default=DEFAULT_TTL, help="Seconds before a cached full port scan expires (with --delta).")
+    parser.add_argument("-P", dest="partitions", type=int, default=1, help="Split each full port scan into this many concurrent port ranges.")
+    parser.add_argument("--retry-failed", dest="retry_failed", action="store_true", help="Run previously failed jobs again.")
+    parser.add_argument("--max-hosts", dest="max_hosts", type=int, default=DEFAULT_MAX_HOSTS, help="Largest CIDR block, in addresses, expanded into jobs.")
+    args = parser.parse_args()
+
+    targets = list(args.targets)
+    if args.target_file is not None:
+        with open(args.target_file, 'r') as f:
+            targets.extend(f.read().splitlines())
+
+    tools = [tool for tool in args.tools.split(',') if tool]
+    unknown = [tool for tool in tools if tool not in TOOLS]
+    if unknown:
+        parser.error(f'unknown tool(s): {", ".join(unknown)}')
+
+    try:
+        # checked before the queue is opened, so a bad target changes nothing
+        for _ in expand_targets(targets, args.max_hosts):
+            pass
+    except ValueError as e:
+        parser.error(str(e))
+
+    pipeline = ReconPipeline(args.queue_path, args.results_path, args.host_workers, args.max_procs, timeout=args.timeout,
+                             store_path=args.store_path, cache_path=args.cache_path, ttl=args.ttl,
+                             partitions=args.partitions, max_hosts=args.max_hosts)
+    pipeline.run(targets, tools, args.retry_failed)
@@ -0,0 +1,63 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from ..process_runner import run_process
+
+
+class Stage:
+    '''
+        One independent tool invocation: a name, an argument list and an optional timeout (seconds).
+    '''
+
+    def __init__(self, name, command, timeout=None):
+        self.name = name
+        self.command = command
+        self.timeout = timeout
+
+
+def run_stage(stage, process_slots=None, on_line=None):
+    '''
+        Runs one stage through process_runner (stderr merged into the
+        output) and returns its result dict; on_line(stream, line) sees
+        the output as it is produced.
+    '''
+    if process_slots is not None:
+        # global cap on tool processes, shared across schedulers
+        with process_slots:
+            return run_stage(stage, on_line=on_line)
+
+    return run_process(stage.command, stage.timeout, on_line, merge_stderr=True)
+
+
+class StageScheduler:
+    '''
+        Runs independent stages concurrently on a bounded pool of worker
+        threads (each stage is an external process, so threads suffice).
+        `process_slots` is an optional semaphore shared between schedulers
+        to cap the number of tool processes running machine-wide.
+    '''
+
+    def __init__(self, max_workers=4, process_slots=None):
+        self.max_workers = max_workers
+        self.process_slots = process_slots
+
+
+    def run(self, stages, on_complete=None, on_line=None):
+        '''
+            Returns {stage name: result}, in stage order; calls
+            on_complete(name, result) as each stage finishes and
+            on_line(name, stream, line) for every line of output.
+        '''
+        results = {}
+        with ThreadPoolExecutor(max_workers=self.max_workers) as pool:
+            futures = {}
+            for stage in stages:
+                stage_on_line = None
+                if on_line is not None:
+                    stage_on_line = lambda stream, line, name=stage.name: on_line(name, stream, line)
+                futures[stage.name] = pool.submit(run_stage, stage, self.process_slots, stage_on_line)
+            if on_complete is not None:
+                for name, future in futures.items():
+                    future.add_done_callback(lambda f, name=name: on_complete(name, f.result()))
+            for name, future in futures.items():
+                results[name] = future.result()
+        return results
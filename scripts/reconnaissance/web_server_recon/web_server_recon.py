@@ -1,61 +1,129 @@
+'''
+    Web server reconnaissance: nikto and one nmap scan running the NSE
+    scripts below, as concurrent stages with optional per-stage timeouts.
+
+    Usage (from the repository root):
+        python -m scripts.reconnaissance.web_server_recon.web_server_recon -t example.com
+        python -m scripts.reconnaissance.web_server_recon.web_server_recon -t example.com --timeout 600 --store nmap_results.db -v
+'''
+
 import argparse
-import subprocess
 import json
+import xml.etree.ElementTree as ET
 
+from .nmap_results import NmapStore, parse_nmap_output
+from .stage_scheduler import Stage, StageScheduler
 from ...timestamp import Timestamp
 
 
+# NSE scripts run together in a single nmap scan of the target, and
+# the results document key each one's output is reported under
+NMAP_SCRIPT_KEYS = {
+    "ssl-enum-ciphers": "nmap_ssl_enum_ciphers",
+    "ssl-heartbleed": "nmap_heartbleed",
+    "http-methods": "nmap_http_methods",
+}
+NMAP_SCRIPTS = list(NMAP_SCRIPT_KEYS)
+
+
+def split_by_script(nmap):
+    '''
+        Returns {results key: records} with one entry per NSE script; each
+        copy of the records carries only that script's output, as if the
+        script had been run in a scan of its own. Output that could not be
+        parsed (a raw string) is reported under every key.
+    '''
+    if isinstance(nmap, str):
+        return {key: nmap for key in NMAP_SCRIPT_KEYS.values()}
+    return {
+        key: [dict(record, scripts={script: record["scripts"][script]} if script in record["scripts"] else {})
+              for record in nmap]
+        for script, key in NMAP_SCRIPT_KEYS.items()
+    }
+
+
+def failed_stages(results):
+    '''
+        Names of the stages of a results document that timed out or failed.
+    '''
+    return [name for name, stage in results["__metadata"]["stages"].items() if stage["status"] != "ok"]
+
+
 class WebServerReconnaissance:
 
-    def __init__(self, hostname):
+    def __init__(self, hostname, max_workers=4, timeout=None, store=None):
         self.hostname = hostname
         self.timestamp = Timestamp().get_current_utc_unix()
+        self.max_workers = max_workers
+        self.timeout = timeout
+        self.store = store
         
 
-    def run_command(command):
-        try:
-            result = subprocess.check_output(command, shell=True, stderr=subprocess.STDOUT)
-            return result.decode('utf-8')
-        except subprocess.CalledProcessError as e:
-            return f"Error: {e.output.decode('utf-8')}"
-
-    def gather(self):
-
-        # Run Nikto
-        nikto_command = f"nikto -h {self.hostname} -output -"
-        nikto_output = self.run_command(nikto_command)
-
-        # Run Nmap ssl-enum-ciphers
-        nmap_ssl_command = f"nmap --script ssl-enum-ciphers -oX - {self.hostname}"
-        nmap_ssl_output = self.run_command(nmap_ssl_command)
+    def stages(self):
+        return [
+            # Run Nikto
+            Stage("nikto", ["nikto", "-h", self.hostname, "-output", "-"], self.timeout),
+            # Run Nmap ssl-enum-ciphers, heartbleed and http-methods in one scan
+            Stage("nmap", ["nmap", "--script", ','.join(NMAP_SCRIPTS), "-oX", "-", self.hostname], self.timeout),
+        ]
 
-        # Run Nmap heartbleed
-        nmap_heartbleed_command = f"nmap --script ssl-heartbleed -oX - {self.hostname}"
-        nmap_heartbleed_output = self.run_command(nmap_heartbleed_command)
+    def collect(self, process_slots=None, on_complete=None, on_line=None):
+        '''
+            Runs every stage and returns the results document; on_line(stage, stream, line)
+            receives tool output as it is produced.
+        '''
+        scheduler = StageScheduler(self.max_workers, process_slots)
+        stage_results = scheduler.run(self.stages(), on_complete, on_line)
 
-        # Run Nmap http-methods
-        nmap_http_methods_command = f"nmap --script http-methods -oX - {self.hostname}"
-        nmap_http_methods_output = self.run_command(nmap_http_methods_command)
+        # Parse the nmap XML into compact per-port records; the raw
+        # output is kept only when it is not a complete XML report
+        nmap_output = stage_results["nmap"]["output"]
+        try:
+            nmap = parse_nmap_output(nmap_output)
+            if self.store is not None:
+                self.store.add_scan(nmap, f'web_server_recon:{self.hostname}:{self.timestamp}')
+        except ET.ParseError:
+            nmap = nmap_output
 
         # Store the results in a JSON object
         results = {
             "hostname": self.hostname,
-            "nikto": nikto_output,
-            "nmap_ssl_enum_ciphers": nmap_ssl_output,
-            "nmap_heartbleed": nmap_heartbleed_output,
-            "nmap_http_methods": nmap_http_methods_output,
+            "nikto": stage_results["nikto"]["output"],
+            **split_by_script(nmap),
             "__metadata": {
-                "timestamp": self.timestamp
+                "timestamp": self.timestamp,
+                "nmap_scripts": NMAP_SCRIPTS,
+                "stages": {
+                    name: {key: value for key, value in result.items() if key not in ("output", "stderr")}
+                    for name, result in stage_results.items()
+                }
             }
         }
 
+        return results
+
+    def gather(self, verbose=False):
+
+        def on_complete(name, result):
+            print(f'{name} finished: {result["status"]} in {result["elapsed"]}s (peak RSS {result["peak_rss_kb"]} kB)')
+
+        def on_line(name, stream, line):
+            print(f'[{name}] {line}', end='', flush=True)
+
+        results = self.collect(on_complete=on_complete, on_line=on_line if verbose else None)
+
         # Print the results as JSON
         print(json.dumps(results, indent=4))
 
 if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="Gather reconnaissance against the web server for a given hostname.")
     parser.add_argument("-t", dest="hostname", help="The target hostname to scan.")
+    parser.add_argument("-w", dest="max_workers", type=int, default=4, help="Maximum number of tool stages run at once.")
+    parser.add_argument("--timeout", dest="timeout", type=float, default=None, help="Per-stage timeout in seconds.")
+    parser.add_argument("--store", dest="store", default=None, help="SQLite nmap results store to record the scan in.")
+    parser.add_argument("-v", dest="verbose", action="store_true", help="Stream tool output while the stages run.")
     args = parser.parse_args()
 
-    recon = WebServerReconnaissance(args.hostname)
-    recon.gather()
+    store = NmapStore(args.store) if args.store else None
+    recon = WebServerReconnaissance(args.hostname, args.max_workers, args.timeout, store)
+    recon.gather(args.verbose)
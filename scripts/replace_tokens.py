@@ -0,0 +1,218 @@
+'''
+    Author: Adam Wilson https://github.com/lightbroker
+
+    Purpose:
+        Replace many placeholder tokens (e.g. {{DB_PASSWORD}}) with their
+        secret values across many files in one pass per file, instead of
+        one perl/sed/awk rewrite per token per file as in
+        test_credential_replacement.sh.
+
+        All tokens are compiled into a single matcher: an alternation of
+        the literal tokens, longest first, so where tokens overlap the
+        longest one wins. Each file is streamed in chunks (a token split
+        across a chunk boundary is still found), written to a temporary
+        file in the same directory with the original's permissions (and
+        owner, where allowed) and moved over the original atomically, so a reader never sees a
+        half-written file. Files without any token are left untouched.
+        Values are inserted as raw bytes, never interpreted as a pattern
+        or replacement template, so any characters are safe; a value that
+        contains a token is not expanded again.
+
+        Values are never printed. Prefer -e (read the value from an
+        environment variable, e.g. a GitHub Actions secret) over -t, which
+        exposes the value in the process list.
+
+    Usage:
+        $ python ./replace_tokens.py replace config/app.yml docker-compose.yml -e '{{DB_PASSWORD}}=DB_PASSWORD' -e '{{API_KEY}}=API_KEY'
+        $ python ./replace_tokens.py replace config/*.yml -m tokens.json --workers 4
+        $ python ./replace_tokens.py replace config.yml -t '{{PASSWORD}}=hunter2' --check
+
+        from replace_tokens import TokenReplacer
+
+        replacer = TokenReplacer({'{{PASSWORD}}': password})
+        count = replacer.replace_file('config.yml')
+'''
+
+import argparse
+import json
+import os
+import re
+import stat
+import sys
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+
+
+CHUNK_SIZE = 1 << 20
+
+
+class TokenReplacer:
+    '''
+        Single-pass replacement of every token in a {token: value} map.
+    '''
+
+    def __init__(self, mapping, chunk_size=CHUNK_SIZE):
+        if not mapping:
+            raise ValueError('at least one token is required')
+        self.mapping = {_encode(token): _encode(value) for token, value in mapping.items()}
+        if b'' in self.mapping:
+            raise ValueError('tokens must not be empty')
+        self.chunk_size = chunk_size
+
+        tokens = sorted(self.mapping, key=len, reverse=True)
+        self.pattern = re.compile(b'|'.join(re.escape(token) for token in tokens))
+        # a token can start this many bytes before the end of the data read so far
+        self.carry = len(tokens[0]) - 1
+
+
+    def replace(self, data):
+        '''
+            Returns (data with every token replaced, number of replacements).
+        '''
+        return self.pattern.subn(lambda match: self.mapping[match.group()], _encode(data))
+
+
+    def replace_stream(self, source, target):
+        '''
+            Copies a binary stream to another, replacing tokens on the way;
+            returns the number of replacements.
+        '''
+        count = 0
+        pending = b''
+        while True:
+            chunk = source.read(self.chunk_size)
+            data = pending + chunk
+            # everything before `safe` can be matched now: any token
+            # starting there ends within the data already read
+            safe = len(data) if not chunk else max(0, len(data) - self.carry)
+
+            pieces = []
+            position = 0
+            for match in self.pattern.finditer(data):
+                if match.start() >= safe:
+                    break
+                pieces.append(data[position:match.start()])
+                pieces.append(self.mapping[match.group()])
+                position = match.end()
+                count += 1
+            cut = max(safe, position)
+            pieces.append(data[position:cut])
+            target.write(b''.join(pieces))
+            if not chunk:
+                return count
+            pending = data[cut:]
+
+
+    def replace_file(self, path):
+        '''
+            Replaces tokens in a file in place, atomically; returns the
+            number of replacements (0 leaves the file untouched).
+        '''
+        with open(path, 'rb') as source:
+            # quick check first, so unaffected files are never rewritten
+            if not self._contains_token(source):
+                return 0
+            source.seek(0)
+
+            status = os.fstat(source.fileno())
+            directory = os.path.dirname(os.path.abspath(path))
+            fd, temp_path = tempfile.mkstemp(prefix=f'.{os.path.basename(path)}.', dir=directory)
+            try:
+                with os.fdopen(fd, 'wb', buffering=1 << 20) as target:
+                    count = self.replace_stream(source, target)
+                    target.flush()
+                    os.fsync(target.fileno())
+                os.chmod(temp_path, stat.S_IMODE(status.st_mode))
+                if (status.st_uid, status.st_gid) != (os.getuid(), os.getgid()):
+                    try:
+                        os.chown(temp_path, status.st_uid, status.st_gid)
+                    except PermissionError:
+                        pass
+                os.replace(temp_path, path)
+            except BaseException:
+                os.remove(temp_path)
+                raise
+        return count
+
+
+    def _contains_token(self, source):
+        tail = b''
+        while True:
+            chunk = source.read(self.chunk_size)
+            if not chunk:
+                return False
+            data = tail + chunk
+            if self.pattern.search(data):
+                return True
+            tail = data[len(data) - self.carry:] if self.carry else b''
+
+
+def _encode(value):
+    return value.encode('utf-8') if isinstance(value, str) else value
+
+
+def _replace_file(mapping, path):
+    # process pool entry point: rebuild the matcher in the worker
+    return path, TokenReplacer(mapping).replace_file(path)
+
+
+def replace_files(mapping, paths, workers=1):
+    '''
+        Replaces tokens in every file, across `workers` processes; returns {path: replacements}.
+    '''
+    if workers <= 1 or len(paths) <= 1:
+        replacer = TokenReplacer(mapping)
+        return {path: replacer.replace_file(path) for path in paths}
+
+    with ProcessPoolExecutor(max_workers=min(workers, len(paths))) as pool:
+        futures = [pool.submit(_replace_file, mapping, path) for path in paths]
+        return dict(future.result() for future in futures)
+
+
+def parse_assignment(value):
+    '''
+        Splits "TOKEN=VALUE" at the first "=" (values such as base64 secrets often contain "=").
+    '''
+    token, separator, rest = value.partition('=')
+    if not separator or not token:
+        raise ValueError(f'"{value}" is not of the form TOKEN=VALUE')
+    return token, rest
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Replace secret tokens across files in a single pass per file')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    replace_parser = subparsers.add_parser('replace', help='replace tokens in files, in place')
+    replace_parser.add_argument('files', nargs='+', help='files to rewrite')
+    replace_parser.add_argument('-t', dest='tokens', action='append', default=[], help='TOKEN=VALUE (repeatable; visible in the process list)')
+    replace_parser.add_argument('-e', dest='env_tokens', action='append', default=[], help='TOKEN=ENV_VAR, value read from the environment (repeatable)')
+    replace_parser.add_argument('-m', dest='map_file', default=None, help='JSON file of {"TOKEN": "VALUE"}')
+    replace_parser.add_argument('--workers', type=int, default=1, help='number of worker processes')
+    replace_parser.add_argument('--check', action='store_true', help='exit with an error if any file had no tokens to replace')
+
+    args = parser.parse_args()
+
+    mapping = {}
+    try:
+        if args.map_file is not None:
+            with open(args.map_file, 'r') as f:
+                mapping.update(json.load(f))
+        for assignment in args.tokens:
+            token, value = parse_assignment(assignment)
+            mapping[token] = value
+        for assignment in args.env_tokens:
+            token, name = parse_assignment(assignment)
+            if name not in os.environ:
+                raise ValueError(f'environment variable {name} for token {token} is not set')
+            mapping[token] = os.environ[name]
+        counts = replace_files(mapping, args.files, args.workers)
+    except (OSError, ValueError) as e:
+        print(e, file=sys.stderr)
+        sys.exit(1)
+
+    for path, count in counts.items():
+        print(f'{path}: {count} replacement(s)')
+    if args.check and not all(counts.values()):
+        print('some files had no tokens to replace', file=sys.stderr)
+        sys.exit(1)
@@ -0,0 +1,146 @@
+'''
+    Author: Adam Wilson https://github.com/lightbroker
+
+    Purpose:
+        Low-overhead result capture for payload runs.
+
+        Responses are handed to a background writer thread, which
+        hashes them and appends one JSON line per result (size is in
+        bytes, text frames counted UTF-8 encoded):
+            {"index": 12, "latency": 0.0123, "size": 431, "hash": "9f2c..."}
+
+        The same thread keeps an in-memory index of responses grouped by
+        hash and by size. Once a baseline number of responses has been
+        seen, any response with a size not seen before is reported
+        immediately, rather than found later by grepping the output.
+
+    Usage:
+        from result_sink import ResultSink
+
+        with ResultSink('results.jsonl') as sink:
+            runner.run(messages, sink.add)
+        print(sink.index.summary())
+'''
+
+import hashlib
+import json
+import queue
+import threading
+from collections import Counter
+
+
+def response_bytes(response):
+    '''
+        A response as bytes: text frames UTF-8 encoded, binary frames as they are.
+    '''
+    if isinstance(response, str):
+        return response.encode('utf-8', 'surrogateescape')
+    return response
+
+
+def response_hash(response):
+    return hashlib.blake2b(response_bytes(response), digest_size=8).hexdigest()
+
+
+class ResponseIndex:
+    '''
+        Groups responses by hash and by size.
+    '''
+
+    def __init__(self, baseline=20):
+        self.baseline = baseline
+        self.total = 0
+        self.failed = 0
+        self.by_hash = {}
+        self.by_size = Counter()
+
+
+    def add(self, record):
+        '''
+            Adds a result record; returns True if it looks anomalous.
+        '''
+        self.total += 1
+        if record['hash'] is None:
+            self.failed += 1
+            return False
+
+        group = self.by_hash.get(record['hash'])
+        if group is None:
+            group = self.by_hash[record['hash']] = {'count': 0, 'size': record['size'], 'indexes': []}
+        group['count'] += 1
+        if len(group['indexes']) < 10:
+            group['indexes'].append(record['index'])
+
+        new_size = record['size'] not in self.by_size
+        self.by_size[record['size']] += 1
+        return new_size and self.total > self.baseline
+
+
+    def rare_sizes(self, max_count=1):
+        return sorted(size for size, count in self.by_size.items() if count <= max_count)
+
+
+    def summary(self, top=10):
+        lines = [f'{self.total} results, {self.failed} failed, {len(self.by_hash)} distinct responses, {len(self.by_size)} distinct sizes']
+        lines.append('most common responses:')
+        groups = sorted(self.by_hash.items(), key=lambda item: item[1]['count'], reverse=True)
+        for digest, group in groups[:top]:
+            lines.append(f'  {digest}  count={group["count"]}  size={group["size"]}  e.g. payloads {group["indexes"][:5]}')
+        rare = self.rare_sizes()
+        if rare:
+            lines.append(f'sizes seen only once: {rare[:50]}')
+        return '\n'.join(lines)
+
+
+class ResultSink:
+
+    def __init__(self, results_file, baseline=20, report=print):
+        self.results_file = results_file
+        self.index = ResponseIndex(baseline)
+        self.report = report
+
+        self._queue = queue.SimpleQueue()
+        self._thread = threading.Thread(target=self._write, daemon=True)
+        self._thread.start()
+
+
+    def add(self, index, response, latency):
+        '''
+            Queues one result; safe to call from the event loop or any thread.
+        '''
+        self._queue.put((index, response, latency))
+
+
+    def _write(self):
+        with open(self.results_file, 'a', buffering=1 << 16) as f:
+            while True:
+                item = self._queue.get()
+                if item is None:
+                    return
+                index, response, latency = item
+
+                # size in bytes, for text and binary frames alike
+                data = None if response is None else response_bytes(response)
+                record = {
+                    'index': index,
+                    'latency': round(latency, 6),
+                    'size': None if data is None else len(data),
+                    'hash': None if data is None else response_hash(data),
+                }
+                f.write(json.dumps(record) + '\n')
+
+                if self.index.add(record) and self.report is not None:
+                    self.report(f'anomalous response: payload {index}, size {record["size"]}, hash {record["hash"]}')
+
+
+    def close(self):
+        self._queue.put(None)
+        self._thread.join()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
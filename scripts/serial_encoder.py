@@ -1,85 +1,301 @@
 '''
-    Creates a list of either HTML- or URL-encoded values based on specified repeitions and a provided string value.
-    Useful for creating Burp Intruder payloads.
+    Creates lists of encoded values from a payload list, applying one or
+    more encoding chains to every payload. Useful for creating Burp
+    Intruder payloads.
 
     Usage:
-        $ python serial_encoder.py [encoding] [repetitions] [value]
+        $ python serial_encoder.py [-i payloads.txt | value ...] -c chain [-c chain ...] [options]
+        $ python serial_encoder.py [-h | -u] [repetitions] [value]
 
-    Author: 
+    Encoders: url, double-url, html, base64, unicode-escape, hex. A chain
+    composes encoders left to right with "+", e.g. "html+url" or
+    "base64+url"; mixed sequences are just longer chains. Every payload
+    is written once as-is (unless --no-original), followed by the result
+    of each chain. With --layers N each chain is applied repeatedly and
+    every intermediate layer is written. All output goes through one
+    buffered writer: a text file, stdout ("-o -"), or an offset-indexed
+    binary wordlist (--format=binary, see wordlist_format.py).
+
+    The original form, -h or -u with a repetition count and one value, is
+    still accepted and writes the same list to htmlencoded_payloads_<ts>.txt
+    or urlencoded_payloads_<ts>.txt.
+
+    Author:
         adam wilson
         https://github.com/lightbroker
 
     Example Command:
         $ python3 ./serial_encoder.py -u 3 "<div>test</div>"
-    
+
     Example Output:
         <div>test</div>
         %3Cdiv%3Etest%3C/div%3E
         %253Cdiv%253Etest%253C/div%253E
         %25253Cdiv%25253Etest%25253C/div%25253E
+
+    Example Command:
+        $ python3 ./serial_encoder.py -i payloads.txt -c url -c html+url -c base64 -o - > intruder.txt
 '''
 
+import argparse
+import base64
 import calendar
 import html
 import sys
 import time
 import urllib.parse
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+from wordlist_format import WordlistWriter
+
+
+BATCH_SIZE = 10000
+HEX_ESCAPES = [f'\\x{i:02x}' for i in range(256)]
+
+
+def url_encode(value):
+    return urllib.parse.quote(value)
+
+
+def double_url_encode(value):
+    return urllib.parse.quote(urllib.parse.quote(value))
+
+
+def html_encode(value):
+    return html.escape(value)
+
+
+def base64_encode(value):
+    return base64.b64encode(value.encode('utf-8')).decode('ascii')
+
+
+class _EscapeTable(dict):
+    '''
+        str.translate table that computes (and keeps) the escape of each character on first use.
+    '''
+
+    def __init__(self, escape):
+        self.escape = escape
+
+
+    def __missing__(self, codepoint):
+        escaped = self[codepoint] = self.escape(chr(codepoint))
+        return escaped
+
+
+def _utf16_escape(char):
+    units = char.encode('utf-16-be', 'surrogatepass').hex()
+    return ''.join(['\\u' + units[i:i + 4] for i in range(0, len(units), 4)])
+
+
+UNICODE_ESCAPES = _EscapeTable(_utf16_escape)
+
+
+def unicode_escape(value):
+    '''
+        Escapes every character as \\uXXXX (UTF-16 code units, so astral characters become surrogate pairs).
+    '''
+    return value.translate(UNICODE_ESCAPES)
+
+
+def hex_escape(value):
+    '''
+        Escapes every UTF-8 byte as \\xNN.
+    '''
+    return ''.join(map(HEX_ESCAPES.__getitem__, value.encode('utf-8')))
+
+
+ENCODERS = {
+    "url": url_encode,
+    "double-url": double_url_encode,
+    "html": html_encode,
+    "base64": base64_encode,
+    "unicode-escape": unicode_escape,
+    "hex": hex_escape,
+}
+
+
+def parse_chain(spec):
+    '''
+        Returns the encoder functions for a chain spec like "html+url".
+    '''
+    names = [name.strip() for name in spec.split('+')]
+    unknown = [name for name in names if name not in ENCODERS]
+    if unknown or not names:
+        raise ValueError(f'unknown encoder(s) in chain "{spec}": {", ".join(unknown)} (choose from {", ".join(ENCODERS)})')
+    return [ENCODERS[name] for name in names]
+
+
+class EncoderPipeline:
+    '''
+        Applies a list of encoding chains to payloads, `layers` times each.
+    '''
+
+    def __init__(self, chains, layers=1, include_original=True):
+        self.chains = [parse_chain(chain) if isinstance(chain, str) else chain for chain in chains]
+        self.layers = layers
+        self.include_original = include_original
+
+
+    def encode(self, value):
+        '''
+            Returns the output lines for one payload.
+        '''
+        lines = [value] if self.include_original else []
+        for chain in self.chains:
+            encoded = value
+            for _ in range(self.layers):
+                for encoder in chain:
+                    encoded = encoder(encoded)
+                lines.append(encoded)
+        return lines
+
+
+    def iter_batches(self, payloads, batch_size=BATCH_SIZE):
+        '''
+            Yields the output for `batch_size` payloads at a time as one newline-terminated string.
+        '''
+        lines = []
+        count = 0
+        for value in payloads:
+            lines.extend(self.encode(value))
+            count += 1
+            if count == batch_size:
+                yield '\n'.join(lines) + '\n'
+                lines = []
+                count = 0
+        if lines:
+            yield '\n'.join(lines) + '\n'
+
+
+    def encode_batch(self, values):
+        return next(self.iter_batches(values, len(values)), '')
+
+
+    def write(self, payloads, out, workers=1):
+        '''
+            Writes every output line to a text stream, in input order;
+            returns the number of payloads read. With workers > 1 batches
+            are encoded on a process pool.
+        '''
+        payloads = _Counted(payloads)
+        if workers <= 1:
+            for batch in self.iter_batches(payloads):
+                out.write(batch)
+            return payloads.count
+
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            # bounded window of in-flight batches, written back in order
+            pending = deque()
+            batch = []
+            for value in payloads:
+                batch.append(value)
+                if len(batch) == BATCH_SIZE:
+                    pending.append(pool.submit(self.encode_batch, batch))
+                    batch = []
+                    if len(pending) >= workers * 2:
+                        out.write(pending.popleft().result())
+            if batch:
+                pending.append(pool.submit(self.encode_batch, batch))
+            while pending:
+                out.write(pending.popleft().result())
+        return payloads.count
+
+
+    def write_wordlist(self, payloads, writer):
+        '''
+            Writes every output line as a record of a wordlist_format.WordlistWriter.
+        '''
+        payloads = _Counted(payloads)
+        for value in payloads:
+            writer.write_many(self.encode(value))
+        return payloads.count
+
+
+class _Counted:
+
+    def __init__(self, iterable):
+        self.iterable = iterable
+        self.count = 0
+
+
+    def __iter__(self):
+        for value in self.iterable:
+            self.count += 1
+            yield value
+
+
+def iter_payloads(path):
+    '''
+        Lazily yields payloads, one per line, from a file (or stdin for "-").
+    '''
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8', newline='')
+    try:
+        for line in f:
+            yield line.rstrip('\r\n')
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+def open_text_output(path):
+    if path == '-':
+        return sys.stdout
+    return open(path, 'w', encoding='utf-8', buffering=1 << 20)
+
+
+if __name__ == "__main__":
+    # -h is the legacy HTML encoding flag, so help is --help only
+    parser = argparse.ArgumentParser(description='Encode payloads through composable encoding chains.', add_help=False)
+    parser.add_argument('--help', action='help', help='show this help message and exit')
+    parser.add_argument('values', nargs='*', help='payload value(s) to encode')
+    parser.add_argument('-i', dest='input', default=None, help='payload list, one per line (- for stdin)')
+    parser.add_argument('-c', dest='chains', action='append', default=[], help=f'encoding chain, e.g. url or html+url (repeatable; encoders: {", ".join(ENCODERS)})')
+    parser.add_argument('--layers', dest='layers', type=int, default=1, help='apply each chain this many times, writing every layer')
+    parser.add_argument('--no-original', dest='include_original', action='store_false', help='do not write the unencoded payload')
+    parser.add_argument('-o', dest='output', default=None, help='output file, or - for stdout (default: encoded_payloads_<timestamp>.txt)')
+    parser.add_argument('--format', choices=['text', 'binary'], default='text', help='output format')
+    parser.add_argument('-w', dest='workers', type=int, default=1, help='worker processes encoding batches of payloads (text output)')
+    parser.add_argument('-h', dest='html_repetitions', type=int, default=None, help='legacy: HTML encode the value this many times')
+    parser.add_argument('-u', dest='url_repetitions', type=int, default=None, help='legacy: URL encode the value this many times')
+    args = parser.parse_args()
+
+    timestamp = calendar.timegm(time.gmtime())
+    chains = args.chains
+    layers = args.layers
+    output = args.output
+    if args.html_repetitions is not None or args.url_repetitions is not None:
+        legacy = 'html' if args.html_repetitions is not None else 'url'
+        chains = [legacy]
+        layers = args.html_repetitions if legacy == 'html' else args.url_repetitions
+        output = output or f'{legacy}encoded_payloads_{timestamp}.txt'
+    if not chains:
+        parser.error('at least one encoding chain (-c) is required')
+    if args.input is None and not args.values:
+        parser.error('provide payload values or a payload list (-i)')
+
+    output = output or f'encoded_payloads_{timestamp}.txt'
+    if args.format == 'binary' and output == '-':
+        parser.error('--format=binary needs an output file')
+
+    try:
+        pipeline = EncoderPipeline(chains, layers, args.include_original)
+    except ValueError as e:
+        parser.error(str(e))
 
+    payloads = iter_payloads(args.input) if args.input is not None else iter(args.values)
+    if args.format == 'binary':
+        with WordlistWriter(output) as writer:
+            count = pipeline.write_wordlist(payloads, writer)
+    else:
+        out = open_text_output(output)
+        try:
+            count = pipeline.write(payloads, out, args.workers)
+        finally:
+            if out is sys.stdout:
+                out.flush()
+            else:
+                out.close()
 
-# command line args
-encoding_arg = sys.argv[1]
-repetitions_arg = sys.argv[2]
-value = sys.argv[3]
-
-print(encoding_arg)
-print(repetitions_arg)
-print(value)
-
-# defaults
-results_filename = ''
-repetitions = 0
-use_html_encoding = False
-use_url_encoding = False
-timestamp = calendar.timegm(time.gmtime())
-
-# validate encoding arg
-if encoding_arg == '-h':
-    use_html_encoding = True
-elif encoding_arg == '-u':
-    use_url_encoding = True
-else:
-    print('Encoding invalid or not specified.')
-    exit()
-
-# repetitions argument must be a digit
-if repetitions_arg.isdigit() == False:
-    print(f'"{repetitions_arg}" is not a digit.')
-    exit()
-else:
-    repetitions = int(repetitions_arg)
-
-def write_line(value):
-    with open(results_filename, 'at') as list_file:
-        list_file.write(f'{value}\n')
-
-def html_encode(value, repetitions):
-    while (repetitions > 0):
-        value = html.escape(value)
-        write_line(value)
-        repetitions -= 1
-
-def url_encode(value, repetitions):
-    while (repetitions > 0):
-        value = urllib.parse.quote(value)
-        write_line(value)
-        repetitions -= 1
-
-if use_html_encoding == True:
-    results_filename = f'htmlencoded_payloads_{timestamp}.txt'
-    write_line(value)
-    html_encode(value, repetitions)
-
-if use_url_encoding == True:
-    results_filename = f'urlencoded_payloads_{timestamp}.txt'
-    write_line(value)
-    url_encode(value, repetitions)
+    print(f'encoded {count} payload(s) with {len(chains)} chain(s) into {output}', file=sys.stderr)
@@ -1,5 +1,12 @@
 #!/bin/bash
 
+# replace_github_secret and replace_github_secrets use replace_tokens.py
+# (one pass per file for any number of tokens) when python3 is available,
+# and fall back to one perl/awk rewrite per token otherwise. The same
+# password matrix runs under pytest in tests/test_replace_tokens.py.
+
+REPLACE_TOKENS_PY="$(cd "$(dirname "${BASH_SOURCE[0]}")" && pwd)/replace_tokens.py"
+
 # Function to safely replace tokens using printf and sed
 # This approach handles special characters by using printf %q for proper escaping
 replace_token_safe() {
@@ -47,7 +54,11 @@ replace_github_secret() {
     echo "Replacing token '$token' in file '$file'"
     
     # Choose the most robust method available
-    if command -v perl >/dev/null 2>&1; then
+    if command -v python3 >/dev/null 2>&1 && [ -f "$REPLACE_TOKENS_PY" ]; then
+        # the value goes through the environment, not the process list
+        REPLACE_TOKEN_VALUE="$secret_value" python3 "$REPLACE_TOKENS_PY" replace "$file" -e "$token=REPLACE_TOKEN_VALUE" >/dev/null || return 1
+        echo "Used replace_tokens.py"
+    elif command -v perl >/dev/null 2>&1; then
         replace_token_perl "$file" "$token" "$secret_value"
         echo "Used perl method"
     else
@@ -56,6 +67,24 @@ replace_github_secret() {
     fi
 }
 
+# Replace several tokens across several files, one pass per file:
+#   replace_github_secrets <file>... -- <TOKEN=ENV_VAR>...
+# each value is read from the named environment variable
+replace_github_secrets() {
+    local files=()
+    while [ "$#" -gt 0 ] && [ "$1" != "--" ]; do
+        files+=("$1")
+        shift
+    done
+    shift
+    local env_tokens=()
+    for assignment in "$@"; do
+        env_tokens+=(-e "$assignment")
+    done
+
+    python3 "$REPLACE_TOKENS_PY" replace "${files[@]}" "${env_tokens[@]}"
+}
+
 # Test function to validate replacements
 run_tests() {
     echo "Running token replacement tests..."
@@ -152,6 +181,15 @@ github_actions_example() {
     echo "    replace_github_secret \"config/app.yml\" \"{{API_KEY}}\" \"\${{ secrets.API_KEY }}\""
     echo "    replace_github_secret \"docker-compose.yml\" \"{{SECRET_TOKEN}}\" \"\${{ secrets.SECRET_TOKEN }}\""
     echo ""
+    echo "# Many tokens and files in one pass per file:"
+    echo "- name: Replace secrets in config"
+    echo "  env:"
+    echo "    DB_PASSWORD: \${{ secrets.DB_PASSWORD }}"
+    echo "    API_KEY: \${{ secrets.API_KEY }}"
+    echo "  run: |"
+    echo "    source ./test_credential_replacement.sh"
+    echo "    replace_github_secrets config/app.yml docker-compose.yml -- '{{DB_PASSWORD}}=DB_PASSWORD' '{{API_KEY}}=API_KEY'"
+    echo ""
     echo "# Alternative one-liner usage:"
     echo "- name: Replace password token"
     echo "  run: |"
@@ -178,6 +216,7 @@ case "${1:-}" in
         echo ""
         echo "Functions available when sourced:"
         echo "  replace_github_secret <file> <token> <secret_value>"
+        echo "  replace_github_secrets <file>... -- <TOKEN=ENV_VAR>..."
         echo "  replace_token_safe <file> <token> <value>"
         echo "  replace_token_awk <file> <token> <value>"
         echo "  replace_token_perl <file> <token> <value>"
@@ -0,0 +1,361 @@
+'''
+    Author: Adam Wilson https://github.com/lightbroker
+
+    Purpose:
+        Persistent "already tried" store for candidate lists and payloads,
+        so repeat runs against the same target only pay for new work.
+
+        Each (target, stage) pair, e.g. ("example.com", "dns-brute") or
+        ("wss://host/", "websockets"), gets its own Bloom filter file in
+        the store directory. A filter is a fixed-size bit array that is
+        memory-mapped, so membership tests and inserts touch only a few
+        pages and never load the file into memory. It is sized for an
+        expected number of items and a false-positive rate: past that
+        capacity the rate degrades, so size it for the whole engagement.
+        A false positive means a candidate is wrongly skipped; nothing is
+        ever tried twice.
+
+        Filters with the same size and hash count (i.e. created with the
+        same capacity and error rate) merge by OR-ing their bits, so
+        stores from separate machines or engagements can be combined.
+
+        A filter has one writer at a time; concurrent writers from
+        separate processes may lose each other's inserts.
+
+    Usage:
+        $ python ./prefix_builder.py 4 - | python ./tried_store.py filter -s tried/ -t example.com --stage dns-brute > new.txt
+        $ python ./tried_store.py add -s tried/ -t example.com --stage dns-brute -i tried_labels.txt
+        $ python ./tried_store.py merge tried/ other-run/tried/
+        $ python ./tried_store.py info tried/
+
+        from tried_store import TriedStore
+
+        store = TriedStore('tried/')
+        tried = store.open('example.com', 'dns-brute')
+        for label in tried.unseen(labels):
+            ...
+            tried.add(label)
+        store.close()
+'''
+
+import argparse
+import hashlib
+import math
+import mmap
+import os
+import re
+import struct
+import sys
+
+
+MAGIC = b'TRYB'
+VERSION = 1
+
+# magic, version, hash count, reserved, bits, capacity, count, error rate
+HEADER = struct.Struct('<4sBBHQQQd')
+HEADER_SIZE = 64
+
+DEFAULT_CAPACITY = 10_000_000
+DEFAULT_ERROR_RATE = 0.001
+
+MERGE_CHUNK = 1 << 20
+
+
+def filter_size(capacity, error_rate):
+    '''
+        Returns (bits, hash count) for a Bloom filter holding `capacity` items at `error_rate`.
+    '''
+    if capacity < 1 or not 0 < error_rate < 1:
+        raise ValueError('capacity must be positive and error rate between 0 and 1')
+    bits = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+    # whole bytes
+    bits = (bits + 7) // 8 * 8
+    hashes = max(1, round(bits / capacity * math.log(2)))
+    return bits, min(hashes, 255)
+
+
+def _encode(item):
+    return item.encode('utf-8') if isinstance(item, str) else item
+
+
+class BloomFilter:
+    '''
+        Memory-mapped Bloom filter file. Created with the given capacity
+        and error rate if missing; an existing file keeps its own.
+    '''
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.path = path
+        if not os.path.exists(path):
+            bits, hashes = filter_size(capacity, error_rate)
+            temp_path = f'{path}.tmp'
+            with open(temp_path, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, VERSION, hashes, 0, bits, capacity, 0, error_rate).ljust(HEADER_SIZE, b'\0'))
+                # sparse where the filesystem allows
+                f.truncate(HEADER_SIZE + bits // 8)
+            os.replace(temp_path, path)
+
+        self._file = open(path, 'r+b')
+        magic, version, self.hashes, _, self.bits, self.capacity, self.count, self.error_rate = \
+            HEADER.unpack(self._file.read(HEADER.size))
+        if magic != MAGIC or version != VERSION:
+            self._file.close()
+            raise ValueError(f'{path} is not a tried store filter')
+        if os.fstat(self._file.fileno()).st_size != HEADER_SIZE + self.bits // 8:
+            self._file.close()
+            raise ValueError(f'{path} is truncated')
+        self._map = mmap.mmap(self._file.fileno(), 0)
+
+
+    def _positions(self, item):
+        # double hashing: k positions from two 64-bit halves of one digest
+        h1, h2 = struct.unpack('<QQ', hashlib.blake2b(_encode(item), digest_size=16).digest())
+        h2 |= 1
+        bits = self.bits
+        return [HEADER_SIZE * 8 + (h1 + i * h2) % bits for i in range(self.hashes)]
+
+
+    def __contains__(self, item):
+        data = self._map
+        return all(data[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+    def add(self, item):
+        '''
+            Marks an item as tried; returns True if it was not (probably) tried before.
+        '''
+        data = self._map
+        new = False
+        for position in self._positions(item):
+            byte = data[position >> 3]
+            mask = 1 << (position & 7)
+            if not byte & mask:
+                data[position >> 3] = byte | mask
+                new = True
+        if new:
+            self.count += 1
+        return new
+
+
+    def update(self, items):
+        for item in items:
+            self.add(item)
+
+
+    def unseen(self, items, mark=False, key=None):
+        '''
+            Lazily yields the items not tried yet. With `mark`, yielded
+            items are recorded as tried straight away (which also drops
+            repeats within `items`); otherwise the caller adds each item
+            once it has actually been tried. `key` maps an item to the
+            value stored in the filter.
+        '''
+        for item in items:
+            value = item if key is None else key(item)
+            if mark:
+                if self.add(value):
+                    yield item
+            elif value not in self:
+                yield item
+
+
+    def merge(self, other):
+        '''
+            ORs another filter (a BloomFilter or path) into this one.
+        '''
+        if not isinstance(other, BloomFilter):
+            other = BloomFilter(other)
+            try:
+                return self.merge(other)
+            finally:
+                other.close()
+        if (other.bits, other.hashes) != (self.bits, self.hashes):
+            raise ValueError(f'cannot merge {other.path} into {self.path}: filters differ in size or hash count')
+
+        end = HEADER_SIZE + self.bits // 8
+        for offset in range(HEADER_SIZE, end, MERGE_CHUNK):
+            stop = min(offset + MERGE_CHUNK, end)
+            merged = int.from_bytes(self._map[offset:stop], 'little') | int.from_bytes(other._map[offset:stop], 'little')
+            self._map[offset:stop] = merged.to_bytes(stop - offset, 'little')
+        self.count = self.estimated_count()
+
+
+    def fill_ratio(self):
+        ones = 0
+        end = HEADER_SIZE + self.bits // 8
+        for offset in range(HEADER_SIZE, end, MERGE_CHUNK):
+            ones += int.from_bytes(self._map[offset:min(offset + MERGE_CHUNK, end)], 'little').bit_count()
+        return ones / self.bits
+
+
+    def estimated_count(self):
+        '''
+            Estimates the number of distinct items from the fraction of bits set.
+        '''
+        fill = self.fill_ratio()
+        if fill >= 1:
+            return self.capacity
+        return round(-self.bits / self.hashes * math.log(1 - fill))
+
+
+    def current_error_rate(self):
+        '''
+            False-positive rate at the current fill (what a new candidate risks being wrongly skipped at).
+        '''
+        return self.fill_ratio() ** self.hashes
+
+
+    def flush(self):
+        self._map[:HEADER.size] = HEADER.pack(MAGIC, VERSION, self.hashes, 0, self.bits,
+                                              self.capacity, self.count, self.error_rate)
+        self._map.flush()
+
+
+    def close(self):
+        if self._map.closed:
+            return
+        self.flush()
+        self._map.close()
+        self._file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class TriedStore:
+    '''
+        Directory of Bloom filters, one per (target, stage).
+    '''
+
+    def __init__(self, directory, capacity=DEFAULT_CAPACITY, error_rate=DEFAULT_ERROR_RATE):
+        self.directory = directory
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self._filters = {}
+        os.makedirs(directory, exist_ok=True)
+
+
+    def path(self, target, stage):
+        # readable, filesystem-safe name plus a digest so distinct targets never collide
+        digest = hashlib.sha1(f'{target}\0{stage}'.encode('utf-8')).hexdigest()[:10]
+        name = re.sub(r'[^A-Za-z0-9.-]+', '_', f'{target}.{stage}').strip('_.')[:100]
+        return os.path.join(self.directory, f'{name}.{digest}.bloom')
+
+
+    def open(self, target, stage):
+        '''
+            Returns the (shared, created on first use) filter for a target and stage.
+        '''
+        key = (target, stage)
+        if key not in self._filters:
+            self._filters[key] = BloomFilter(self.path(target, stage), self.capacity, self.error_rate)
+        return self._filters[key]
+
+
+    def filters(self):
+        '''
+            Returns the paths of every filter file in the store.
+        '''
+        return sorted(
+            os.path.join(self.directory, name) for name in os.listdir(self.directory) if name.endswith('.bloom')
+        )
+
+
+    def merge(self, other_directory):
+        '''
+            Merges every filter of another store directory into this one,
+            copying filters for targets this store hasn't seen.
+        '''
+        self.close()
+        for other_path in TriedStore(other_directory).filters():
+            path = os.path.join(self.directory, os.path.basename(other_path))
+            if os.path.exists(path):
+                with BloomFilter(path) as bloom:
+                    bloom.merge(other_path)
+            else:
+                with BloomFilter(other_path) as other, BloomFilter(path, other.capacity, other.error_rate) as bloom:
+                    bloom.merge(other)
+
+
+    def close(self):
+        for bloom in self._filters.values():
+            bloom.close()
+        self._filters = {}
+
+
+def _iter_lines(path):
+    f = sys.stdin if path == '-' else open(path, 'r', encoding='utf-8', newline='')
+    try:
+        for line in f:
+            line = line.rstrip('\r\n')
+            if line:
+                yield line
+    finally:
+        if f is not sys.stdin:
+            f.close()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Persistent "already tried" store for candidates and payloads')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for command, description in (('filter', 'stream only untried lines to stdout'), ('add', 'mark lines as tried')):
+        subparser = subparsers.add_parser(command, help=description)
+        subparser.add_argument('-s', dest='store', required=True, help='store directory')
+        subparser.add_argument('-t', dest='target', required=True, help='target, e.g. example.com or a WebSockets URL')
+        subparser.add_argument('--stage', required=True, help='stage name, e.g. dns-brute or websockets')
+        subparser.add_argument('-i', dest='input', default='-', help='input lines (default: stdin)')
+        subparser.add_argument('--capacity', type=int, default=DEFAULT_CAPACITY, help='expected items, for a new filter')
+        subparser.add_argument('--error-rate', dest='error_rate', type=float, default=DEFAULT_ERROR_RATE, help='false-positive rate, for a new filter')
+        if command == 'filter':
+            subparser.add_argument('--mark', action='store_true', help='also mark the lines written as tried')
+
+    merge_parser = subparsers.add_parser('merge', help='merge other store directories into a store')
+    merge_parser.add_argument('store', help='store directory merged into')
+    merge_parser.add_argument('others', nargs='+', help='store directories to merge from')
+
+    info_parser = subparsers.add_parser('info', help='describe the filters in a store')
+    info_parser.add_argument('store', help='store directory')
+
+    args = parser.parse_args()
+
+    if args.command in ('filter', 'add'):
+        store = TriedStore(args.store, args.capacity, args.error_rate)
+        tried = store.open(args.target, args.stage)
+        try:
+            if args.command == 'add':
+                new = sum(tried.add(line) for line in _iter_lines(args.input))
+                print(f'{new} new item(s) marked as tried', file=sys.stderr)
+            else:
+                out = sys.stdout
+                for line in tried.unseen(_iter_lines(args.input), mark=args.mark):
+                    out.write(line + '\n')
+                out.flush()
+        except BrokenPipeError:
+            store.close()
+            os._exit(0)
+        finally:
+            store.close()
+
+    elif args.command == 'merge':
+        store = TriedStore(args.store)
+        for other in args.others:
+            try:
+                store.merge(other)
+            except ValueError as e:
+                print(e)
+                exit()
+        print(f'merged {len(args.others)} store(s) into {args.store}')
+
+    else:
+        for path in TriedStore(args.store).filters():
+            with BloomFilter(path) as bloom:
+                print(f'{os.path.basename(path)}')
+                print(f'    items:      ~{bloom.estimated_count()} (capacity {bloom.capacity})')
+                print(f'    size:       {bloom.bits // 8} bytes, {bloom.hashes} hashes')
+                print(f'    error rate: {bloom.current_error_rate():.2e} (target {bloom.error_rate:.2e})')
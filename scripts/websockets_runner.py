@@ -0,0 +1,148 @@
+'''
+    Author: Adam Wilson https://github.com/lightbroker
+
+    Purpose:
+        Concurrent asyncio WebSockets payload runner. Keeps a pool of
+        persistent connections open, sends each message over whichever
+        connection is free and waits for its response, with a cap on
+        requests in flight and on requests per second. Dropped
+        connections are re-established and the message retried.
+
+        Each connection carries one request at a time: responses have no
+        request ID to match them by, so requests are never pipelined.
+        Requests in flight are therefore at most pool_size;
+        max_in_flight can only lower that (e.g. to keep connections
+        warm while sending slowly).
+
+        Only run this against targets you are authorized to test.
+
+    Usage:
+        from websockets_runner import WebSocketsRunner
+
+        def on_result(index, response, latency):
+            print(index, latency, response)
+
+        runner = WebSocketsRunner('ws://127.0.0.1:8765/', pool_size=8, rate=200)
+        runner.run(messages, on_result)
+'''
+
+import asyncio
+import time
+
+import websockets
+
+from rate_limiter import RateLimiter
+
+
+class WebSocketsRunner:
+
+    def __init__(self, url, origin=None, headers=None, pool_size=4, max_in_flight=None,
+                 rate=None, timeout=10.0, retries=3):
+        self.url = url
+        self.origin = origin
+        self.headers = headers or []
+        if max_in_flight is not None and not 1 <= max_in_flight <= pool_size:
+            raise ValueError(f'max_in_flight must be between 1 and the pool size ({pool_size}): '
+                             'each connection has at most one request in flight')
+        self.pool_size = pool_size
+        self.max_in_flight = max_in_flight or pool_size
+        self.rate = rate
+        self.timeout = timeout
+        self.retries = retries
+
+        self.sent = 0
+        self.failed = 0
+        self.reconnects = 0
+
+
+    async def _connect(self):
+        return await websockets.connect(
+            self.url,
+            origin=self.origin,
+            additional_headers=self.headers,
+            open_timeout=self.timeout,
+            max_size=None,
+        )
+
+
+    async def _exchange(self, connection, message):
+        await connection.send(message)
+        return await asyncio.wait_for(connection.recv(), self.timeout)
+
+
+    async def _worker(self, queue, limiter, in_flight, on_result):
+        connection = None
+        try:
+            while True:
+                item = await queue.get()
+                if item is None:
+                    return
+                index, message = item
+
+                response = None
+                started = time.monotonic()
+                for attempt in range(self.retries + 1):
+                    try:
+                        if connection is None:
+                            connection = await self._connect()
+                        async with in_flight:
+                            await limiter.wait()
+                            started = time.monotonic()
+                            response = await self._exchange(connection, message)
+                        break
+                    except (websockets.WebSocketException, asyncio.TimeoutError, OSError) as e:
+                        # server dropped (or never accepted) the connection; reconnect and retry
+                        if connection is not None:
+                            await connection.close()
+                            connection = None
+                            self.reconnects += 1
+                        if attempt == self.retries:
+                            print(f'payload {index} failed after {attempt + 1} attempts: {e!r}')
+                        else:
+                            await asyncio.sleep(min(0.1 * 2 ** attempt, 5.0))
+
+                if response is None:
+                    self.failed += 1
+                else:
+                    self.sent += 1
+                on_result(index, response, time.monotonic() - started)
+        finally:
+            if connection is not None:
+                await connection.close()
+
+
+    async def run_async(self, messages, on_result):
+        '''
+            Sends every message in the (possibly lazy) iterable, calling
+            on_result(index, response, latency) as each one completes.
+            `response` is None when the message could not be delivered.
+            An exception raised by on_result stops the run and is re-raised.
+        '''
+        queue = asyncio.Queue(maxsize=self.pool_size * 2)
+        limiter = RateLimiter(self.rate)
+        in_flight = asyncio.Semaphore(self.max_in_flight)
+
+        async def produce():
+            for item in enumerate(messages):
+                await queue.put(item)
+            for _ in range(self.pool_size):
+                await queue.put(None)
+
+        tasks = [
+            asyncio.create_task(self._worker(queue, limiter, in_flight, on_result))
+            for _ in range(self.pool_size)
+        ]
+        tasks.append(asyncio.create_task(produce()))
+        try:
+            # an exception in a worker (e.g. from on_result) ends the run
+            # instead of leaving the producer blocked on a full queue
+            done, _ = await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
+
+
+    def run(self, messages, on_result):
+        asyncio.run(self.run_async(messages, on_result))
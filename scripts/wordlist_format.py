@@ -0,0 +1,298 @@
+'''
+    Author: Adam Wilson https://github.com/lightbroker
+
+    Purpose:
+        Compact binary wordlist format with a memory-mapped reader, for
+        candidate lists too large to read into memory with `splitlines()`.
+
+        Two layouts share one header (magic, record count, alphabet,
+        candidate length):
+            fixed width     every record is `width` bytes, NUL-padded;
+                            record i lives at data_offset + i * width
+            offset indexed  records are concatenated, followed by a
+                            table of count + 1 little-endian uint64 offsets
+
+        Either way, lookup by index is O(1) and slicing a Wordlist
+        returns a view over the same mapping without copying records.
+
+    Usage:
+        $ python ./wordlist_format.py pack list.txt list.wl
+        $ python ./wordlist_format.py unpack list.wl list.txt
+        $ python ./wordlist_format.py info list.wl
+
+        from wordlist_format import Wordlist, iter_wordlist
+
+        with Wordlist('list.wl') as words:
+            print(len(words), words.alphabet, words[123456])
+            for word in words[1000:2000]:
+                ...
+
+        # text or binary, streamed either way
+        for word in iter_wordlist('list.txt'):
+            ...
+'''
+
+import argparse
+import mmap
+import os
+import shutil
+import struct
+import tempfile
+
+
+MAGIC = b'WLST'
+VERSION = 1
+FLAG_FIXED_WIDTH = 0x01
+
+# magic, version, flags, reserved, width, count,
+# data offset, index offset, alphabet size, candidate length
+HEADER = struct.Struct('<4sBBHIQQQII')
+OFFSET = struct.Struct('<Q')
+
+
+def _align(size):
+    return (size + 7) & ~7
+
+
+def header_size(alphabet=''):
+    return _align(HEADER.size + len(alphabet.encode('utf-8')))
+
+
+def pack_header(count, alphabet='', length=0, width=0, index_offset=0):
+    alphabet_bytes = alphabet.encode('utf-8')
+    data_offset = header_size(alphabet)
+    flags = FLAG_FIXED_WIDTH if width else 0
+    header = HEADER.pack(MAGIC, VERSION, flags, 0, width, count, data_offset,
+                         index_offset, len(alphabet_bytes), length)
+    return (header + alphabet_bytes).ljust(data_offset, b'\0')
+
+
+def is_wordlist(path):
+    with open(path, 'rb') as f:
+        return f.read(len(MAGIC)) == MAGIC
+
+
+class WordlistWriter:
+    '''
+        Streams records into a wordlist file. Pass `width` for the fixed
+        width layout; otherwise records are offset indexed. The header is
+        rewritten with the final count on close.
+    '''
+
+    def __init__(self, path, alphabet='', length=0, width=0):
+        self.path = path
+        self.alphabet = alphabet
+        self.length = length
+        self.width = width
+        self.count = 0
+
+        self._file = open(path, 'wb', buffering=1 << 20)
+        self._file.write(pack_header(0, alphabet, length, width))
+        self._data_size = 0
+        self._offsets = None if width else tempfile.TemporaryFile()
+        if self._offsets is not None:
+            self._offsets.write(OFFSET.pack(0))
+
+
+    def write(self, value):
+        if isinstance(value, str):
+            value = value.encode('utf-8')
+        if self.width:
+            if len(value) > self.width:
+                raise ValueError(f'record of {len(value)} bytes exceeds width {self.width}')
+            value = value.ljust(self.width, b'\0')
+        self._file.write(value)
+        self._data_size += len(value)
+        if self._offsets is not None:
+            self._offsets.write(OFFSET.pack(self._data_size))
+        self.count += 1
+
+
+    def write_many(self, values):
+        for value in values:
+            self.write(value)
+
+
+    def close(self):
+        index_offset = 0
+        if self._offsets is not None:
+            index_offset = self._file.tell()
+            self._offsets.seek(0)
+            shutil.copyfileobj(self._offsets, self._file, 1 << 20)
+            self._offsets.close()
+        self._file.seek(0)
+        self._file.write(pack_header(self.count, self.alphabet, self.length, self.width, index_offset))
+        self._file.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class Wordlist:
+    '''
+        Read-only, memory-mapped view of a wordlist file.
+    '''
+
+    def __init__(self, path):
+        with open(path, 'rb') as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+        (magic, version, flags, _, self.width, count, self.data_offset,
+         self.index_offset, alphabet_size, self.length) = HEADER.unpack_from(self._mmap)
+        if magic != MAGIC:
+            raise ValueError(f'{path} is not a binary wordlist')
+        if version != VERSION:
+            raise ValueError(f'{path} has unsupported wordlist version {version}')
+
+        self.fixed_width = bool(flags & FLAG_FIXED_WIDTH)
+        self.alphabet = bytes(self._mmap[HEADER.size:HEADER.size + alphabet_size]).decode('utf-8')
+        self._start = 0
+        self._stop = count
+        # slice views share this mapping; only the wordlist that opened it closes it
+        self._owner = True
+
+
+    def _view(self, start, stop):
+        view = object.__new__(Wordlist)
+        view.__dict__.update(self.__dict__)
+        view._start, view._stop = start, stop
+        view._owner = False
+        return view
+
+
+    def __len__(self):
+        return self._stop - self._start
+
+
+    def _record_bounds(self, index):
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError(f'wordlist index {index} out of range')
+        index += self._start
+
+        if self.fixed_width:
+            offset = self.data_offset + index * self.width
+            return offset, offset + self.width
+
+        start, stop = struct.unpack_from('<QQ', self._mmap, self.index_offset + index * OFFSET.size)
+        return self.data_offset + start, self.data_offset + stop
+
+
+    def raw(self, index):
+        '''
+            Returns the record at `index` as a memoryview into the mapping.
+        '''
+        start, stop = self._record_bounds(index)
+        return memoryview(self._mmap)[start:stop]
+
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            start, stop, step = key.indices(len(self))
+            if step != 1:
+                raise ValueError('wordlist slices do not support a step')
+            return self._view(self._start + start, self._start + max(start, stop))
+
+        start, stop = self._record_bounds(key)
+        record = self._mmap[start:stop]
+        if self.fixed_width:
+            record = record.rstrip(b'\0')
+        return record.decode('utf-8')
+
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self[index]
+
+
+    def close(self):
+        '''
+            Unmaps the file; a no-op for slice views, which share the mapping of the wordlist they came from.
+        '''
+        if self._owner:
+            self._mmap.close()
+
+
+    def __enter__(self):
+        return self
+
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def iter_wordlist(path):
+    '''
+        Lazily yields the entries of a binary wordlist or a newline-delimited text file.
+    '''
+    if is_wordlist(path):
+        with Wordlist(path) as words:
+            yield from words
+        return
+
+    with open(path, 'r') as f:
+        for line in f:
+            yield line.rstrip('\r\n')
+
+
+def pack(text_path, wordlist_path, alphabet=''):
+    '''
+        Converts a text list to the binary format, choosing the fixed width
+        layout when every entry has the same length.
+    '''
+    widths = set()
+    with open(text_path, 'rb') as f:
+        for line in f:
+            widths.add(len(line.rstrip(b'\r\n')))
+            if len(widths) > 1:
+                break
+
+    width = widths.pop() if len(widths) == 1 else 0
+    with WordlistWriter(wordlist_path, alphabet, width, width) as writer:
+        with open(text_path, 'rb') as f:
+            for line in f:
+                writer.write(line.rstrip(b'\r\n'))
+    return writer.count
+
+
+def unpack(wordlist_path, text_path):
+    with open(text_path, 'w', buffering=1 << 20) as f:
+        for word in iter_wordlist(wordlist_path):
+            f.write(f'{word}\n')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Convert and inspect binary wordlists')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pack_parser = subparsers.add_parser('pack', help='convert a text list to the binary format')
+    pack_parser.add_argument('input', help='newline-delimited text list')
+    pack_parser.add_argument('output', help='binary wordlist to create')
+    pack_parser.add_argument('-a', dest='alphabet', default='', help='alphabet to record in the header')
+
+    unpack_parser = subparsers.add_parser('unpack', help='convert a binary wordlist to text')
+    unpack_parser.add_argument('input', help='binary wordlist')
+    unpack_parser.add_argument('output', help='newline-delimited text list to create')
+
+    info_parser = subparsers.add_parser('info', help='print the header of a binary wordlist')
+    info_parser.add_argument('input', help='binary wordlist')
+
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        count = pack(args.input, args.output, args.alphabet)
+        print(f'packed {count} entries into {args.output} ({os.path.getsize(args.output)} bytes)')
+    elif args.command == 'unpack':
+        unpack(args.input, args.output)
+    else:
+        with Wordlist(args.input) as words:
+            print(f'entries:  {len(words)}')
+            print(f'layout:   {"fixed width (" + str(words.width) + " bytes)" if words.fixed_width else "offset indexed"}')
+            print(f'length:   {words.length}')
+            print(f'alphabet: {words.alphabet}')
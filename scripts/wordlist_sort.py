@@ -0,0 +1,347 @@
+'''
+    Author: Adam Wilson https://github.com/lightbroker
+
+    Purpose:
+        Sort, de-duplicate, merge and frequency-rank wordlists that don't
+        fit in memory, e.g. the accumulated output of prefix_builder.py,
+        get_permutations_ascii_uppercase.py and serial_encoder.py.
+
+        Input is read in chunks sized so that the chunks being read and
+        sorted together fit in about --memory MB. Each chunk is sorted (and, with -u or --rank, collapsed to
+        distinct words with counts) on a pool of worker processes and
+        written to a temporary run file. The runs are then combined with
+        a k-way heap merge, at most --fan-in files at a time, so memory
+        stays bounded regardless of input size. Lines are compared as
+        raw bytes, i.e. the order of `LC_ALL=C sort`.
+
+        --rank orders distinct words by how many times they occur across
+        all inputs (most frequent first, ties in byte order), using a
+        second external sort on the counts.
+
+        --merge skips chunk sorting for inputs that are already sorted
+        (e.g. earlier output of this tool) and merges them directly; an
+        input found out of order is an error.
+
+    Usage:
+        $ python ./wordlist_sort.py list1.txt list2.txt -u -o merged.txt
+        $ python ./wordlist_sort.py permutations.txt -u -o permutations.txt
+        $ python ./prefix_builder.py 5 - | python ./wordlist_sort.py - -u -o prefixes.txt --workers 4
+        $ python ./wordlist_sort.py sorted1.txt sorted2.txt --merge -u -o merged.txt
+        $ python ./wordlist_sort.py payloads*.txt --rank --counts --min-count 2 -o ranked.txt
+        $ python ./wordlist_sort.py big.txt -u -o big.wl --format binary --memory 512 --temp-dir /mnt/scratch
+'''
+
+import argparse
+import heapq
+import os
+import sys
+import tempfile
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from itertools import groupby
+
+from wordlist_format import WordlistWriter, is_wordlist, iter_wordlist
+
+
+DEFAULT_MEMORY_MB = 256
+DEFAULT_FAN_IN = 64
+
+# Python lists of short bytes objects take several times the raw data size
+EXPANSION = 6
+
+# counts are stored zero-padded, so rank keys sort correctly as bytes
+COUNT_DIGITS = 20
+MAX_COUNT = 10 ** COUNT_DIGITS - 1
+
+
+def iter_chunks(paths, chunk_size):
+    '''
+        Yields newline-terminated byte chunks of about `chunk_size` from
+        every input in turn (text files, "-" for stdin, or binary
+        wordlists), never splitting a line.
+    '''
+    for path in paths:
+        if path != '-' and is_wordlist(path):
+            lines = []
+            size = 0
+            for word in iter_wordlist(path):
+                line = word.encode('utf-8')
+                lines.append(line)
+                size += len(line) + 1
+                if size >= chunk_size:
+                    yield b'\n'.join(lines) + b'\n'
+                    lines = []
+                    size = 0
+            if lines:
+                yield b'\n'.join(lines) + b'\n'
+            continue
+
+        f = sys.stdin.buffer if path == '-' else open(path, 'rb')
+        try:
+            while True:
+                chunk = f.read(chunk_size)
+                if not chunk:
+                    break
+                if not chunk.endswith(b'\n'):
+                    chunk += f.readline()
+                    if not chunk.endswith(b'\n'):
+                        chunk += b'\n'
+                yield chunk
+        finally:
+            if f is not sys.stdin.buffer:
+                f.close()
+
+
+def _lines(chunk):
+    # newline-delimited, tolerating CRLF and dropping blank lines
+    return [line.rstrip(b'\r') for line in chunk.split(b'\n') if line.rstrip(b'\r')]
+
+
+def sort_chunk(chunk, run_path, counted):
+    '''
+        Sorts one chunk into a run file: one word per line, or with
+        `counted`, one "word<TAB>count" line per distinct word. Returns
+        `run_path`.
+    '''
+    lines = _lines(chunk)
+    del chunk
+    lines.sort()
+    with open(run_path, 'wb', buffering=1 << 20) as f:
+        if counted:
+            f.writelines(b'%b\t%d\n' % (word, sum(1 for _ in group)) for word, group in groupby(lines))
+        else:
+            f.writelines(line + b'\n' for line in lines)
+    return run_path
+
+
+def iter_run(path, counted):
+    '''
+        Yields the entries of a run file: words, or (word, count) pairs.
+    '''
+    with open(path, 'rb', buffering=1 << 20) as f:
+        for line in f:
+            line = line.rstrip(b'\n')
+            if counted:
+                word, _, count = line.rpartition(b'\t')
+                yield word, int(count)
+            else:
+                yield line
+
+
+def iter_sorted_input(path, counted):
+    '''
+        Yields the lines of an already-sorted input as run entries
+        (count 1 each), raising ValueError if they are out of order.
+    '''
+    previous = None
+    for chunk in iter_chunks([path], 1 << 20):
+        for line in _lines(chunk):
+            if previous is not None and line < previous:
+                raise ValueError(f'{path} is not sorted (run without --merge)')
+            previous = line
+            yield (line, 1) if counted else line
+
+
+def merge_entries(iterables, counted, unique):
+    '''
+        K-way merges sorted runs, summing the counts of (or dropping) repeated words.
+    '''
+    if not counted:
+        merged = heapq.merge(*iterables)
+        if unique:
+            return (word for word, _ in groupby(merged))
+        return merged
+    merged = heapq.merge(*iterables, key=lambda entry: entry[0])
+    return ((word, sum(count for _, count in group)) for word, group in groupby(merged, key=lambda entry: entry[0]))
+
+
+def write_run(entries, path, counted):
+    with open(path, 'wb', buffering=1 << 20) as f:
+        if counted:
+            f.writelines(b'%b\t%d\n' % entry for entry in entries)
+        else:
+            f.writelines(word + b'\n' for word in entries)
+    return path
+
+
+class ExternalSorter:
+    '''
+        Sorts line-oriented input larger than memory through run files in `temp_dir`.
+    '''
+
+    def __init__(self, memory_mb=DEFAULT_MEMORY_MB, workers=1, fan_in=DEFAULT_FAN_IN, temp_dir=None):
+        self.workers = max(1, workers)
+        # chunks being read, in flight to workers and being sorted all share the budget
+        self.chunk_size = max(1 << 16, memory_mb * (1 << 20) // (EXPANSION * (self.workers + 1)))
+        self.fan_in = max(2, fan_in)
+        self.temp_dir = temp_dir
+        self._counter = 0
+
+
+    def _run_path(self, directory):
+        self._counter += 1
+        return os.path.join(directory, f'run-{self._counter:06d}')
+
+
+    def make_runs(self, chunks, directory, counted):
+        '''
+            Sorts every chunk into its own run file, in parallel; returns the run paths.
+        '''
+        if self.workers == 1:
+            return [sort_chunk(chunk, self._run_path(directory), counted) for chunk in chunks]
+
+        runs = []
+        with ProcessPoolExecutor(max_workers=self.workers) as pool:
+            # bounded window of chunks in flight, so input is read no faster than it is sorted
+            pending = deque()
+            for chunk in chunks:
+                pending.append(pool.submit(sort_chunk, chunk, self._run_path(directory), counted))
+                del chunk
+                if len(pending) >= self.workers:
+                    runs.append(pending.popleft().result())
+            while pending:
+                runs.append(pending.popleft().result())
+        return runs
+
+
+    def merge_runs(self, runs, directory, counted, unique):
+        '''
+            Merges run files `fan_in` at a time until one pass can merge the
+            rest; returns an iterator over the final merge.
+        '''
+        runs = list(runs)
+        while len(runs) > self.fan_in:
+            merged_runs = []
+            for i in range(0, len(runs), self.fan_in):
+                group = runs[i:i + self.fan_in]
+                if len(group) == 1:
+                    merged_runs.extend(group)
+                    continue
+                entries = merge_entries([iter_run(path, counted) for path in group], counted, unique)
+                merged_runs.append(write_run(entries, self._run_path(directory), counted))
+                for path in group:
+                    os.remove(path)
+            runs = merged_runs
+        return merge_entries([iter_run(path, counted) for path in runs], counted, unique)
+
+
+    def sort(self, paths, unique=False, counted=False, presorted=False):
+        '''
+            Yields every input line (bytes) in sorted order, or distinct
+            lines with `unique`, or (line, count) pairs with `counted`.
+        '''
+        with tempfile.TemporaryDirectory(prefix='wordlist_sort-', dir=self.temp_dir) as directory:
+            if presorted:
+                inputs = [iter_sorted_input(path, counted) for path in paths]
+                yield from merge_entries(inputs, counted, unique)
+                return
+            runs = self.make_runs(iter_chunks(paths, self.chunk_size), directory, counted)
+            yield from self.merge_runs(runs, directory, counted, unique)
+
+
+    def rank(self, paths, min_count=1, presorted=False):
+        '''
+            Yields (line, count) for distinct lines, most frequent first.
+        '''
+        with tempfile.TemporaryDirectory(prefix='wordlist_rank-', dir=self.temp_dir) as directory:
+            # second pass: sort "inverted count<TAB>word" keys, written as text chunks
+            keys_path = os.path.join(directory, 'keys')
+            with open(keys_path, 'wb', buffering=1 << 20) as f:
+                for word, count in self.sort(paths, counted=True, presorted=presorted):
+                    if count >= min_count:
+                        f.write(b'%0*d\t%b\n' % (COUNT_DIGITS, MAX_COUNT - count, word))
+
+            for key in self.sort([keys_path]):
+                inverted, _, word = key.partition(b'\t')
+                yield word, MAX_COUNT - int(inverted)
+
+
+@contextmanager
+def replaced_on_success(path):
+    '''
+    Yields a temporary path in the directory of `path` that is renamed over
+    it once the block completes, so an input can also be the output (as
+    with `sort -o`) and a failed run leaves the old file in place.
+    '''
+    directory, name = os.path.split(os.path.abspath(path))
+    temp_path = os.path.join(directory, f'.{name}.{os.getpid()}.tmp')
+    try:
+        yield temp_path
+    except BaseException:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+    os.replace(temp_path, path)
+
+
+def open_text_output(path):
+    if path == '-':
+        return sys.stdout.buffer
+    return open(path, 'wb', buffering=1 << 20)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='External-memory sort, unique, merge and frequency rank for wordlists')
+    parser.add_argument('inputs', nargs='+', help='input wordlists: text, binary (wordlist_format.py) or - for stdin')
+    parser.add_argument('-o', dest='output', default='-', help='output file (default: stdout)')
+    parser.add_argument('-u', '--unique', dest='unique', action='store_true', help='write each distinct line once')
+    parser.add_argument('--merge', action='store_true', help='inputs are already sorted; merge them without sorting')
+    parser.add_argument('--rank', action='store_true', help='write distinct lines, most frequent first')
+    parser.add_argument('--counts', action='store_true', help='prefix each distinct line with its count and a tab (implies -u)')
+    parser.add_argument('--min-count', dest='min_count', type=int, default=1, help='drop lines seen fewer times than this (implies -u)')
+    parser.add_argument('--memory', type=int, default=DEFAULT_MEMORY_MB, help='approximate memory budget in MB')
+    parser.add_argument('--workers', type=int, default=1, help='worker processes sorting chunks')
+    parser.add_argument('--fan-in', dest='fan_in', type=int, default=DEFAULT_FAN_IN, help='maximum run files merged at once')
+    parser.add_argument('--temp-dir', dest='temp_dir', default=None, help='directory for run files (default: system temp)')
+    parser.add_argument('--format', choices=['text', 'binary'], default='text', help='output format')
+    args = parser.parse_args()
+
+    if args.format == 'binary' and (args.output == '-' or args.counts):
+        parser.error('--format=binary needs an output file and cannot include --counts')
+    if args.inputs.count('-') > 1:
+        parser.error('stdin (-) can only be read once')
+
+    sorter = ExternalSorter(args.memory, args.workers, args.fan_in, args.temp_dir)
+    counted = args.counts or args.min_count > 1
+    try:
+        if args.rank:
+            entries = sorter.rank(args.inputs, args.min_count, args.merge)
+        elif counted:
+            entries = ((word, count) for word, count in sorter.sort(args.inputs, counted=True, presorted=args.merge)
+                       if count >= args.min_count)
+        else:
+            entries = sorter.sort(args.inputs, args.unique, presorted=args.merge)
+
+        written = 0
+        with nullcontext(args.output) if args.output == '-' else replaced_on_success(args.output) as output_path:
+            if args.format == 'binary':
+                with WordlistWriter(output_path) as writer:
+                    for entry in entries:
+                        writer.write(entry[0] if isinstance(entry, tuple) else entry)
+                    written = writer.count
+            else:
+                out = open_text_output(output_path)
+                try:
+                    for entry in entries:
+                        if isinstance(entry, tuple):
+                            word, count = entry
+                            out.write(b'%d\t%b\n' % (count, word) if args.counts else word + b'\n')
+                        else:
+                            out.write(entry + b'\n')
+                        written += 1
+                finally:
+                    if out is sys.stdout.buffer:
+                        out.flush()
+                    else:
+                        out.close()
+    except ValueError as e:
+        # stdout may be the output itself
+        print(e, file=sys.stderr)
+        exit(1)
+    except BrokenPipeError:
+        # remove the run files before skipping the normal shutdown
+        entries.close()
+        os._exit(0)
+
+    print(f'wrote {written} line(s) to {args.output}', file=sys.stderr)
@@ -0,0 +1,11 @@
+import os
+import sys
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# top-level scripts import each other by module name (they run from
+# scripts/), the reconnaissance tools as a package (python -m scripts....)
+for path in (os.path.join(ROOT, 'scripts'), ROOT):
+    if path not in sys.path:
+        sys.path.insert(0, path)
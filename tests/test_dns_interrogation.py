@@ -0,0 +1,324 @@
+'''
+    DnsResolver and DnsBrute against a local UDP stub name server.
+'''
+
+import asyncio
+import ipaddress
+import json
+import os
+import stat
+import struct
+import threading
+import time
+from contextlib import contextmanager
+
+import pytest
+
+from scripts.reconnaissance.dns_interrogation.dns_brute import DnsBrute
+from scripts.reconnaissance.dns_interrogation.dns_interrogation import DnsInterrogation
+from scripts.reconnaissance.dns_interrogation.dns_resolver import (
+    HEADER, RCODE_NOERROR, RCODE_NXDOMAIN, RCODE_REFUSED, RCODE_SERVFAIL, TYPE_A, TYPE_AAAA, TYPE_CNAME, DnsResolver,
+    encode_name, read_name,
+)
+from scripts.tried_store import TriedStore
+
+
+ZONE = 'example.test'
+
+
+class StubNameServer(asyncio.DatagramProtocol):
+    '''
+        Authoritative stub for ZONE: answers A/AAAA from `records`
+        ({name: [addresses]}), every other name in the zone from
+        `wildcard` (addresses) or `wildcard_cname` (a CNAME target) if
+        set, `rcodes` ({name: rcode}) override the answer,
+        and everything else is NXDOMAIN. Each answer is sent after `delay`
+        seconds; `max_pending` is the most queries seen unanswered at once.
+    '''
+
+    def __init__(self):
+        self.records = {}
+        self.wildcard = []
+        self.wildcard_cname = None
+        self.rcodes = {}
+        self.delay = 0.0
+        self.queries = []
+        self.pending = 0
+        self.max_pending = 0
+
+
+    def connection_made(self, transport):
+        self.transport = transport
+
+
+    def datagram_received(self, data, addr):
+        asyncio.ensure_future(self._answer(data, addr))
+
+
+    async def _answer(self, data, addr):
+        self.pending += 1
+        self.max_pending = max(self.max_pending, self.pending)
+        try:
+            await asyncio.sleep(self.delay)
+        finally:
+            self.pending -= 1
+
+        query_id = HEADER.unpack_from(data)[0]
+        name, offset = read_name(data, HEADER.size)
+        qtype = struct.unpack_from('!H', data, offset)[0]
+        self.queries.append((name, qtype))
+
+        addresses = self.records.get(name)
+        cname = None
+        if addresses is None and name.endswith(f'.{ZONE}'):
+            addresses, cname = self.wildcard, self.wildcard_cname
+        rcode = self.rcodes.get(name, RCODE_NOERROR if addresses or cname else RCODE_NXDOMAIN)
+
+        answers = []
+        if cname is not None and rcode == RCODE_NOERROR:
+            target = encode_name(cname)
+            answers.append(struct.pack('!HHHIH', 0xC00C, TYPE_CNAME, 1, 60, len(target)) + target)
+        for address in (addresses or []) if rcode == RCODE_NOERROR else []:
+            packed = ipaddress.ip_address(address).packed
+            if (qtype == TYPE_A) == (len(packed) == 4):
+                # name compressed as a pointer to the question
+                answers.append(struct.pack('!HHHIH', 0xC00C, qtype, 1, 60, len(packed)) + packed)
+
+        question = data[HEADER.size:offset + 4]
+        response = HEADER.pack(query_id, 0x8400 | rcode, 1, len(answers), 0, 0) + question + b''.join(answers)
+        self.transport.sendto(response, addr)
+
+
+@contextmanager
+def running_stub():
+    '''
+        A StubNameServer on its own event loop thread (the code under test
+        runs its own loops); yields (stub, "127.0.0.1:<port>").
+    '''
+    loop = asyncio.new_event_loop()
+    stub = StubNameServer()
+    transport, _ = loop.run_until_complete(
+        loop.create_datagram_endpoint(lambda: stub, local_addr=('127.0.0.1', 0))
+    )
+    thread = threading.Thread(target=loop.run_forever, daemon=True)
+    thread.start()
+    try:
+        yield stub, f'127.0.0.1:{transport.get_extra_info("sockname")[1]}'
+    finally:
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join()
+        transport.close()
+        loop.close()
+
+
+@pytest.fixture
+def name_server():
+    with running_stub() as server:
+        yield server
+
+
+@pytest.fixture
+def second_name_server():
+    with running_stub() as server:
+        yield server
+
+
+def test_query_parses_answers_and_rcodes(name_server):
+    stub, server = name_server
+    stub.records[f'www.{ZONE}'] = ['192.0.2.1', '2001:db8::1']
+    resolver = DnsResolver([server], timeout=1.0)
+
+    async def main():
+        try:
+            return await asyncio.gather(
+                resolver.query(f'www.{ZONE}', TYPE_A, recursion=False),
+                resolver.query(f'www.{ZONE}', TYPE_AAAA, recursion=False),
+                resolver.query(f'missing.{ZONE}', TYPE_A, recursion=False),
+            )
+        finally:
+            resolver.close()
+
+    a, aaaa, missing = asyncio.run(main())
+    assert a["rcode"] == RCODE_NOERROR and [answer[3] for answer in a["answers"]] == ['192.0.2.1']
+    assert [answer[3] for answer in aaaa["answers"]] == ['2001:db8::1']
+    assert missing["rcode"] == RCODE_NXDOMAIN and missing["answers"] == []
+
+
+def test_resolve_many_reports_error_rcodes(name_server):
+    stub, server = name_server
+    stub.records[f'ns1.{ZONE}'] = ['192.0.2.53']
+    stub.rcodes[f'broken.{ZONE}'] = RCODE_SERVFAIL
+    stub.rcodes[f'refused.{ZONE}'] = RCODE_REFUSED
+
+    results = DnsResolver([server], timeout=1.0).resolve_many(
+        [f'ns1.{ZONE}', f'missing.{ZONE}', f'broken.{ZONE}', f'refused.{ZONE}']
+    )
+    assert results[f'ns1.{ZONE}'] == {"ipv4": ['192.0.2.53'], "ipv6": []}
+    # NXDOMAIN is an empty answer, not an error
+    assert results[f'missing.{ZONE}'] == {"ipv4": [], "ipv6": []}
+    assert results[f'broken.{ZONE}']["error"] == 'SERVFAIL'
+    assert results[f'refused.{ZONE}']["error"] == 'REFUSED'
+
+
+def test_unresolvable_name_server_hostname_is_an_error():
+    results = DnsResolver(['ns.invalid'], timeout=1.0, retries=0).resolve_many([f'www.{ZONE}'])
+    assert 'cannot resolve name server "ns.invalid"' in results[f'www.{ZONE}']["error"]
+
+
+def read_hits(path):
+    with open(path, 'r') as f:
+        return {record["name"]: record for record in map(json.loads, f)}
+
+
+def test_brute_reports_hits_and_skips_invalid_labels(name_server, tmp_path):
+    stub, server = name_server
+    stub.records[f'www.{ZONE}'] = ['192.0.2.1', '2001:db8::1']
+    stub.records[f'mail.{ZONE}'] = ['192.0.2.25']
+    labels = ['www', 'mail', 'a..b', 'x' * 64] + [f'host{i}' for i in range(50)]
+
+    brute = DnsBrute(ZONE, [server], max_outstanding=8, timeout=1.0, wildcard_probes=2)
+    brute.run(labels, tmp_path / 'hits.jsonl')
+
+    hits = read_hits(tmp_path / 'hits.jsonl')
+    assert hits[f'www.{ZONE}']["ipv4"] == ['192.0.2.1'] and hits[f'www.{ZONE}']["ipv6"] == ['2001:db8::1']
+    assert set(hits) == {f'www.{ZONE}', f'mail.{ZONE}'}
+    assert (brute.queried, brute.hits, brute.invalid, brute.failed) == (52, 2, 2, 0)
+    # invalid labels never reach the name server
+    assert not any('a..b' in name or 'x' * 64 in name for name, _ in stub.queries)
+    assert brute.wildcard_addresses == set()
+
+
+def test_brute_drops_wildcard_answers(name_server, tmp_path):
+    stub, server = name_server
+    stub.wildcard = ['192.0.2.99']
+    stub.records[f'www.{ZONE}'] = ['192.0.2.1']
+
+    brute = DnsBrute(ZONE, [server], max_outstanding=4, timeout=1.0)
+    brute.run(['www', 'mail', 'ftp', 'dev'], tmp_path / 'hits.jsonl')
+
+    assert brute.wildcard_addresses == {'192.0.2.99'}
+    assert set(read_hits(tmp_path / 'hits.jsonl')) == {f'www.{ZONE}'}
+
+
+def test_brute_bounds_outstanding_queries_per_name_server(name_server, tmp_path):
+    stub, server = name_server
+    stub.delay = 0.01
+
+    brute = DnsBrute(ZONE, [server], max_outstanding=3, timeout=2.0, wildcard_probes=0)
+    brute.run([f'host{i}' for i in range(30)], tmp_path / 'hits.jsonl')
+
+    assert brute.queried == 30 and brute.failed == 0
+    # A and AAAA for 3 names would be 6
+    assert stub.max_pending == 3
+
+
+def test_brute_skips_labels_tried_in_earlier_runs(name_server, tmp_path):
+    stub, server = name_server
+    stub.records[f'www.{ZONE}'] = ['192.0.2.1']
+    stub.rcodes[f'flaky.{ZONE}'] = RCODE_SERVFAIL
+    labels = ['www', 'flaky', 'mail', 'ftp']
+
+    store = TriedStore(tmp_path / 'tried', capacity=1000)
+    first = DnsBrute(ZONE, [server], timeout=1.0, wildcard_probes=0, tried=store.open(ZONE, 'dns-brute'))
+    first.run(labels, tmp_path / 'hits.jsonl')
+    store.close()
+    assert (first.queried, first.hits, first.failed) == (4, 1, 2)
+
+    stub.queries.clear()
+    store = TriedStore(tmp_path / 'tried', capacity=1000)
+    second = DnsBrute(ZONE, [server], timeout=1.0, wildcard_probes=0, tried=store.open(ZONE, 'dns-brute'))
+    second.run(labels, tmp_path / 'hits.jsonl')
+    store.close()
+    # only the label that got SERVFAIL is queried again
+    assert second.skipped == 3 and second.queried == 1
+    assert {name for name, _ in stub.queries} == {f'flaky.{ZONE}'}
+
+
+def test_brute_probes_every_name_server_for_wildcards(name_server, second_name_server, tmp_path):
+    (stub, server), (second_stub, second_server) = name_server, second_name_server
+    for each in (stub, second_stub):
+        each.records[f'www.{ZONE}'] = ['192.0.2.1']
+    # only the second server has the wildcard
+    second_stub.wildcard = ['192.0.2.99']
+
+    brute = DnsBrute(ZONE, [server, second_server], max_outstanding=2, timeout=1.0)
+    brute.run(['www', 'mail', 'ftp', 'dev', 'vpn', 'git'], tmp_path / 'hits.jsonl')
+
+    assert brute.wildcard_addresses == {'192.0.2.99'}
+    assert set(read_hits(tmp_path / 'hits.jsonl')) == {f'www.{ZONE}'}
+
+
+def test_brute_drops_cname_wildcard_answers(name_server, tmp_path):
+    stub, server = name_server
+    stub.wildcard_cname = 'lb.example.net'
+    stub.records[f'www.{ZONE}'] = ['192.0.2.1']
+
+    brute = DnsBrute(ZONE, [server], max_outstanding=4, timeout=1.0)
+    brute.run(['www', 'mail', 'ftp', 'dev'], tmp_path / 'hits.jsonl')
+
+    assert brute.wildcard_cnames == {'lb.example.net'} and brute.wildcard_addresses == set()
+    assert set(read_hits(tmp_path / 'hits.jsonl')) == {f'www.{ZONE}'}
+
+
+def test_slow_hostlist_does_not_stall_queries(name_server):
+    stub, server = name_server
+    stub.records[f'www.{ZONE}'] = ['192.0.2.1']
+    stub.records[f'mail.{ZONE}'] = ['192.0.2.25']
+    found = {}
+    resumed = []
+
+    def slow_hostlist():
+        yield 'www'
+        # e.g. a generator upstream of stdin that is still working
+        time.sleep(1.0)
+        resumed.append(time.monotonic())
+        yield 'mail'
+
+    def on_hit(record):
+        found[record["name"]] = time.monotonic()
+
+    brute = DnsBrute(ZONE, [server], max_outstanding=4, timeout=1.0, wildcard_probes=0)
+    asyncio.run(brute.run_async(slow_hostlist(), on_hit))
+
+    assert set(found) == {f'www.{ZONE}', f'mail.{ZONE}'}
+    # www was answered while the hostlist was still blocked
+    assert found[f'www.{ZONE}'] < resumed[0]
+
+
+def test_hostlist_errors_stop_the_run(name_server):
+    _, server = name_server
+
+    def broken_hostlist():
+        yield 'www'
+        raise OSError('hostlist went away')
+
+    brute = DnsBrute(ZONE, [server], max_outstanding=4, timeout=1.0, wildcard_probes=0)
+    with pytest.raises(OSError, match='hostlist went away'):
+        asyncio.run(brute.run_async(broken_hostlist(), lambda record: None))
+
+
+def test_batch_interrogates_every_hostname_with_one_whois_per_domain(name_server, tmp_path, monkeypatch):
+    stub, server = name_server
+    stub.records['ns1.example.com'] = ['192.0.2.53']
+    stub.records['ns1.example.org'] = ['192.0.2.54']
+    # stand-in whois: logs each lookup and lists ns1.<domain>
+    bin_directory = tmp_path / 'bin'
+    bin_directory.mkdir()
+    whois = bin_directory / 'whois'
+    whois.write_text(f'#!/bin/sh\necho "$1" >> {tmp_path / "whois.log"}\necho "   Name Server: ns1.$1"\n')
+    whois.chmod(whois.stat().st_mode | stat.S_IXUSR)
+    monkeypatch.setenv('PATH', f'{bin_directory}{os.pathsep}{os.environ["PATH"]}')
+    monkeypatch.chdir(tmp_path)
+
+    hostnames = ['www.example.com', 'mail.example.com', 'api.example.org', 'vpn.example.com']
+    DnsInterrogation(resolvers=[server], timeout=1.0).run_batch(hostnames, None)
+
+    assert (tmp_path / 'whois.log').read_text().split() == ['example.com', 'example.org']
+    documents = {}
+    for path in tmp_path.glob('dns_interrogation.*.json'):
+        with open(path, 'r') as f:
+            document = json.load(f)
+        documents[document["hostname"]] = document
+    assert set(documents) == set(hostnames)
+    assert documents['vpn.example.com']["authoritative_dns"]["ipv4"] == ['192.0.2.53']
+    assert documents['api.example.org']["authoritative_dns"]["ipv4"] == ['192.0.2.54']
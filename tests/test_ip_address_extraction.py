@@ -0,0 +1,31 @@
+'''
+    Single-pass IPv4/IPv6 extraction from free text.
+'''
+
+import pytest
+
+from scripts.reconnaissance.dns_interrogation.ip_address_extraction import extract_addresses
+
+
+@pytest.mark.parametrize('text', [
+    'use abc::def;',
+    'self::feed::add();',
+    'Bee::Add',
+    'xBee::Add',
+    'Foo::Bar::baz()',
+    'std::vec::Vec<u8>',
+    'a::b',
+    'Base64::decode(value)',
+])
+def test_scoped_identifiers_are_not_addresses(text):
+    assert extract_addresses(text) == ([], [])
+
+
+def test_addresses_in_text():
+    text = ('addr:10.0.0.1 inet6 fe80::a00:27ff:fe4e:66a1/64 fe80::1%eth0 [2001:db8::2]:443 '
+            '10.0.0.2:8080 (2001:DB8:0:0:0:0:0:1). 1.2.3.4.5 999.1.1.1 12:34:56 ::ffff:10.1.2.3')
+
+    assert extract_addresses(text) == (
+        ['10.0.0.1', '10.0.0.2'],
+        ['fe80::a00:27ff:fe4e:66a1', 'fe80::1%eth0', '2001:db8::2', '2001:db8::1', '::ffff:a01:203'],
+    )
@@ -0,0 +1,53 @@
+'''
+    onboarding_timeline_viz_poc --summary stays free of the plotting and
+    DataFrame stack, checked with `python -X importtime`.
+'''
+
+import json
+import os
+import subprocess
+import sys
+
+from onboarding_timeline_viz_poc import HEAVY_MODULES
+
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'onboarding_timeline_viz_poc.py')
+
+# generous: the script's own imports take a few ms, NumPy alone ~50-100 ms
+IMPORT_BUDGET_MS = 250
+
+
+def import_times(*arguments):
+    '''
+        Run `python -X importtime <arguments>`; returns (completed process,
+        every module imported, {top-level import: cumulative microseconds}).
+    '''
+    result = subprocess.run([sys.executable, '-X', 'importtime', *arguments], capture_output=True, text=True)
+    modules = set()
+    cumulative = {}
+    for line in result.stderr.splitlines():
+        # "import time: self [us] | cumulative | imported package"
+        if not line.startswith('import time:') or 'imported package' in line:
+            continue
+        _, total_us, name = line[len('import time:'):].split('|')
+        modules.add(name.strip())
+        if not name.startswith('  '):
+            # nested imports are indented and already included in their parent's cumulative time
+            cumulative[name.strip()] = int(total_us)
+    return result, modules, cumulative
+
+
+def test_summary_skips_heavy_imports():
+    result, modules, cumulative = import_times(SCRIPT, '--summary', 'json', '--rates', '5', '10', '20')
+    assert result.returncode == 0, result.stderr[-2000:]
+
+    summary = json.loads(result.stdout)
+    assert [scenario['rate'] for scenario in summary['scenarios']] == [5, 10, 20]
+
+    heavy = sorted(name for name in HEAVY_MODULES if any(module.split('.')[0] == name for module in modules))
+    assert heavy == []
+
+    # only what the script adds on top of interpreter startup (site etc.)
+    _, startup, _ = import_times('-c', 'pass')
+    own_ms = sum(us for name, us in cumulative.items() if name not in startup) / 1000
+    assert own_ms < IMPORT_BUDGET_MS
@@ -0,0 +1,35 @@
+'''
+    The reconnaissance tools run as modules of the scripts package, from
+    the repository root, as their usage docs say.
+'''
+
+import os
+import subprocess
+import sys
+
+import pytest
+
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+MODULES = [
+    'scripts.reconnaissance.dns_interrogation.dns_brute',
+    'scripts.reconnaissance.dns_interrogation.dns_interrogation',
+    'scripts.reconnaissance.dns_interrogation.ip_addresses_from_file',
+    'scripts.reconnaissance.web_server_recon.nmap_port_scan',
+    'scripts.reconnaissance.web_server_recon.web_server_recon',
+]
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_runs_as_module(module):
+    result = subprocess.run([sys.executable, '-m', module, '-h'], cwd=ROOT, capture_output=True, text=True)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.startswith('usage:')
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_usage_docs_match(module):
+    documented = __import__(module, fromlist=['__doc__']).__doc__
+    assert f'python -m {module}' in documented
+    assert 'python ./' not in documented
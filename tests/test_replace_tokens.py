@@ -0,0 +1,123 @@
+'''
+    TokenReplacer against the password matrix of test_credential_replacement.sh,
+    plus multi-token, chunk boundary and file handling cases.
+'''
+
+import os
+import stat
+import subprocess
+
+import pytest
+
+from replace_tokens import TokenReplacer, replace_files
+
+
+SCRIPTS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts')
+
+# carried over from test_credential_replacement.sh (as bash expands them)
+TEST_PASSWORDS = [
+    'simple123',
+    'pa$$w0rd',
+    'p@ssw&rd!',
+    'pass/with\\slashes',
+    'reg[ex]chars',
+    'dots.and*stars',
+    'quotes"and\'apostrophes',
+    'spaces in password',
+    'command substitution',
+    'pipe|and&ampersand',
+    'percent%signs',
+    'equals=and+plus',
+    'curly{braces}here',
+    'parentheses(and)stuff',
+    'question?marks',
+    'hash#tags',
+    'tilde~character',
+    'backtick`character',
+]
+
+TEST_TOKEN = '{{PASSWORD}}'
+TEST_CONTENT = f'''server:
+  host: localhost
+  password: {TEST_TOKEN}
+  connection_string: "user:{TEST_TOKEN}@localhost:5432/db"
+  config:
+    secret: {TEST_TOKEN}
+'''
+
+
+def write(path, content, mode=0o644):
+    path.write_text(content)
+    path.chmod(mode)
+    return str(path)
+
+
+@pytest.mark.parametrize('password', TEST_PASSWORDS)
+def test_password_matrix(tmp_path, password):
+    path = write(tmp_path / 'config.yml', TEST_CONTENT)
+
+    assert TokenReplacer({TEST_TOKEN: password}).replace_file(path) == 3
+    assert (tmp_path / 'config.yml').read_text() == TEST_CONTENT.replace(TEST_TOKEN, password)
+
+
+@pytest.mark.parametrize('password', TEST_PASSWORDS)
+def test_shell_replace_github_secret(tmp_path, password):
+    path = write(tmp_path / 'config.yml', TEST_CONTENT)
+
+    result = subprocess.run(
+        # sourced without arguments, so the script only defines its functions
+        ['bash', '-c', 'script="$0"; args=("$@"); set --; source "$script" >/dev/null && replace_github_secret "${args[@]}"',
+         os.path.join(SCRIPTS, 'test_credential_replacement.sh'), path, TEST_TOKEN, password],
+        capture_output=True, text=True,
+    )
+
+    assert result.returncode == 0, result.stderr
+    assert 'Used replace_tokens.py' in result.stdout and password not in result.stdout
+    assert (tmp_path / 'config.yml').read_text() == TEST_CONTENT.replace(TEST_TOKEN, password)
+
+
+def test_multiple_tokens_in_one_pass():
+    mapping = {'{{A}}': 'x{{B}}x', '{{B}}': '\\1 $& \\g<0>', '{{AB}}': 'long', '{{A': 'prefix'}
+
+    replaced, count = TokenReplacer(mapping).replace('{{A}} {{B}} {{AB}} {{A {{A}}{{B}}')
+
+    # longest token wins, values are literal and never expanded again
+    assert replaced == b'x{{B}}x \\1 $& \\g<0> long prefix x{{B}}x\\1 $& \\g<0>'
+    assert count == 6
+
+
+def test_tokens_split_across_chunks(tmp_path):
+    content = ''.join(f'line {i} {TEST_TOKEN} {{{{OTHER}}}}\n' for i in range(500))
+    path = write(tmp_path / 'chunked.txt', content)
+
+    count = TokenReplacer({TEST_TOKEN: 'secret', '{{OTHER}}': ''}, chunk_size=7).replace_file(path)
+
+    assert count == 1000
+    assert (tmp_path / 'chunked.txt').read_text() == content.replace(TEST_TOKEN, 'secret').replace('{{OTHER}}', '')
+
+
+def test_file_mode_preserved(tmp_path):
+    path = write(tmp_path / 'script.sh', f'#!/bin/sh\necho {TEST_TOKEN}\n', 0o750)
+
+    TokenReplacer({TEST_TOKEN: 'secret'}).replace_file(path)
+
+    assert stat.S_IMODE(os.stat(path).st_mode) == 0o750
+
+
+def test_files_without_tokens_untouched(tmp_path):
+    path = write(tmp_path / 'untouched.txt', 'no tokens here\n')
+    before = os.stat(path).st_ino
+
+    assert TokenReplacer({TEST_TOKEN: 'x'}).replace_file(path) == 0
+    assert os.stat(path).st_ino == before
+
+
+def test_parallel_files(tmp_path):
+    paths = [write(tmp_path / f'parallel-{i}.yml', TEST_CONTENT) for i in range(8)]
+
+    counts = replace_files({TEST_TOKEN: 'p@ss'}, paths, workers=4)
+
+    assert counts == {path: 3 for path in paths}
+    assert all(open(path).read() == TEST_CONTENT.replace(TEST_TOKEN, 'p@ss') for path in paths)
+    # every temporary file was moved over its original
+    assert sorted(os.listdir(tmp_path)) == sorted(f'parallel-{i}.yml' for i in range(8))
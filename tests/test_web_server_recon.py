@@ -0,0 +1,130 @@
+'''
+    WebServerReconnaissance and the recon pipeline against stand-in nikto
+    and nmap executables put first on PATH.
+'''
+
+import json
+import os
+import sqlite3
+import stat
+
+import pytest
+
+from scripts.reconnaissance.web_server_recon.recon_pipeline import JobQueue, ReconPipeline, expand_targets
+from scripts.reconnaissance.web_server_recon.web_server_recon import WebServerReconnaissance
+
+
+NMAP_XML = '''<?xml version="1.0"?>
+<nmaprun args="nmap --script ssl-enum-ciphers,ssl-heartbleed,http-methods -oX - example.test">
+<host><status state="up"/><address addr="192.0.2.10" addrtype="ipv4"/>
+<hostnames><hostname name="example.test"/></hostnames>
+<ports>
+<port protocol="tcp" portid="80"><state state="open"/><service name="http"/>
+<script id="http-methods" output="Supported Methods: GET HEAD POST OPTIONS"/></port>
+<port protocol="tcp" portid="443"><state state="open"/><service name="https"/>
+<script id="ssl-enum-ciphers" output="TLSv1.2: least strength A"/>
+<script id="http-methods" output="Supported Methods: GET HEAD"/></port>
+</ports></host>
+</nmaprun>
+'''
+
+
+def install_tool(directory, name, script):
+    path = directory / name
+    path.write_text('#!/bin/sh\n' + script)
+    path.chmod(path.stat().st_mode | stat.S_IXUSR)
+
+
+@pytest.fixture
+def tools(tmp_path, monkeypatch):
+    '''
+        Directory of stand-in tools, searched before the real ones.
+    '''
+    directory = tmp_path / 'bin'
+    directory.mkdir()
+    (tmp_path / 'nmap.xml').write_text(NMAP_XML)
+    install_tool(directory, 'nmap', f'cat {tmp_path / "nmap.xml"}\n')
+    install_tool(directory, 'nikto', 'echo "+ Server: stand-in"\n')
+    monkeypatch.setenv('PATH', f'{directory}{os.pathsep}{os.environ["PATH"]}')
+    return directory
+
+
+def test_results_keep_one_key_per_nmap_script(tools):
+    results = WebServerReconnaissance('example.test', timeout=10).collect()
+
+    assert results["nikto"] == '+ Server: stand-in\n'
+    assert 'nmap' not in results
+    ports = {key: {record["port"]: record["scripts"] for record in results[key]}
+             for key in ("nmap_ssl_enum_ciphers", "nmap_heartbleed", "nmap_http_methods")}
+    assert ports["nmap_ssl_enum_ciphers"] == {None: {}, 80: {}, 443: {"ssl-enum-ciphers": "TLSv1.2: least strength A"}}
+    assert ports["nmap_heartbleed"] == {None: {}, 80: {}, 443: {}}
+    assert ports["nmap_http_methods"][443] == {"http-methods": "Supported Methods: GET HEAD"}
+
+
+def test_unparsed_nmap_output_is_kept_under_every_key(tools):
+    install_tool(tools, 'nmap', 'echo "Failed to resolve example.test."\n')
+
+    results = WebServerReconnaissance('example.test', timeout=10).collect()
+
+    for key in ("nmap_ssl_enum_ciphers", "nmap_heartbleed", "nmap_http_methods"):
+        assert results[key] == 'Failed to resolve example.test.\n'
+
+
+def test_pipeline_marks_job_failed_when_a_stage_times_out(tools, tmp_path):
+    install_tool(tools, 'nikto', 'exec sleep 30\n')
+    pipeline = ReconPipeline(str(tmp_path / 'jobs.db'), str(tmp_path / 'results.jsonl'), timeout=0.5)
+
+    pipeline.run(['example.test'], ['web'])
+
+    with open(tmp_path / 'results.jsonl', 'r') as f:
+        record = json.loads(f.readline())
+    assert record["status"] == 'failed' and record["error"] == 'nikto: timeout'
+    assert record["result"]["__metadata"]["stages"]["nikto"]["status"] == 'timeout'
+    assert record["result"]["nmap_http_methods"]
+    assert JobQueue(str(tmp_path / 'jobs.db')).errors() == [('example.test', 'web', 'nikto: timeout')]
+
+
+def test_pipeline_records_why_a_port_scan_failed(tools, tmp_path, monkeypatch):
+    install_tool(tools, 'nmap', 'echo "You requested a scan type which requires root privileges." >&2\nexit 1\n')
+    monkeypatch.chdir(tmp_path)
+    pipeline = ReconPipeline(str(tmp_path / 'jobs.db'), str(tmp_path / 'results.jsonl'), timeout=10)
+
+    pipeline.run(['192.0.2.10'], ['ports'])
+
+    with open(tmp_path / 'results.jsonl', 'r') as f:
+        record = json.loads(f.readline())
+    assert record["status"] == 'failed' and 'returned non-zero exit status 1' in record["error"]
+    [(_, _, error)] = JobQueue(str(tmp_path / 'jobs.db')).errors()
+    assert error == record["error"]
+
+
+def test_queue_created_without_error_column_is_upgraded(tmp_path):
+    db = sqlite3.connect(tmp_path / 'jobs.db')
+    db.execute("CREATE TABLE jobs (target TEXT NOT NULL, tool TEXT NOT NULL, status TEXT NOT NULL DEFAULT 'pending', "
+               "started REAL, finished REAL, PRIMARY KEY (target, tool))")
+    db.execute("INSERT INTO jobs (target, tool) VALUES ('192.0.2.10', 'ports')")
+    db.commit()
+    db.close()
+
+    queue = JobQueue(str(tmp_path / 'jobs.db'))
+    queue.mark('192.0.2.10', 'ports', 'failed', 'nmap failed')
+    assert queue.errors() == [('192.0.2.10', 'ports', 'nmap failed')]
+
+
+def test_expand_targets_rejects_oversized_blocks():
+    assert list(expand_targets(['192.0.2.0/30', '192.0.2.1', '# comment', 'example.test'])) == [
+        '192.0.2.1', '192.0.2.2', 'example.test']
+    assert len(list(expand_targets(['10.0.0.0/16']))) == 65534
+    with pytest.raises(ValueError, match='10.0.0.0/8'):
+        list(expand_targets(['10.0.0.0/8']))
+    with pytest.raises(ValueError, match='more than the limit of 256'):
+        list(expand_targets(['2001:db8::/64'], max_hosts=256))
+
+
+def test_oversized_block_enqueues_nothing(tmp_path):
+    pipeline = ReconPipeline(str(tmp_path / 'jobs.db'), str(tmp_path / 'results.jsonl'), max_hosts=4)
+
+    with pytest.raises(ValueError):
+        pipeline.run(['192.0.2.10', '192.0.2.0/24'], ['ports'])
+
+    assert JobQueue(str(tmp_path / 'jobs.db')).counts() == {}
@@ -0,0 +1,115 @@
+'''
+    WebSocketsRunner against a local asyncio echo server.
+'''
+
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+import pytest
+from websockets.asyncio.server import serve
+
+from websockets_runner import WebSocketsRunner
+
+
+@asynccontextmanager
+async def echo_server(drop=(), delay=0.0):
+    '''
+        Echoes every message back after `delay` seconds; the first time a
+        message in `drop` arrives, the connection is closed instead.
+        Yields (url, stats).
+    '''
+    stats = {'connections': 0, 'open': 0, 'max_open': 0, 'busy': 0, 'max_busy': 0}
+    dropped = set()
+
+    async def handler(connection):
+        stats['connections'] += 1
+        stats['open'] += 1
+        stats['max_open'] = max(stats['max_open'], stats['open'])
+        try:
+            async for message in connection:
+                if message in drop and message not in dropped:
+                    dropped.add(message)
+                    await connection.close()
+                    return
+                stats['busy'] += 1
+                stats['max_busy'] = max(stats['max_busy'], stats['busy'])
+                await asyncio.sleep(delay)
+                stats['busy'] -= 1
+                await connection.send(message)
+        finally:
+            stats['open'] -= 1
+
+    async with serve(handler, '127.0.0.1', 0) as server:
+        port = server.sockets[0].getsockname()[1]
+        yield f'ws://127.0.0.1:{port}/', stats
+
+
+def run_messages(messages, drop=(), delay=0.0, **options):
+    results = {}
+
+    async def main():
+        async with echo_server(drop, delay) as (url, stats):
+            runner = WebSocketsRunner(url, timeout=2.0, **options)
+            await runner.run_async(messages, lambda index, response, latency: results.__setitem__(index, response))
+            return runner, stats
+
+    runner, stats = asyncio.run(main())
+    return runner, stats, results
+
+
+def test_every_message_is_echoed_over_the_pool():
+    messages = [f'payload-{i}' for i in range(200)]
+    runner, stats, results = run_messages(messages, pool_size=4)
+
+    assert results == dict(enumerate(messages))
+    assert (runner.sent, runner.failed, runner.reconnects) == (200, 0, 0)
+    # persistent connections: one per pool slot, reused for every message
+    assert stats['connections'] == 4
+
+
+def test_dropped_connection_is_reopened_and_message_retried():
+    messages = [f'payload-{i}' for i in range(20)]
+    runner, stats, results = run_messages(messages, drop={'payload-5'}, pool_size=2)
+
+    assert results == dict(enumerate(messages))
+    assert runner.reconnects == 1
+    assert stats['connections'] == 3
+
+
+def test_requests_in_flight_never_exceed_the_limit():
+    _, stats, results = run_messages([str(i) for i in range(40)], delay=0.005, pool_size=4)
+    assert len(results) == 40 and stats['max_busy'] == 4
+
+    runner, stats, results = run_messages([str(i) for i in range(40)], delay=0.005, pool_size=4, max_in_flight=2)
+    assert len(results) == 40 and runner.failed == 0
+    assert stats['max_busy'] == 2
+
+
+def test_in_flight_above_pool_size_is_rejected():
+    with pytest.raises(ValueError):
+        WebSocketsRunner('ws://127.0.0.1:1/', pool_size=2, max_in_flight=3)
+
+
+def test_rate_ceiling():
+    started = time.monotonic()
+    runner, _, results = run_messages([str(i) for i in range(11)], pool_size=4, rate=50)
+
+    assert len(results) == 11
+    # 11 sends spaced at least 1 / 50 s apart
+    assert time.monotonic() - started >= 0.2
+
+
+def test_failing_result_callback_stops_the_run():
+    def on_result(index, response, latency):
+        if index >= 3:
+            raise OSError(28, 'No space left on device')
+
+    async def main():
+        async with echo_server() as (url, _):
+            runner = WebSocketsRunner(url, timeout=2.0, pool_size=2)
+            # far more messages than the queue holds, so a stalled producer would hang
+            await asyncio.wait_for(runner.run_async((f'payload-{i}' for i in range(1000)), on_result), 10)
+
+    with pytest.raises(OSError, match='No space left on device'):
+        asyncio.run(main())
@@ -0,0 +1,36 @@
+'''
+    wordlist_sort.py writing its output over one of its inputs.
+'''
+
+import os
+import subprocess
+import sys
+
+
+SCRIPT = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'scripts', 'wordlist_sort.py')
+
+
+def sort_wordlists(*arguments):
+    return subprocess.run([sys.executable, SCRIPT, *map(str, arguments)], capture_output=True, text=True)
+
+
+def test_unique_in_place(tmp_path):
+    wordlist = tmp_path / 'permutations.txt'
+    wordlist.write_text('BA\nAB\nBA\nCA\nAB\n')
+
+    result = sort_wordlists(wordlist, '-u', '-o', wordlist)
+
+    assert result.returncode == 0, result.stderr
+    assert wordlist.read_text() == 'AB\nBA\nCA\n'
+    assert os.listdir(tmp_path) == ['permutations.txt']
+
+
+def test_failed_run_keeps_output(tmp_path):
+    wordlist = tmp_path / 'unsorted.txt'
+    wordlist.write_text('b\na\n')
+
+    result = sort_wordlists(wordlist, '--merge', '-o', wordlist)
+
+    assert result.returncode == 1 and 'not sorted' in result.stderr
+    assert wordlist.read_text() == 'b\na\n'
+    assert os.listdir(tmp_path) == ['unsorted.txt']